@@ -0,0 +1,72 @@
+"""
+<Purpose>
+  Measures the memory held by the Syscall objects of a trace with and without
+  string interning. The trace is testbins/shell.strace repeated until it is
+  large enough for the saving to show.
+
+  Usage:
+
+    PYTHONPATH=. python benchmarks/bench_interning.py [repeat]
+
+"""
+
+from __future__ import print_function
+
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+from posix_omni_parser.parsers.StraceParser import StraceParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+TRACE = os.path.join(ROOT, "testbins", "shell.strace")
+DEFINITIONS = os.path.join(ROOT, "test", "syscall_definitions.pickle")
+
+
+def scale_trace(directory, repeat):
+    scaled_path = os.path.join(directory, "shell.strace")
+    with open(TRACE) as fh:
+        lines = fh.read()
+    with open(scaled_path, "w") as fh:
+        for _ in range(repeat):
+            fh.write(lines)
+    return scaled_path
+
+
+def measure(trace_path, intern_strings):
+    gc.collect()
+    tracemalloc.start()
+    parser = StraceParser(
+        trace_path,
+        DEFINITIONS,
+        error_budget=sys.maxsize,
+        intern_strings=intern_strings,
+    )
+    syscalls = parser.parse_trace()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return len(syscalls), retained
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    directory = tempfile.mkdtemp()
+    try:
+        trace_path = scale_trace(directory, repeat)
+        count, plain = measure(trace_path, False)
+        _, interned = measure(trace_path, True)
+    finally:
+        shutil.rmtree(directory)
+
+    print("system calls:       " + str(count))
+    print("without interning:  " + str(plain // 1024) + " KiB")
+    print("with interning:     " + str(interned // 1024) + " KiB")
+    print("saved:              " + str(100 - interned * 100 // plain) + "%")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,7 @@ from __future__ import absolute_import
 from builtins import str
 from builtins import object
 from . import parsing_classes
+from . import spilling
 
 DEBUG = False
 
@@ -48,7 +49,14 @@ class UnfinishedSyscall(object):
         return not self.__eq__(other)
 
     def __repr__(self):
-        return "UnfinishedSyscall: " + self.pid + " " + self.name + " " + str(self.args)
+        return (
+            "UnfinishedSyscall: "
+            + str(self.pid)
+            + " "
+            + self.name
+            + " "
+            + str(self.args)
+        )
 
 
 class Syscall(object):
@@ -61,13 +69,15 @@ class Syscall(object):
     <Attributes>
       self.original_line:
         A string holding the original line from which this object was created.
+        If the line was spilled (see StraceParser's spill_threshold) it is read
+        back from the trace file on every access.
 
       self.type:
         The type of the system call. This can be one of the UNFINISHED, RESUMED or
         COMPLETE.
 
       self.pid:
-        The process id of this system call.
+        The process id of this system call, as an int.
 
       self.name:
         The name of the system call.
@@ -87,10 +97,10 @@ class Syscall(object):
         The instruction pointer at the time of the system call.
 
       self.timestamp:
-        This value can have different formats and content according to the parser
-        options. For example it can hold  a relative timestamp indicating the
-        interval between the beginning of successive syscalls or it can hold the
-        time the syscall was executed.
+        The start time of the system call as an int of nanoseconds, or None if the
+        trace has no timestamps. Its origin depends on the parser options: the
+        epoch for -ttt, the midnight of the trace date for -t and -tt, and the
+        first line of the trace for -r.
 
       self.elapsed_time:
         The time difference between the beginning and the end of the system call.
@@ -110,7 +120,14 @@ class Syscall(object):
     # them.
     COMPLETE = 2
 
-    def __init__(self, syscall_definitions, line, line_parts):
+    def __init__(
+        self,
+        syscall_definitions,
+        line,
+        line_parts,
+        string_pool=None,
+        flag_vocabulary=None,
+    ):
         """
         <Purpose>
           Initialize a Syscall object. Create the data fields of the object. If the
@@ -130,6 +147,14 @@ class Syscall(object):
             A list containing the parts of the trace line. E.g: type, pid, name,
             args, return, timestamp, etc ...
 
+          string_pool:
+            An optional InternPool through which the strings of the arguments
+            repeating across system calls, e.g. flags and paths, are shared.
+
+          flag_vocabulary:
+            An optional FlagVocabulary. If given, the Flags arguments are stored
+            in compact mode.
+
         <Exceptions>
           None
 
@@ -162,7 +187,12 @@ class Syscall(object):
         # about it.
         if "syscall_" not in self.name:
             self.args = parsing_classes.cast_args(
-                self.name, line_parts["type"], syscall_definitions, line_parts["args"]
+                self.name,
+                line_parts["type"],
+                syscall_definitions,
+                line_parts["args"],
+                string_pool,
+                flag_vocabulary,
             )
         else:
             self.args = None
@@ -182,6 +212,24 @@ class Syscall(object):
         if "elapsed_time" in line_parts:
             self.elapsed_time = line_parts["elapsed_time"]
 
+    @property
+    def original_line(self):
+        # a spilled line is read back from the trace file on every access.
+        if isinstance(self._original_line, spilling.FileSpan):
+            return self._original_line.read()
+        return self._original_line
+
+    @original_line.setter
+    def original_line(self, line):
+        self._original_line = line
+
+    def spill_line(self, span):
+        """
+        Drop the original line from memory, keeping the FileSpan it can be read
+        from.
+        """
+        self._original_line = span
+
     def isSuccessful(self):
         """
         If the first item of the return part is -1 or ? it means the syscall
@@ -221,7 +269,7 @@ class Syscall(object):
         )
         if self.inst_pointer:
             representation += "INST_POINTER: " + self.inst_pointer + "\n"
-        if self.timestamp:
+        if self.timestamp is not None:
             representation += "TIMESTAMP: " + str(self.timestamp) + "\n"
         if self.elapsed_time:
             representation += "ELAPSED_TIME: " + str(self.elapsed_time) + "\n"
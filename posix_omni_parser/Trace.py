@@ -20,9 +20,15 @@ from __future__ import absolute_import
 
 from builtins import str
 from builtins import object
+import fnmatch
 import os
+import re
 import sys
 
+from . import fdtables
+from . import indexes
+from . import processes
+from . import query
 from .parsers.StraceParser import StraceParser
 
 
@@ -50,6 +56,26 @@ class Trace(object):
         This variable holds all the parsed system calls. It is a list of Syscall
         objects returned by the parser.
 
+      self.index:
+        A SyscallIndex of self.syscalls by pid, name and error label, or None if
+        the trace was not indexed. See by_pid(), by_name() and by_errno().
+
+      self.time_index:
+        A TimeIndex of self.syscalls, or None if the trace was not indexed or
+        has no timestamps. See between() and overlapping().
+
+      self.path_index:
+        A PathIndex of self.syscalls, or None if the trace was not indexed. See
+        by_path(), by_path_prefix() and by_path_glob().
+
+      self.fds:
+        An FdTracker with the file descriptor table of every process of the
+        trace, or None if file descriptors were not tracked.
+
+      self.processes:
+        A ProcessTree of the processes and threads of the trace, or None if
+        they were not tracked.
+
       self.platform:
         The platform in which the trace is parsed on (sys.platform). This is
         especially useful when creating a trace bundle containing not only the
@@ -57,7 +83,15 @@ class Trace(object):
         in trace file.
     """
 
-    def __init__(self, trace_path, pickle_file):
+    def __init__(
+        self,
+        trace_path,
+        pickle_file,
+        index=False,
+        track_fds=False,
+        track_processes=False,
+        **parser_options
+    ):
         """
         <Purpose>
           Creates a trace object containing all the information extracted from a
@@ -69,6 +103,18 @@ class Trace(object):
           pickle_file:
             The path to the pickle file containing the parsed system call
             representations.
+          index:
+            Whether to index the system calls by pid, name, error label and
+            path, and by time if the trace has timestamps, while parsing them.
+          track_fds:
+            Whether to track the file descriptor table of every process while
+            parsing the system calls.
+          track_processes:
+            Whether to build the tree of the processes of the trace while
+            parsing the system calls.
+          parser_options:
+            Keyword arguments passed on to the parser, e.g. trace_date. See
+            StraceParser.
 
         <Exceptions>
           IOError:
@@ -106,10 +152,31 @@ class Trace(object):
         self.tracing_utility = "strace"
 
         # set strace parser
-        self.parser = StraceParser(self.trace_path, self.pickle_file)
+        self.parser = StraceParser(self.trace_path, self.pickle_file, **parser_options)
 
-        # parse system calls
-        self.syscalls = self.parser.parse_trace()
+        # parse system calls, indexing them and tracking file descriptors and
+        # processes on the way if asked to.
+        self.index = None
+        self.time_index = None
+        self.path_index = None
+        self.fds = None
+        self.processes = None
+        sinks = []
+        if index:
+            self.index = indexes.SyscallIndex()
+            sinks.append(self.index)
+            self.path_index = indexes.PathIndex()
+            sinks.append(self.path_index)
+            if self.parser.trace_options["timestamp"] is not None:
+                self.time_index = indexes.TimeIndex()
+                sinks.append(self.time_index)
+        if track_fds:
+            self.fds = fdtables.FdTracker()
+            sinks.append(self.fds)
+        if track_processes:
+            self.processes = processes.ProcessTree()
+            sinks.append(self.processes)
+        self.syscalls = self.parser.parse_trace(sinks=sinks)
 
         # get platform information
         self.platform = sys.platform
@@ -117,6 +184,130 @@ class Trace(object):
         # - in bundle can store metadata what command / date / OS / etc the trace was
         # - gathered from.
 
+    def query(self, expression):
+        """
+        Return the system calls matching a filter expression, e.g.
+        'name == openat and ret.err == ENOENT', in trace order. See the query
+        module for the language. The indexes of the trace are used if it has
+        them.
+        """
+        return query.compile_query(expression).select(self)
+
+    def by_pid(self, pid):
+        """
+        Return the system calls of the given pid, in trace order.
+        """
+        return self._lookup("pids", pid, lambda syscall: syscall.pid == pid)
+
+    def by_name(self, name):
+        """
+        Return the system calls with the given name, in trace order.
+        """
+        return self._lookup("names", name, lambda syscall: syscall.name == name)
+
+    def by_errno(self, error_label):
+        """
+        Return the system calls that failed with the given error label, e.g.
+        "ENOENT", in trace order.
+        """
+        return self._lookup(
+            "errnos",
+            error_label,
+            lambda syscall: syscall.ret is not None and syscall.ret[1] == error_label,
+        )
+
+    def by_path(self, path):
+        """
+        Return the system calls using the given path, in trace order.
+        """
+        return self._path_lookup("exact", path, lambda used: used == path)
+
+    def by_path_prefix(self, directory):
+        """
+        Return the system calls using a path in the subtree of the given
+        directory, in trace order.
+        """
+        directory = directory.rstrip("/")
+        return self._path_lookup(
+            "prefix",
+            directory,
+            lambda used: used == directory or used.startswith(directory + "/"),
+        )
+
+    def by_path_glob(self, pattern):
+        """
+        Return the system calls using a path that matches the given shell
+        pattern, in trace order.
+        """
+        match = re.compile(fnmatch.translate(pattern)).match
+        return self._path_lookup("glob", pattern, lambda used: match(used))
+
+    def _path_lookup(self, method_name, argument, predicate):
+        # without an index, fall back to scanning the trace.
+        if self.path_index is None:
+            return [
+                syscall
+                for syscall in self.syscalls
+                if any(predicate(path) for path in indexes.syscall_paths(syscall))
+            ]
+
+        syscalls = self.syscalls
+        positions = getattr(self.path_index, method_name)(argument)
+        return [syscalls[position] for position in positions]
+
+    def between(self, start, end):
+        """
+        Return the system calls that start between start (included) and end
+        (excluded), in nanoseconds, ordered by start time.
+        """
+        if self.time_index is None:
+            return self._scan_time(lambda timestamp, elapsed: start <= timestamp < end)
+
+        syscalls = self.syscalls
+        return [syscalls[position] for position in self.time_index.window(start, end)]
+
+    def overlapping(self, start, end):
+        """
+        Return the system calls that were running at some point between start
+        (included) and end (excluded), in nanoseconds, ordered by start time.
+        This includes the calls that started earlier and blocked into the window.
+        """
+        if self.time_index is None:
+            return self._scan_time(
+                lambda timestamp, elapsed: timestamp < end
+                and timestamp + elapsed >= start
+            )
+
+        syscalls = self.syscalls
+        return [
+            syscalls[position] for position in self.time_index.overlapping(start, end)
+        ]
+
+    def _scan_time(self, predicate):
+        # without a time index, scan the trace and sort the matches.
+        matches = []
+        for syscall in self.syscalls:
+            if syscall.timestamp is None:
+                continue
+            elapsed = 0
+            if syscall.elapsed_time is not None:
+                elapsed = int(
+                    round(syscall.elapsed_time * indexes.NANOSECONDS_PER_SECOND)
+                )
+            if predicate(syscall.timestamp, elapsed):
+                matches.append(syscall)
+        matches.sort(key=lambda syscall: syscall.timestamp)
+        return matches
+
+    def _lookup(self, postings_name, key, predicate):
+        # without an index, fall back to scanning the trace.
+        if self.index is None:
+            return [syscall for syscall in self.syscalls if predicate(syscall)]
+
+        syscalls = self.syscalls
+        positions = getattr(self.index, postings_name).get(key, ())
+        return [syscalls[position] for position in positions]
+
     def __repr__(self):
         representation = (
             "<Trace\nplatform="
@@ -0,0 +1,328 @@
+"""
+<Purpose>
+  Streaming aggregation of system calls: counts, error counts and the total,
+  minimum, maximum and mean of a numeric field (the elapsed time of strace -T by
+  default), grouped by name, pid, error label or path. An Aggregator only keeps
+  one set of statistics per group, so it can be fed by StraceParser.iter_syscalls
+  to summarize traces that do not fit in memory, or passed as a sink to
+  parse_trace. Aggregators of parts of a trace, e.g. parsed by parallel workers,
+  are combined with merge().
+
+  Example using this module:
+
+    aggregator = aggregation.aggregate_trace(trace_path, pickle_file)
+    print(aggregator.format_summary())  # like strace -c
+
+    by_pid_and_errno = aggregation.Aggregator(group_by=("pid", "errno"))
+    syscalls = parser.parse_trace(sinks=[by_pid_and_errno])
+
+"""
+
+from builtins import object
+from builtins import str
+
+from . import indexes
+from .parsers.StraceParser import StraceParser
+
+
+def _get_name(syscall):
+    return [syscall.name]
+
+
+def _get_pid(syscall):
+    return [syscall.pid]
+
+
+def _get_type(syscall):
+    return [syscall.type]
+
+
+def _get_errno(syscall):
+    return [None if syscall.ret is None else syscall.ret[1]]
+
+
+def _get_path(syscall):
+    # a system call is counted once under each path it uses, or under None.
+    return indexes.syscall_paths(syscall) or [None]
+
+
+_KEY_GETTERS = {
+    "name": _get_name,
+    "pid": _get_pid,
+    "type": _get_type,
+    "errno": _get_errno,
+    "path": _get_path,
+}
+
+
+class Stats(object):
+    """
+    <Purpose>
+      The statistics of a group of system calls.
+
+    <Attributes>
+      self.count:
+        The number of system calls.
+
+      self.errors:
+        The number of system calls that failed with an error label.
+
+      self.timed:
+        The number of system calls that have the aggregated field.
+
+      self.total, self.minimum, self.maximum:
+        The sum, the smallest and the largest value of the aggregated field, or
+        0, None and None if no system call has it.
+    """
+
+    __slots__ = ("count", "errors", "timed", "total", "minimum", "maximum")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.timed = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+
+    @property
+    def mean(self):
+        if self.timed == 0:
+            return None
+        return self.total / float(self.timed)
+
+    def add(self, failed, value):
+        self.count += 1
+        if failed:
+            self.errors += 1
+        if value is not None:
+            self.timed += 1
+            self.total += value
+            if self.minimum is None or value < self.minimum:
+                self.minimum = value
+            if self.maximum is None or value > self.maximum:
+                self.maximum = value
+
+    def merge(self, other):
+        self.count += other.count
+        self.errors += other.errors
+        self.timed += other.timed
+        self.total += other.total
+        if other.minimum is not None and (
+            self.minimum is None or other.minimum < self.minimum
+        ):
+            self.minimum = other.minimum
+        if other.maximum is not None and (
+            self.maximum is None or other.maximum > self.maximum
+        ):
+            self.maximum = other.maximum
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.__getstate__() == other.__getstate__()
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return (
+            "<Stats count="
+            + str(self.count)
+            + " errors="
+            + str(self.errors)
+            + " total="
+            + str(self.total)
+            + " mean="
+            + str(self.mean)
+            + ">"
+        )
+
+
+class Aggregator(object):
+    """
+    <Purpose>
+      Aggregates system calls into one Stats per group.
+
+    <Attributes>
+      self.group_by:
+        The tuple of fields the system calls are grouped by, each one of
+        "name", "pid", "type", "errno" (the error label, None for successful
+        calls) and "path" (see indexes.syscall_paths).
+
+      self.value:
+        The name of the numeric Syscall attribute aggregated, e.g.
+        "elapsed_time", or None to only count system calls.
+
+      self.groups:
+        A dict mapping each group key to its Stats. The key is the value of the
+        field when grouping by one field, otherwise the tuple of the values.
+    """
+
+    def __init__(self, group_by="name", value="elapsed_time"):
+        if isinstance(group_by, str):
+            group_by = (group_by,)
+        for field in group_by:
+            if field not in _KEY_GETTERS:
+                raise ValueError("Cannot group system calls by " + repr(field))
+
+        self.group_by = tuple(group_by)
+        self.value = value
+        self.groups = {}
+
+    def add(self, syscall):
+        failed = syscall.ret is not None and syscall.ret[1] is not None
+        value = None
+        if self.value is not None:
+            value = getattr(syscall, self.value)
+
+        for key in self._keys(syscall):
+            stats = self.groups.get(key)
+            if stats is None:
+                stats = self.groups[key] = Stats()
+            stats.add(failed, value)
+
+    def _keys(self, syscall):
+        if len(self.group_by) == 1:
+            return _KEY_GETTERS[self.group_by[0]](syscall)
+
+        keys = [()]
+        for field in self.group_by:
+            keys = [
+                key + (part,) for key in keys for part in _KEY_GETTERS[field](syscall)
+            ]
+        return keys
+
+    def merge(self, other):
+        """
+        <Purpose>
+          Add the statistics of another Aggregator to this one, e.g. the
+          aggregator of another part of the trace.
+
+        <Arguments>
+          other:
+            An Aggregator with the same group_by and value.
+
+        <Exceptions>
+          ValueError:
+            If the aggregators group by or aggregate different fields.
+
+        <Side Effects>
+          Updates self.groups.
+
+        <Returns>
+          self, so that a list of aggregators can be merged with reduce().
+        """
+
+        if other.group_by != self.group_by or other.value != self.value:
+            raise ValueError("Cannot merge aggregators of different fields")
+
+        for key, other_stats in other.groups.items():
+            stats = self.groups.get(key)
+            if stats is None:
+                stats = self.groups[key] = Stats()
+            stats.merge(other_stats)
+        return self
+
+    def total(self):
+        """
+        Return the Stats of all the groups together. System calls using several
+        paths are counted once per path.
+        """
+        stats = Stats()
+        for group_stats in self.groups.values():
+            stats.merge(group_stats)
+        return stats
+
+    def format_summary(self):
+        """
+        Return a table of the groups like the one printed by strace -c, sorted
+        by decreasing time. Times are in seconds of the aggregated field.
+        """
+
+        rule = "------ ----------- ----------- --------- --------- ----------------"
+        lines = [
+            "% time     seconds  usecs/call     calls    errors "
+            + "/".join(self.group_by),
+            rule,
+        ]
+
+        total = self.total()
+        groups = sorted(
+            self.groups.items(), key=lambda item: (-item[1].total, str(item[0]))
+        )
+        for key, stats in groups:
+            lines.append(_format_row(key, stats, total.total))
+        lines.append(rule)
+        lines.append(_format_row("total", total, total.total, per_call=False))
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return (
+            "<Aggregator group_by="
+            + "/".join(self.group_by)
+            + " groups="
+            + str(len(self.groups))
+            + ">"
+        )
+
+
+def _format_row(key, stats, total_time, per_call=True):
+    if isinstance(key, tuple):
+        key = "/".join(str(part) for part in key)
+
+    share = 100.0 * stats.total / total_time if total_time else 0.0
+    usecs = ""
+    if per_call and stats.count:
+        usecs = str(int(stats.total * 1000000 / stats.count))
+    errors = str(stats.errors) if stats.errors else ""
+    return "%6.2f %11.6f %11s %9d %9s %s" % (
+        share,
+        stats.total,
+        usecs,
+        stats.count,
+        errors,
+        key,
+    )
+
+
+def aggregate_trace(
+    trace_path, pickle_file, group_by="name", value="elapsed_time", **parser_options
+):
+    """
+    <Purpose>
+      Aggregate the system calls of a trace file in one pass, without keeping
+      the parsed system calls.
+
+    <Arguments>
+      trace_path:
+        The path to the trace file.
+      pickle_file:
+        The path to the pickle file containing the parsed system call
+        representations.
+      group_by, value:
+        See Aggregator.
+      parser_options:
+        Keyword arguments passed on to the parser, e.g. error_budget. See
+        StraceParser.
+
+    <Exceptions>
+      See StraceParser.parse_trace.
+
+    <Side Effects>
+      None
+
+    <Returns>
+      An Aggregator of the system calls of the trace.
+    """
+
+    parser = StraceParser(trace_path, pickle_file, **parser_options)
+    aggregator = Aggregator(group_by, value)
+    for syscall in parser.iter_syscalls():
+        aggregator.add(syscall)
+    return aggregator
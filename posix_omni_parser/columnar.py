@@ -0,0 +1,467 @@
+"""
+<Purpose>
+  Export of parsed system calls to Apache Arrow and Parquet files, for
+  dataframe tools. System calls are added one at a time, e.g. straight from
+  StraceParser.iter_syscalls or as a parse_trace sink, and written as record
+  batches of batch_size rows, so memory stays bounded by the batch size
+  whatever the length of the trace.
+
+  Every file has the same schema (see arrow_schema), whatever the trace:
+
+    pid            int64
+    name           string
+    type           string     "unfinished", "resumed" or "complete"
+    ret            int64      the return value, if it is a number
+    ret_text       string     the return value otherwise: "?", hex, fcntl flags
+    errno          string     the error label, e.g. ENOENT
+    timestamp      int64      nanoseconds, see the timestamps module
+    elapsed_time   float64    seconds
+    inst_pointer   string
+    args           list<struct<type: string, int: int64, text: string,
+                               items: list<string>>>
+
+  Each argument is a struct holding the name of its parsing class in type and
+  its value in int (Int, FileDescriptor), items (Flags, Stat fields, Sockaddr
+  fields, PollFDPointer entries, Environment variables) or text (anything
+  else). Numbers that do not fit in an int64 are kept in text.
+
+  pyarrow is only needed to write files: pip install posix_omni_parser[arrow].
+
+  Example using this module:
+
+    columnar.export_trace(trace_path, pickle_file, "trace.parquet")
+
+    with columnar.ArrowExporter("trace.arrow", format="arrow") as exporter:
+        syscalls = parser.parse_trace(sinks=[exporter])
+
+"""
+
+from builtins import object
+from builtins import str
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from . import Syscall
+from . import parsing_classes
+from .parsers.StraceParser import StraceParser
+
+# stored in the metadata of the schema, and bumped whenever it changes.
+SCHEMA_VERSION = 1
+
+FORMATS = ("parquet", "arrow", "stream")
+
+_TYPE_NAMES = {
+    Syscall.Syscall.UNFINISHED: "unfinished",
+    Syscall.Syscall.RESUMED: "resumed",
+    Syscall.Syscall.COMPLETE: "complete",
+}
+
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+
+_COLUMNS = (
+    "pid",
+    "name",
+    "type",
+    "ret",
+    "ret_text",
+    "errno",
+    "timestamp",
+    "elapsed_time",
+    "inst_pointer",
+    "args",
+)
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError(
+            "pyarrow is needed to export to Arrow and Parquet, "
+            + "install posix_omni_parser[arrow]"
+        )
+
+
+def _list(item_type):
+    # lists name their items "element", like the Parquet format does, so that
+    # the schema reads back from Parquet files unchanged.
+    return pyarrow.list_(pyarrow.field("element", item_type))
+
+
+def arrow_schema():
+    """
+    <Purpose>
+      The Arrow schema of the exported system calls. See the module docstring.
+
+    <Arguments>
+      None
+
+    <Exceptions>
+      ImportError:
+        If pyarrow is not installed.
+
+    <Side Effects>
+      None
+
+    <Returns>
+      A pyarrow.Schema.
+    """
+
+    _require_pyarrow()
+    arg = pyarrow.struct(
+        [
+            ("type", pyarrow.string()),
+            ("int", pyarrow.int64()),
+            ("text", pyarrow.string()),
+            ("items", _list(pyarrow.string())),
+        ]
+    )
+    return pyarrow.schema(
+        [
+            ("pid", pyarrow.int64()),
+            ("name", pyarrow.string()),
+            ("type", pyarrow.string()),
+            ("ret", pyarrow.int64()),
+            ("ret_text", pyarrow.string()),
+            ("errno", pyarrow.string()),
+            ("timestamp", pyarrow.int64()),
+            ("elapsed_time", pyarrow.float64()),
+            ("inst_pointer", pyarrow.string()),
+            ("args", _list(arg)),
+        ],
+        metadata={"posix_omni_parser.schema_version": str(SCHEMA_VERSION)},
+    )
+
+
+def _fits(value):
+    return (
+        isinstance(value, int)
+        and not isinstance(value, bool)
+        and _INT64_MIN <= value <= _INT64_MAX
+    )
+
+
+def _arg_items(arg):
+    # the list of strings of the structured arguments, or None.
+    if isinstance(arg, (parsing_classes.Flags, parsing_classes.Environment)):
+        return [str(item) for item in arg.value]
+    if isinstance(arg, parsing_classes.Stat):
+        return list(arg.value)
+    if isinstance(arg, parsing_classes.PollFDPointer):
+        items = []
+        for fd, events, revents in (pollfd.value for pollfd in arg.value):
+            item = "{fd=" + str(fd) + ", events=" + events
+            if revents is not None:
+                item += ", revents=" + revents
+            items.append(item + "}")
+        return items
+    if isinstance(arg, parsing_classes.Sockaddr) and arg.address is not None:
+        address = arg.address
+        items = []
+        for field, value in (
+            ("family", address.family),
+            ("port", address.port),
+            ("address", address.host),
+            ("path", address.path),
+        ):
+            if value is not None:
+                items.append(field + "=" + str(value))
+        return items
+    return None
+
+
+def arg_record(arg):
+    """
+    <Purpose>
+      Encode a system call argument as a struct of the args column.
+
+    <Arguments>
+      arg:
+        A ParsingClass object, e.g. an element of Syscall.args.
+
+    <Exceptions>
+      None
+
+    <Side Effects>
+      None
+
+    <Returns>
+      A dict with the type, int, text and items keys.
+    """
+
+    record = {
+        "type": arg.__class__.__name__,
+        "int": None,
+        "text": None,
+        "items": None,
+    }
+
+    if isinstance(arg, parsing_classes.MissingValue):
+        record["text"] = arg.given_value
+        return record
+
+    items = _arg_items(arg)
+    if items is not None:
+        record["items"] = items
+        return record
+
+    value = arg.value
+    if _fits(value):
+        record["int"] = value
+    elif value is not None:
+        record["text"] = str(arg)
+    return record
+
+
+class RecordBatchBuilder(object):
+    """
+    <Purpose>
+      Collects system calls into the columns of a record batch.
+
+    <Attributes>
+      self.batch_size:
+        The number of rows of the batches.
+
+      self.columns:
+        A dict mapping each column name to the list of its pending values.
+
+      self.rows:
+        The number of pending rows.
+    """
+
+    def __init__(self, batch_size=65536):
+        if batch_size < 1:
+            raise ValueError("The batch size must be positive, not " + str(batch_size))
+
+        self.batch_size = batch_size
+        self.columns = dict((column, []) for column in _COLUMNS)
+        self.rows = 0
+
+    def add(self, syscall):
+        """
+        Add a system call. Returns a full pyarrow.RecordBatch once batch_size
+        rows are pending, None otherwise.
+        """
+
+        columns = self.columns
+        columns["pid"].append(syscall.pid)
+        columns["name"].append(syscall.name)
+        columns["type"].append(_TYPE_NAMES[syscall.type])
+
+        value = error = None
+        if syscall.ret is not None:
+            value, error = syscall.ret
+        if _fits(value):
+            columns["ret"].append(value)
+            columns["ret_text"].append(None)
+        else:
+            columns["ret"].append(None)
+            if isinstance(value, list):
+                value = "|".join(value)
+            columns["ret_text"].append(None if value is None else str(value))
+        columns["errno"].append(error)
+
+        columns["timestamp"].append(syscall.timestamp)
+        columns["elapsed_time"].append(syscall.elapsed_time)
+        columns["inst_pointer"].append(syscall.inst_pointer)
+        if syscall.args is None:
+            columns["args"].append(None)
+        else:
+            columns["args"].append([arg_record(arg) for arg in syscall.args])
+
+        self.rows += 1
+        if self.rows >= self.batch_size:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """
+        Return the pending rows as a pyarrow.RecordBatch, or None if there are
+        none, and start a new batch.
+        """
+
+        if self.rows == 0:
+            return None
+
+        schema = arrow_schema()
+        arrays = [
+            pyarrow.array(self.columns[field.name], type=field.type) for field in schema
+        ]
+        self.columns = dict((column, []) for column in _COLUMNS)
+        self.rows = 0
+        return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class ArrowExporter(object):
+    """
+    <Purpose>
+      Writes system calls to an Arrow or Parquet file, one record batch at a
+      time. It can be passed as a sink to StraceParser.parse_trace, and must be
+      closed, or used as a context manager, for the last batch to be written.
+
+    <Attributes>
+      self.path:
+        The path of the file written.
+
+      self.format:
+        "parquet", "arrow" (the Arrow IPC file format, also known as Feather
+        version 2) or "stream" (the Arrow IPC streaming format).
+
+      self.count:
+        The number of system calls added.
+    """
+
+    def __init__(
+        self,
+        path,
+        format="parquet",
+        batch_size=65536,
+        compression="zstd",
+        row_group_size=None,
+    ):
+        """
+        <Purpose>
+          Open the file to write.
+
+        <Arguments>
+          path:
+            The path of the file.
+          format:
+            One of FORMATS, see self.format.
+          batch_size:
+            The number of rows buffered before a record batch is written.
+          compression:
+            The compression codec, or None. Parquet supports "snappy", "gzip",
+            "brotli", "lz4" and "zstd", Arrow files and streams "lz4" and "zstd".
+          row_group_size:
+            The largest number of rows of a Parquet row group, or None for one
+            row group per record batch. Row groups never span batches, so
+            values above batch_size act as batch_size.
+
+        <Exceptions>
+          ImportError:
+            If pyarrow is not installed.
+          ValueError:
+            If the format is unknown.
+
+        <Side Effects>
+          Creates the file.
+
+        <Returns>
+          None
+        """
+
+        _require_pyarrow()
+        if format not in FORMATS:
+            raise ValueError("Unknown export format: " + repr(format))
+
+        self.path = path
+        self.format = format
+        self.row_group_size = row_group_size
+        self.count = 0
+        self._builder = RecordBatchBuilder(batch_size)
+
+        schema = arrow_schema()
+        if format == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(
+                path, schema, compression=compression or "none"
+            )
+        else:
+            options = pyarrow.ipc.IpcWriteOptions(compression=compression)
+            if format == "arrow":
+                self._writer = pyarrow.ipc.new_file(path, schema, options=options)
+            else:
+                self._writer = pyarrow.ipc.new_stream(path, schema, options=options)
+
+    def add(self, syscall):
+        self.count += 1
+        batch = self._builder.add(syscall)
+        if batch is not None:
+            self._write(batch)
+
+    def _write(self, batch):
+        if self.format == "parquet":
+            self._writer.write_batch(batch, row_group_size=self.row_group_size)
+        else:
+            self._writer.write_batch(batch)
+
+    def close(self):
+        """
+        Write the pending rows and close the file.
+        """
+        if self._writer is None:
+            return
+        batch = self._builder.flush()
+        if batch is not None:
+            self._write(batch)
+        self._writer.close()
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return (
+            "<ArrowExporter "
+            + self.path
+            + " format="
+            + self.format
+            + " syscalls="
+            + str(self.count)
+            + ">"
+        )
+
+
+def export_trace(
+    trace_path,
+    pickle_file,
+    output_path,
+    format="parquet",
+    batch_size=65536,
+    compression="zstd",
+    row_group_size=None,
+    **parser_options
+):
+    """
+    <Purpose>
+      Export the system calls of a trace file in one pass, without keeping the
+      parsed system calls.
+
+    <Arguments>
+      trace_path:
+        The path to the trace file.
+      pickle_file:
+        The path to the pickle file containing the parsed system call
+        representations.
+      output_path:
+        The path of the file to write.
+      format, batch_size, compression, row_group_size:
+        See ArrowExporter.
+      parser_options:
+        Keyword arguments passed on to the parser, e.g. error_budget. See
+        StraceParser.
+
+    <Exceptions>
+      See ArrowExporter and StraceParser.parse_trace.
+
+    <Side Effects>
+      Writes output_path.
+
+    <Returns>
+      The number of system calls exported.
+    """
+
+    parser = StraceParser(trace_path, pickle_file, **parser_options)
+    with ArrowExporter(
+        output_path, format, batch_size, compression, row_group_size
+    ) as exporter:
+        for syscall in parser.iter_syscalls():
+            exporter.add(syscall)
+    return exporter.count
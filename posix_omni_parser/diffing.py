@@ -0,0 +1,448 @@
+"""
+<Purpose>
+  Compares two traces of the same program, e.g. a recorded trace and a replay
+  of it. Every system call is reduced to a signature of its name, arguments and
+  return value, with the parts expected to change between runs (pointers,
+  times) masked, and each distinct signature is interned to an int. The
+  sequences of signatures of each process are then diffed: common prefixes and
+  suffixes are stripped, the calls occurring exactly once in both sides anchor
+  the alignment (patience diff) and the gaps between anchors are diffed with
+  Myers' algorithm, which gives up in favour of a plain replacement for gaps
+  that differ too much.
+
+  Example using this module:
+
+    for pid_diff in diffing.diff_traces(recorded.syscalls, replayed.syscalls):
+        for tag, i1, i2, j1, j2 in pid_diff.opcodes:
+            if tag != "equal":
+                print(tag, pid_diff.syscalls_a(recorded.syscalls)[i1:i2])
+
+"""
+
+from builtins import object
+from builtins import range
+from builtins import str
+import array
+import re
+
+# hexadecimal numbers of 6 digits or more are taken to be pointers.
+_POINTER = re.compile(r"\b0x[0-9a-fA-F]{6,}\b")
+
+# time fields of structures, e.g. st_mtime=1614797952.
+_TIME_FIELD = re.compile(r"(\b\w*time\w*=)[^,}\]]+")
+
+# system calls returning pids.
+_PID_RETURNS = set(
+    [
+        "clone",
+        "clone3",
+        "fork",
+        "vfork",
+        "wait4",
+        "waitpid",
+        "getpid",
+        "getppid",
+        "gettid",
+    ]
+)
+
+
+class Signer(object):
+    """
+    <Purpose>
+      Reduces system calls to interned signatures. Traces compared with each
+      other must be signed by the same Signer, so that equal signatures get
+      equal ints.
+
+    <Attributes>
+      self.mask_pointers:
+        Whether hexadecimal numbers of 6 digits or more, in arguments and
+        return values, are masked.
+
+      self.mask_times:
+        Whether the time fields of structure arguments (st_atime=...) are
+        masked. The timestamp and elapsed time of a system call are never part
+        of its signature.
+
+      self.mask_pids:
+        Whether the pids returned by clone, fork, wait4, getpid... are masked,
+        as they change from a run to the next.
+
+      self.mask_returns:
+        Whether return values are left out of the signatures. Error labels are
+        kept.
+
+      self.signatures:
+        A dict mapping each signature tuple to its int.
+    """
+
+    def __init__(
+        self, mask_pointers=True, mask_times=True, mask_pids=True, mask_returns=False
+    ):
+        self.mask_pointers = mask_pointers
+        self.mask_times = mask_times
+        self.mask_pids = mask_pids
+        self.mask_returns = mask_returns
+        self.signatures = {}
+
+    def _normalize(self, text):
+        if self.mask_pointers:
+            text = _POINTER.sub("0x?", text)
+        if self.mask_times:
+            text = _TIME_FIELD.sub(r"\1?", text)
+        return text
+
+    def sign(self, syscall):
+        """
+        Return the int of the signature of a system call.
+        """
+
+        args = []
+        # the arguments of unknown syscall_NNN calls are not parsed, so only
+        # their names and returns are signed.
+        for arg in syscall.args or ():
+            value = getattr(arg, "value", None)
+            # MissingValue arguments have no value.
+            args.append(None if value is None else self._normalize(str(arg)))
+
+        ret = syscall.ret
+        if ret is not None:
+            value, error = ret
+            if self.mask_returns:
+                value = None
+            elif self.mask_pids and syscall.name in _PID_RETURNS and error is None:
+                value = "pid"
+            elif isinstance(value, str):
+                value = self._normalize(value)
+            ret = (value, error)
+
+        signature = (syscall.name, tuple(args), ret)
+        number = self.signatures.get(signature)
+        if number is None:
+            number = self.signatures[signature] = len(self.signatures)
+        return number
+
+
+def _myers(a, b, alo, ahi, blo, bhi, max_cost, matches):
+    # Myers' O(ND) diff of a[alo:ahi] and b[blo:bhi], appending the matched
+    # pairs to matches. Returns False, without matching anything, if more than
+    # max_cost insertions and deletions are needed.
+    n = ahi - alo
+    m = bhi - blo
+    v = {1: 0}
+    trace = []
+    for d in range(min(n + m, max_cost) + 1):
+        trace.append(v.copy())
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                _backtrack(trace, n, m, alo, blo, matches)
+                return True
+    return False
+
+
+def _backtrack(trace, x, y, alo, blo, matches):
+    pairs = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1] < v[k + 1]):
+            previous_k = k + 1
+        else:
+            previous_k = k - 1
+        previous_x = v[previous_k]
+        previous_y = previous_x - previous_k
+        while x > previous_x and y > previous_y:
+            x -= 1
+            y -= 1
+            pairs.append((alo + x, blo + y))
+        x, y = previous_x, previous_y
+    pairs.reverse()
+    matches.extend(pairs)
+
+
+def _anchors(a, b, alo, ahi, blo, bhi):
+    # the pairs of positions of the signatures occurring exactly once in both
+    # ranges, reduced to their longest increasing subsequence.
+    counts_a = {}
+    first_a = {}
+    for i in range(alo, ahi):
+        counts_a[a[i]] = counts_a.get(a[i], 0) + 1
+        first_a.setdefault(a[i], i)
+    counts_b = {}
+    first_b = {}
+    for j in range(blo, bhi):
+        counts_b[b[j]] = counts_b.get(b[j], 0) + 1
+        first_b.setdefault(b[j], j)
+
+    pairs = sorted(
+        (first_a[signature], first_b[signature])
+        for signature, count in counts_a.items()
+        if count == 1 and counts_b.get(signature) == 1
+    )
+    if not pairs:
+        return pairs
+
+    # patience sorting: tails[l] is the index in pairs of the smallest j ending
+    # an increasing subsequence of length l + 1.
+    tails = []
+    tail_js = []
+    previous = [None] * len(pairs)
+    for index, (i, j) in enumerate(pairs):
+        low, high = 0, len(tail_js)
+        while low < high:
+            middle = (low + high) // 2
+            if tail_js[middle] < j:
+                low = middle + 1
+            else:
+                high = middle
+        if low > 0:
+            previous[index] = tails[low - 1]
+        if low == len(tails):
+            tails.append(index)
+            tail_js.append(j)
+        else:
+            tails[low] = index
+            tail_js[low] = j
+
+    anchors = []
+    index = tails[-1]
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _match(a, b, alo, ahi, blo, bhi, max_cost, matches):
+    # append the matched pairs of a[alo:ahi] and b[blo:bhi] to matches.
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        matches.append((alo, blo))
+        alo += 1
+        blo += 1
+
+    suffix = []
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+        suffix.append((ahi, bhi))
+
+    if alo < ahi and blo < bhi:
+        anchors = _anchors(a, b, alo, ahi, blo, bhi)
+        if anchors:
+            for i, j in anchors:
+                _match(a, b, alo, i, blo, j, max_cost, matches)
+                matches.append((i, j))
+                alo, blo = i + 1, j + 1
+            _match(a, b, alo, ahi, blo, bhi, max_cost, matches)
+        else:
+            # without anchors, the gap is left as a replacement if Myers'
+            # algorithm gives up on it.
+            _myers(a, b, alo, ahi, blo, bhi, max_cost, matches)
+
+    suffix.reverse()
+    matches.extend(suffix)
+
+
+def diff_signatures(a, b, max_cost=1000):
+    """
+    <Purpose>
+      Diff two sequences of signatures.
+
+    <Arguments>
+      a, b:
+        Sequences of ints.
+      max_cost:
+        The largest number of insertions and deletions Myers' algorithm looks
+        for in a gap between two anchors. Larger gaps are reported as replaced
+        as a whole.
+
+    <Exceptions>
+      None
+
+    <Side Effects>
+      None
+
+    <Returns>
+      A list of opcodes (tag, i1, i2, j1, j2) like the ones of
+      difflib.SequenceMatcher.get_opcodes: tag is "equal", "replace", "delete"
+      or "insert", and a[i1:i2] is turned into b[j1:j2].
+    """
+
+    matches = []
+    _match(a, b, 0, len(a), 0, len(b), max_cost, matches)
+    matches.append((len(a), len(b)))
+
+    opcodes = []
+    i = j = 0
+    for match_i, match_j in matches:
+        if i < match_i and j < match_j:
+            opcodes.append(("replace", i, match_i, j, match_j))
+        elif i < match_i:
+            opcodes.append(("delete", i, match_i, j, j))
+        elif j < match_j:
+            opcodes.append(("insert", i, i, j, match_j))
+
+        if match_i < len(a):
+            if opcodes and opcodes[-1][0] == "equal":
+                tag, i1, _, j1, _ = opcodes[-1]
+                opcodes[-1] = ("equal", i1, match_i + 1, j1, match_j + 1)
+            else:
+                opcodes.append(("equal", match_i, match_i + 1, match_j, match_j + 1))
+        i, j = match_i + 1, match_j + 1
+    return opcodes
+
+
+class PidDiff(object):
+    """
+    <Purpose>
+      The diff of the system calls of a process of one trace against the ones of
+      the matching process of the other trace.
+
+    <Attributes>
+      self.pid_a, self.pid_b:
+        The pids of the processes, or None for a process without a match in
+        the other trace.
+
+      self.positions_a, self.positions_b:
+        Arrays of the positions of the system calls of the processes in their
+        traces.
+
+      self.opcodes:
+        The opcodes of the diff, see diff_signatures. Their indexes are indexes
+        of positions_a and positions_b.
+    """
+
+    def __init__(self, pid_a, pid_b, positions_a, positions_b, opcodes):
+        self.pid_a = pid_a
+        self.pid_b = pid_b
+        self.positions_a = positions_a
+        self.positions_b = positions_b
+        self.opcodes = opcodes
+
+    @property
+    def is_equal(self):
+        return all(opcode[0] == "equal" for opcode in self.opcodes)
+
+    @property
+    def distance(self):
+        """
+        The number of system calls deleted and inserted.
+        """
+        return sum(
+            (i2 - i1) + (j2 - j1)
+            for tag, i1, i2, j1, j2 in self.opcodes
+            if tag != "equal"
+        )
+
+    def syscalls_a(self, syscalls):
+        return [syscalls[position] for position in self.positions_a]
+
+    def syscalls_b(self, syscalls):
+        return [syscalls[position] for position in self.positions_b]
+
+    def __repr__(self):
+        return (
+            "<PidDiff pid_a="
+            + str(self.pid_a)
+            + " pid_b="
+            + str(self.pid_b)
+            + " distance="
+            + str(self.distance)
+            + ">"
+        )
+
+
+def _split_by_pid(syscalls, signer):
+    # pid -> (positions, signatures), and the pids in order of appearance.
+    sequences = {}
+    pids = []
+    for position, syscall in enumerate(syscalls):
+        sequence = sequences.get(syscall.pid)
+        if sequence is None:
+            sequence = sequences[syscall.pid] = (array.array("q"), array.array("q"))
+            pids.append(syscall.pid)
+        sequence[0].append(position)
+        sequence[1].append(signer.sign(syscall))
+    return sequences, pids
+
+
+def diff_traces(syscalls_a, syscalls_b, signer=None, pid_map=None, max_cost=1000):
+    """
+    <Purpose>
+      Diff the system calls of two traces, process by process.
+
+    <Arguments>
+      syscalls_a, syscalls_b:
+        The lists of Syscall objects of the traces, e.g. Trace.syscalls.
+      signer:
+        The Signer to use, or None for one with the default masks.
+      pid_map:
+        A dict mapping pids of the first trace to the pids of the matching
+        processes of the second, or None to match the processes in the order
+        they appear in the traces, which suits replays where pids differ.
+      max_cost:
+        See diff_signatures.
+
+    <Exceptions>
+      None
+
+    <Side Effects>
+      Adds the signatures of the traces to the signer.
+
+    <Returns>
+      A list of PidDiff, one per process of the first trace in order of
+      appearance, followed by the processes of the second trace left without a
+      match.
+    """
+
+    if signer is None:
+        signer = Signer()
+
+    sequences_a, pids_a = _split_by_pid(syscalls_a, signer)
+    sequences_b, pids_b = _split_by_pid(syscalls_b, signer)
+
+    if pid_map is None:
+        pid_map = dict(zip(pids_a, pids_b))
+
+    empty = (array.array("q"), array.array("q"))
+    diffs = []
+    matched_b = set()
+    for pid_a in pids_a:
+        pid_b = pid_map.get(pid_a)
+        if pid_b not in sequences_b:
+            pid_b = None
+        positions_a, signatures_a = sequences_a[pid_a]
+        positions_b, signatures_b = sequences_b.get(pid_b, empty)
+        matched_b.add(pid_b)
+        diffs.append(
+            PidDiff(
+                pid_a,
+                pid_b,
+                positions_a,
+                positions_b,
+                diff_signatures(signatures_a, signatures_b, max_cost),
+            )
+        )
+
+    for pid_b in pids_b:
+        if pid_b not in matched_b:
+            positions_b, signatures_b = sequences_b[pid_b]
+            diffs.append(
+                PidDiff(
+                    None,
+                    pid_b,
+                    empty[0],
+                    positions_b,
+                    diff_signatures(empty[1], signatures_b, max_cost),
+                )
+            )
+    return diffs
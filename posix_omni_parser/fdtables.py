@@ -0,0 +1,521 @@
+"""
+<Purpose>
+  Per-process file descriptor tables, maintained incrementally while a trace is
+  parsed by passing an FdTracker as a sink to StraceParser.parse_trace.
+
+  Every file descriptor of a table keeps the history of the resources it
+  referred to, as the positions at which each one was installed. Looking up
+  what a file descriptor refers to at any system call is a binary search in
+  that history, instead of a replay of the trace up to that call.
+
+  Example using this module:
+
+    tracker = fdtables.FdTracker()
+    syscalls = parser.parse_trace(sinks=[tracker])
+    # what fd 5 of pid 1234 refers to when the 100th system call runs.
+    resource = tracker.resource(1234, 5, 100)
+
+"""
+
+from builtins import object
+import array
+import bisect
+import collections
+import posixpath
+import re
+
+from . import Syscall
+from . import parsing_classes
+
+# what a file descriptor refers to. kind is one of "file", "socket", "pipe" or
+# "anon" (eventfd, epoll, memfd...). name is the path of a file, the domain of
+# a socket, the end of a pipe ("read" or "write") or the name of the system
+# call that created an anonymous file descriptor. position is the position of
+# the system call that created the resource, which tells apart resources with
+# the same name. Duplicated file descriptors share the same resource.
+Resource = collections.namedtuple("Resource", "kind name position")
+
+# system calls creating anonymous file descriptors.
+_ANON_SYSCALLS = set(
+    [
+        "eventfd",
+        "eventfd2",
+        "epoll_create",
+        "epoll_create1",
+        "signalfd",
+        "signalfd4",
+        "timerfd_create",
+        "inotify_init",
+        "inotify_init1",
+        "memfd_create",
+        "userfaultfd",
+        "perf_event_open",
+        "bpf",
+        "pidfd_open",
+    ]
+)
+
+_FLAG_SEPARATORS = re.compile(r"[|{}=\s]+")
+
+
+def _text(arg):
+    # the text of an argument as found in the trace, or "" if it is missing.
+    value = getattr(arg, "value", None)
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "|".join(str(item) for item in value)
+    return str(value)
+
+
+def _flags(syscall):
+    # the words of the arguments that may hold flags.
+    words = []
+    for arg in syscall.args:
+        if not isinstance(arg, parsing_classes.Filepath):
+            words.extend(_FLAG_SEPARATORS.split(_text(arg)))
+    return words
+
+
+def has_flag(syscall, flag):
+    """
+    Return whether a flag, e.g. "O_CLOEXEC" or "CLONE_FILES", is set in the
+    arguments of a system call.
+    """
+    return flag in _flags(syscall)
+
+
+def _is_cloexec(syscall):
+    # O_CLOEXEC, SOCK_CLOEXEC, EFD_CLOEXEC, F_DUPFD_CLOEXEC...
+    return any(word.endswith("_CLOEXEC") for word in _flags(syscall))
+
+
+def _fd_arg(syscall, index):
+    # the file descriptor argument at index, or None if it is not one.
+    if index >= len(syscall.args):
+        return None
+    try:
+        return int(_text(syscall.args[index]).strip("[] "))
+    except ValueError:
+        return None
+
+
+def _returned_fd(syscall):
+    # the file descriptor returned by a successful system call, or None.
+    if syscall.ret is None or syscall.ret[1] is not None:
+        return None
+    value = syscall.ret[0]
+    if not isinstance(value, int) or value < 0:
+        return None
+    return value
+
+
+class _FdHistory(object):
+    """
+    The resources a file descriptor referred to. resources[i] was installed at
+    position starts[i] and a None resource marks the file descriptor closed.
+    """
+
+    def __init__(self):
+        self.starts = array.array("q")
+        self.resources = []
+
+    def set(self, position, resource):
+        if self.starts and self.starts[-1] == position:
+            # a later change at the same position replaces the earlier one.
+            self.resources[-1] = resource
+            return
+        self.starts.append(position)
+        self.resources.append(resource)
+
+    def insert(self, position, resource):
+        # like set, for changes that may come before the last one.
+        index = bisect.bisect_right(self.starts, position)
+        if index and self.starts[index - 1] == position:
+            self.resources[index - 1] = resource
+            return
+        self.starts.insert(index, position)
+        self.resources.insert(index, resource)
+
+    def current(self):
+        if not self.resources:
+            return None
+        return self.resources[-1]
+
+    def at(self, position):
+        index = bisect.bisect_right(self.starts, position) - 1
+        if index < 0:
+            return None
+        return self.resources[index]
+
+
+class FdTable(object):
+    """
+    <Purpose>
+      The file descriptor table of a process, shared by the processes created
+      with CLONE_FILES.
+
+    <Attributes>
+      self.histories:
+        A dict mapping each file descriptor ever used in the table to its
+        _FdHistory.
+
+      self.cloexec:
+        The set of open file descriptors marked close-on-exec.
+    """
+
+    def __init__(self):
+        self.histories = {}
+        self.cloexec = set()
+
+    def install(self, position, fd, resource, cloexec=False):
+        history = self.histories.get(fd)
+        if history is None:
+            history = self.histories[fd] = _FdHistory()
+        history.set(position, resource)
+
+        if cloexec:
+            self.cloexec.add(fd)
+        else:
+            self.cloexec.discard(fd)
+
+    def close(self, position, fd):
+        # file descriptors never seen are closed too: they may have been
+        # inherited by a child that ran before its clone returned in the trace.
+        if fd not in self.histories or self.current(fd) is not None:
+            self.install(position, fd, None)
+
+    def current(self, fd):
+        history = self.histories.get(fd)
+        if history is None:
+            return None
+        return history.current()
+
+    def resource(self, fd, position=None):
+        history = self.histories.get(fd)
+        if history is None:
+            return None
+        if position is None:
+            return history.current()
+        return history.at(position)
+
+    def open_fds(self, position=None):
+        fds = {}
+        for fd in self.histories:
+            resource = self.resource(fd, position)
+            if resource is not None:
+                fds[fd] = resource
+        return fds
+
+
+class FdTracker(object):
+    """
+    <Purpose>
+      Maintains the file descriptor table of every process of a trace from the
+      system calls that open, duplicate and close file descriptors, and from
+      the clone, fork, vfork and execve calls that copy, share and close them.
+
+      The changes made by the system call at position N take effect at N + 1,
+      so a lookup at position N gives what a file descriptor refers to when
+      that system call runs. Tables are only known from the trace, so the file
+      descriptors a process inherited from outside of it (e.g. 0, 1 and 2 of
+      the traced command) refer to no resource.
+
+    <Attributes>
+      self.count:
+        The number of system calls added so far.
+
+      self.tables:
+        A dict mapping each pid to its FdTable. Processes sharing their table
+        map to the same FdTable.
+
+      self.clone_starts:
+        A dict mapping the pids in an unfinished clone, fork or vfork to the
+        position of its unfinished system call. The child may run before the
+        call is resumed.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.tables = {}
+        self.clone_starts = {}
+
+    def add(self, syscall):
+        position = self.count
+        self.count += 1
+
+        name = syscall.name
+        if name.endswith("64"):
+            name = name[:-2]
+
+        if name in ("open", "openat", "openat2", "creat"):
+            self._open(syscall, position)
+        elif name in ("socket", "accept", "accept4"):
+            self._socket(syscall, position)
+        elif name in ("pipe", "pipe2", "socketpair"):
+            self._pipe(syscall, position)
+        elif name in ("dup", "dup2", "dup3"):
+            self._dup(syscall, position)
+        elif name == "fcntl":
+            self._fcntl(syscall, position)
+        elif name == "close":
+            self._close(syscall, position)
+        elif name in ("clone", "clone3", "fork", "vfork"):
+            if syscall.type == Syscall.Syscall.UNFINISHED:
+                self.clone_starts[syscall.pid] = position
+            else:
+                self._fork(syscall, position)
+        elif name == "execve" or name == "execveat":
+            self._execve(syscall, position)
+        elif name in _ANON_SYSCALLS:
+            fd = _returned_fd(syscall)
+            if fd is not None:
+                self._table(syscall.pid).install(
+                    position + 1,
+                    fd,
+                    Resource("anon", syscall.name, position),
+                    _is_cloexec(syscall),
+                )
+
+    def resource(self, pid, fd, position=None):
+        """
+        <Purpose>
+          Look up what a file descriptor of a process refers to.
+
+        <Arguments>
+          pid:
+            The pid of the process.
+          fd:
+            The file descriptor.
+          position:
+            The position of a system call in the trace. The lookup gives what
+            the file descriptor refers to when that system call runs. None for
+            the state after the last system call added.
+
+        <Exceptions>
+          None
+
+        <Side Effects>
+          None
+
+        <Returns>
+          The Resource the file descriptor refers to, or None if it is not open
+          or was opened outside of the trace.
+        """
+
+        table = self.tables.get(pid)
+        if table is None:
+            return None
+        return table.resource(fd, position)
+
+    def open_fds(self, pid, position=None):
+        """
+        Return a dict mapping the open file descriptors of a process to the
+        resources they refer to, when the system call at position runs, or
+        after the last system call added if position is None.
+        """
+
+        table = self.tables.get(pid)
+        if table is None:
+            return {}
+        return table.open_fds(position)
+
+    def _table(self, pid):
+        table = self.tables.get(pid)
+        if table is None:
+            table = self.tables[pid] = FdTable()
+        return table
+
+    def _open(self, syscall, position):
+        fd = _returned_fd(syscall)
+        if fd is None:
+            return
+
+        path = None
+        dirfd = None
+        for arg in syscall.args:
+            if isinstance(arg, parsing_classes.Filepath):
+                path = arg.value
+                break
+            if isinstance(arg, parsing_classes.FileDescriptor):
+                dirfd = arg.value
+
+        table = self._table(syscall.pid)
+        # relative paths of openat are relative to the directory dirfd refers to.
+        if path is not None and isinstance(dirfd, int) and not path.startswith("/"):
+            directory = table.current(dirfd)
+            if directory is not None and directory.kind == "file":
+                path = posixpath.join(directory.name, path)
+
+        table.install(
+            position + 1,
+            fd,
+            Resource("file", path, position),
+            _is_cloexec(syscall),
+        )
+
+    def _socket(self, syscall, position):
+        fd = _returned_fd(syscall)
+        if fd is None:
+            return
+
+        table = self._table(syscall.pid)
+        if syscall.name == "socket":
+            domain = _text(syscall.args[0]) if syscall.args else None
+        else:
+            # accepted connections have the domain of the listening socket.
+            listening = table.current(_fd_arg(syscall, 0))
+            domain = listening.name if listening is not None else None
+
+        table.install(
+            position + 1,
+            fd,
+            Resource("socket", domain, position),
+            _is_cloexec(syscall),
+        )
+
+    def _pipe(self, syscall, position):
+        if _returned_fd(syscall) is None:
+            return
+
+        # the file descriptor array is split over the last two arguments.
+        if syscall.name == "socketpair":
+            index = 3
+            kind = "socket"
+            names = (_text(syscall.args[0]),) * 2
+        else:
+            index = 0
+            kind = "pipe"
+            names = ("read", "write")
+
+        fds = (_fd_arg(syscall, index), _fd_arg(syscall, index + 1))
+        cloexec = _is_cloexec(syscall)
+        table = self._table(syscall.pid)
+        for fd, name in zip(fds, names):
+            if fd is not None:
+                table.install(position + 1, fd, Resource(kind, name, position), cloexec)
+
+    def _dup(self, syscall, position):
+        fd = _returned_fd(syscall)
+        if fd is None:
+            return
+
+        table = self._table(syscall.pid)
+        table.install(
+            position + 1,
+            fd,
+            table.current(_fd_arg(syscall, 0)),
+            _is_cloexec(syscall),
+        )
+
+    def _fcntl(self, syscall, position):
+        if _returned_fd(syscall) is None:
+            return
+
+        table = self._table(syscall.pid)
+        fd = _fd_arg(syscall, 0)
+        if has_flag(syscall, "F_DUPFD") or has_flag(syscall, "F_DUPFD_CLOEXEC"):
+            table.install(
+                position + 1,
+                syscall.ret[0],
+                table.current(fd),
+                has_flag(syscall, "F_DUPFD_CLOEXEC"),
+            )
+        elif has_flag(syscall, "F_SETFD") and table.current(fd) is not None:
+            if has_flag(syscall, "FD_CLOEXEC"):
+                table.cloexec.add(fd)
+            else:
+                table.cloexec.discard(fd)
+
+    def _close(self, syscall, position):
+        # close releases the file descriptor even when it fails, unless it was
+        # not open.
+        if syscall.ret is not None and syscall.ret[1] == "EBADF":
+            return
+
+        fd = _fd_arg(syscall, 0)
+        if fd is not None:
+            self._table(syscall.pid).close(position + 1, fd)
+
+    def _fork(self, syscall, position):
+        start = position
+        if syscall.type == Syscall.Syscall.RESUMED:
+            start = self.clone_starts.pop(syscall.pid, position)
+
+        child = _returned_fd(syscall)
+        # the child returns 0, the parent returns its pid.
+        if not child:
+            return
+
+        parent = self._table(syscall.pid)
+        table = self.tables.get(child)
+        if table is parent:
+            table = None
+
+        # the file descriptors the child changed before the clone was resumed
+        # in the trace. The others belong to an exited process with the same
+        # pid.
+        changed = set()
+        if table is not None:
+            changed = set(
+                fd
+                for fd, history in table.histories.items()
+                if history.starts[-1] > start
+            )
+
+        if has_flag(syscall, "CLONE_FILES"):
+            for fd in changed:
+                history = table.histories[fd]
+                merged = parent.histories.get(fd)
+                if merged is None:
+                    merged = parent.histories[fd] = _FdHistory()
+                for change, resource in zip(history.starts, history.resources):
+                    if change > start:
+                        merged.insert(change, resource)
+                if merged.starts[-1] == history.starts[-1]:
+                    if fd in table.cloexec:
+                        parent.cloexec.add(fd)
+                    else:
+                        parent.cloexec.discard(fd)
+            self.tables[child] = parent
+            return
+
+        # the child gets a copy of the table of its parent when the clone
+        # starts, under the changes it made since. A reused pid keeps its table,
+        # with the file descriptors of the process that exited closed, so
+        # lookups at earlier positions still find them.
+        if table is None:
+            table = self.tables[child] = FdTable()
+        for fd in set(table.histories) | set(parent.histories):
+            inherited = None
+            if fd in parent.histories:
+                inherited = parent.histories[fd].at(start + 1)
+            history = table.histories.get(fd)
+            if history is None:
+                if inherited is None:
+                    continue
+                history = table.histories[fd] = _FdHistory()
+            if history.at(start + 1) != inherited:
+                history.insert(start + 1, inherited)
+            if fd not in changed:
+                if inherited is not None and fd in parent.cloexec:
+                    table.cloexec.add(fd)
+                else:
+                    table.cloexec.discard(fd)
+
+    def _execve(self, syscall, position):
+        if syscall.ret is None or syscall.ret[1] is not None:
+            return
+
+        table = self._table(syscall.pid)
+        for fd in list(table.cloexec):
+            table.close(position + 1, fd)
+
+    def __repr__(self):
+        return (
+            "<FdTracker syscalls="
+            + str(self.count)
+            + " pids="
+            + str(len(self.tables))
+            + ">"
+        )
@@ -0,0 +1,430 @@
+"""
+<Purpose>
+  Secondary indexes over the system calls of a trace. They are built while the
+  trace is parsed, by passing them as sinks to StraceParser.parse_trace, and map
+  keys to posting lists: the positions of the matching system calls in the list
+  returned by parse_trace, in trace order.
+
+  Example using this module:
+
+    index = indexes.SyscallIndex()
+    syscalls = parser.parse_trace(sinks=[index])
+    opens = [syscalls[i] for i in index.names.get("openat", ())]
+
+  TimeIndex keeps the timestamps of the system calls sorted, so time windows
+  are found by binary search. It uses numpy when it is installed.
+
+  PathIndex maps the paths of Filepath arguments and of unix socket addresses
+  to the system calls using them.
+
+"""
+
+from builtins import object
+import array
+import bisect
+import fnmatch
+import re
+
+from . import parsing_classes
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NANOSECONDS_PER_SECOND = 1000000000
+
+
+def _post(postings, key, position):
+    positions = postings.get(key)
+    if positions is None:
+        positions = postings[key] = array.array("q")
+    positions.append(position)
+
+
+def _merge(posting_lists):
+    # the sorted union of posting lists.
+    if len(posting_lists) == 1:
+        return posting_lists[0]
+    positions = set()
+    for posting_list in posting_lists:
+        positions.update(posting_list)
+    return array.array("q", sorted(positions))
+
+
+def syscall_paths(syscall):
+    """
+    Return the paths used by a system call: the values of its Filepath arguments
+    and the paths of its unix socket address arguments.
+    """
+
+    paths = []
+    # the arguments of unknown syscall_NNN calls are not parsed.
+    for arg in syscall.args or ():
+        if isinstance(arg, parsing_classes.Filepath):
+            paths.append(arg.value)
+        elif isinstance(arg, parsing_classes.Sockaddr):
+            address = arg.address
+            if address is not None and address.path is not None:
+                paths.append(address.path)
+    return paths
+
+
+class SyscallIndex(object):
+    """
+    <Purpose>
+      Indexes system calls by pid, by name and by error label.
+
+    <Attributes>
+      self.count:
+        The number of system calls added so far.
+
+      self.pids:
+        A dict mapping each pid to the positions of its system calls.
+
+      self.names:
+        A dict mapping each system call name to the positions of its calls.
+
+      self.errnos:
+        A dict mapping each error label, e.g. "ENOENT", to the positions of the
+        system calls that failed with it.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.pids = {}
+        self.names = {}
+        self.errnos = {}
+
+    def add(self, syscall):
+        position = self.count
+        self.count += 1
+
+        _post(self.pids, syscall.pid, position)
+        _post(self.names, syscall.name, position)
+        if syscall.ret is not None and syscall.ret[1] is not None:
+            _post(self.errnos, syscall.ret[1], position)
+
+    def __repr__(self):
+        return (
+            "<SyscallIndex syscalls="
+            + str(self.count)
+            + " pids="
+            + str(len(self.pids))
+            + " names="
+            + str(len(self.names))
+            + " errnos="
+            + str(len(self.errnos))
+            + ">"
+        )
+
+
+def _search(column, value, side):
+    # the insertion point of value in the sorted column.
+    if numpy is not None:
+        return int(numpy.searchsorted(column, value, side))
+    if side == "left":
+        return bisect.bisect_left(column, value)
+    return bisect.bisect_right(column, value)
+
+
+class TimeIndex(object):
+    """
+    <Purpose>
+      Indexes the system calls of a trace by time, for the traces with
+      timestamps. Each system call runs from its timestamp to its timestamp plus
+      its elapsed time (strace -T), or is instantaneous without elapsed times.
+      System calls without a timestamp are not indexed.
+
+      Timestamps mostly grow along the trace, but not always (e.g. in -f traces
+      or after resumed system calls), so the index is sorted on first query and
+      again after more system calls are added.
+
+    <Attributes>
+      self.count:
+        The number of system calls added so far.
+
+      self.positions:
+        An array of the positions of the indexed system calls, in trace order.
+
+      self.starts:
+        An array of the start times of the indexed system calls, in
+        nanoseconds.
+
+      self.ends:
+        An array of the end times of the indexed system calls, in nanoseconds.
+
+      self.longest:
+        The longest elapsed time of the indexed system calls, in nanoseconds.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.positions = array.array("q")
+        self.starts = array.array("q")
+        self.ends = array.array("q")
+        self.longest = 0
+        # (sorted starts, positions in start order, ends in start order), built
+        # on first query.
+        self._sorted = None
+
+    def add(self, syscall):
+        position = self.count
+        self.count += 1
+
+        if syscall.timestamp is None:
+            return
+
+        elapsed = 0
+        if syscall.elapsed_time is not None:
+            elapsed = int(round(syscall.elapsed_time * NANOSECONDS_PER_SECOND))
+            if elapsed > self.longest:
+                self.longest = elapsed
+
+        self.positions.append(position)
+        self.starts.append(syscall.timestamp)
+        self.ends.append(syscall.timestamp + elapsed)
+        self._sorted = None
+
+    def window(self, start, end):
+        """
+        <Purpose>
+          Find the system calls that start in a time window.
+
+        <Arguments>
+          start:
+            The start of the window, in nanoseconds. Included.
+          end:
+            The end of the window, in nanoseconds. Excluded.
+
+        <Exceptions>
+          None
+
+        <Side Effects>
+          Sorts the index if system calls were added since the last query.
+
+        <Returns>
+          The positions of the system calls, ordered by start time, as a view
+          into the index: a numpy int64 array if numpy is installed, otherwise a
+          memoryview. It does not see the system calls added after the query.
+        """
+
+        starts, positions, _ = self._get_sorted()
+        low = _search(starts, start, "left")
+        high = max(low, _search(starts, end, "left"))
+        return positions[low:high]
+
+    def overlapping(self, start, end):
+        """
+        <Purpose>
+          Find the system calls that were running at some point of a time window,
+          including the ones that started before it and blocked into it.
+
+        <Arguments>
+          start:
+            The start of the window, in nanoseconds. Included.
+          end:
+            The end of the window, in nanoseconds. Excluded.
+
+        <Exceptions>
+          None
+
+        <Side Effects>
+          Sorts the index if system calls were added since the last query.
+
+        <Returns>
+          A list of the positions of the system calls, ordered by start time.
+        """
+
+        starts, positions, ends = self._get_sorted()
+        # no system call runs longer than self.longest, so the ones running in
+        # the window started at most that long before it.
+        low = _search(starts, start - self.longest, "left")
+        high = max(low, _search(starts, end, "left"))
+
+        if numpy is not None:
+            return positions[low:high][ends[low:high] >= start].tolist()
+        return [positions[i] for i in range(low, high) if ends[i] >= start]
+
+    def _get_sorted(self):
+        if self._sorted is not None:
+            return self._sorted
+
+        if numpy is not None:
+            starts = numpy.frombuffer(self.starts, dtype=numpy.int64)
+            order = numpy.argsort(starts, kind="stable")
+            self._sorted = (
+                starts[order],
+                numpy.frombuffer(self.positions, dtype=numpy.int64)[order],
+                numpy.frombuffer(self.ends, dtype=numpy.int64)[order],
+            )
+        elif all(
+            self.starts[i] <= self.starts[i + 1] for i in range(len(self.starts) - 1)
+        ):
+            # already in order, which is the common case. The positions are
+            # copied so that the views handed out do not stop the index from
+            # growing.
+            self._sorted = (
+                self.starts,
+                memoryview(array.array("q", self.positions)),
+                self.ends,
+            )
+        else:
+            order = sorted(range(len(self.starts)), key=self.starts.__getitem__)
+            self._sorted = (
+                array.array("q", [self.starts[i] for i in order]),
+                memoryview(array.array("q", [self.positions[i] for i in order])),
+                array.array("q", [self.ends[i] for i in order]),
+            )
+        return self._sorted
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_sorted"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def __repr__(self):
+        return (
+            "<TimeIndex syscalls="
+            + str(self.count)
+            + " timestamps="
+            + str(len(self.starts))
+            + ">"
+        )
+
+
+class PathIndex(object):
+    """
+    <Purpose>
+      Indexes system calls by the paths they use, see syscall_paths. Paths are
+      indexed as they appear in the trace, so relative paths are not resolved.
+
+    <Attributes>
+      self.count:
+        The number of system calls added so far.
+
+      self.paths:
+        A dict mapping each path to the positions of the system calls using it.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.paths = {}
+        # the paths in sorted order, built on the first prefix or glob query.
+        self._sorted_paths = None
+
+    def add(self, syscall):
+        position = self.count
+        self.count += 1
+
+        for path in syscall_paths(syscall):
+            positions = self.paths.get(path)
+            if positions is None:
+                self._sorted_paths = None
+            elif positions[-1] == position:
+                # the same path given twice to one system call.
+                continue
+            _post(self.paths, path, position)
+
+    def exact(self, path):
+        """
+        Return the positions of the system calls using the given path.
+        """
+        return self.paths.get(path, array.array("q"))
+
+    def prefix(self, directory):
+        """
+        <Purpose>
+          Find the system calls using a path in a directory subtree.
+
+        <Arguments>
+          directory:
+            The path of the directory, e.g. "/etc". The directory itself is part
+            of the subtree, "/etcetera" is not.
+
+        <Exceptions>
+          None
+
+        <Side Effects>
+          Sorts the indexed paths if new ones were added since the last query.
+
+        <Returns>
+          An array of the positions of the system calls, in trace order.
+        """
+
+        directory = directory.rstrip("/")
+        sorted_paths = self._get_sorted_paths()
+        start = directory + "/"
+        low = bisect.bisect_left(sorted_paths, start)
+        # "0" is the character following "/".
+        high = bisect.bisect_left(sorted_paths, directory + "0", low)
+
+        posting_lists = [self.paths[path] for path in sorted_paths[low:high]]
+        if directory in self.paths:
+            posting_lists.append(self.paths[directory])
+        if not posting_lists:
+            return array.array("q")
+        return _merge(posting_lists)
+
+    def glob(self, pattern):
+        """
+        <Purpose>
+          Find the system calls using a path that matches a shell pattern.
+
+        <Arguments>
+          pattern:
+            A pattern as understood by fnmatch, e.g. "/usr/lib/*.so*". Wildcards
+            match "/" too.
+
+        <Exceptions>
+          None
+
+        <Side Effects>
+          Sorts the indexed paths if new ones were added since the last query.
+
+        <Returns>
+          An array of the positions of the system calls, in trace order.
+        """
+
+        sorted_paths = self._get_sorted_paths()
+
+        # only the paths starting with the literal part of the pattern can match.
+        literal = re.split(r"[*?[]", pattern, 1)[0]
+        low = bisect.bisect_left(sorted_paths, literal)
+        match = re.compile(fnmatch.translate(pattern)).match
+
+        posting_lists = []
+        for index in range(low, len(sorted_paths)):
+            path = sorted_paths[index]
+            if not path.startswith(literal):
+                break
+            if match(path):
+                posting_lists.append(self.paths[path])
+        if not posting_lists:
+            return array.array("q")
+        return _merge(posting_lists)
+
+    def _get_sorted_paths(self):
+        if self._sorted_paths is None:
+            self._sorted_paths = sorted(self.paths)
+        return self._sorted_paths
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_sorted_paths"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def __repr__(self):
+        return (
+            "<PathIndex syscalls="
+            + str(self.count)
+            + " paths="
+            + str(len(self.paths))
+            + ">"
+        )
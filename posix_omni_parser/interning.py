@@ -0,0 +1,174 @@
+"""
+<Purpose>
+  The vocabulary of a trace is tiny compared to its length: the same system call
+  names, error labels, flags and paths repeat in millions of lines. An InternPool
+  makes equal strings parsed from a trace share a single object, so that memory
+  grows with the vocabulary of the trace rather than with its length.
+
+  Unlike the builtin sys.intern, a pool belongs to a single trace (one is created
+  by each parser) and is released with it, and it can hold any hashable value,
+  e.g. tuples of flags.
+
+  A FlagVocabulary numbers the flags met in a trace, so that a set of flags can be
+  stored as an int bitmask over that numbering. See parsing_classes.Flags.
+
+  Example using this module:
+
+    pool = interning.InternPool()
+    name = pool.intern(name)
+
+    vocabulary = interning.FlagVocabulary()
+    flags, mask = vocabulary.encode(["O_RDONLY", "O_CLOEXEC"])
+
+"""
+
+from builtins import object
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class InternPool(object):
+    def __init__(self):
+        self._values = {}
+
+    def intern(self, value):
+        """
+        Return the pooled object equal to value, adding value to the pool if no
+        such object is pooled yet.
+        """
+        return self._values.setdefault(value, value)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, value):
+        return value in self._values
+
+    def __repr__(self):
+        return "<InternPool values=" + str(len(self._values)) + ">"
+
+
+class FlagVocabulary(object):
+    """
+    Assigns a bit to every flag name of a trace, in the order the flags are
+    first met.
+    """
+
+    def __init__(self):
+        # flag name -> bit
+        self.bits = {}
+
+        # bit index -> flag name
+        self.flags = []
+
+        # tuple of flags as spelled in the trace -> (tuple, mask)
+        self._encodings = {}
+
+    def __len__(self):
+        return len(self.flags)
+
+    def bit(self, flag):
+        """
+        Return the bit of a flag, assigning the next free bit if the flag is new.
+        """
+        bit = self.bits.get(flag)
+        if bit is None:
+            bit = 1 << len(self.flags)
+            self.bits[flag] = bit
+            self.flags.append(flag)
+        return bit
+
+    def encode(self, flags):
+        """
+        <Purpose>
+          Encode a sequence of flags as a bitmask.
+
+        <Arguments>
+          flags:
+            A sequence of flag names, e.g. ["O_RDONLY", "O_CLOEXEC"].
+
+        <Exceptions>
+          None
+
+        <Side Effects>
+          Flags not met before are added to the vocabulary.
+
+        <Returns>
+          A (flags, mask) tuple. flags is a tuple of the given flags in the given
+          order, shared by all the equal sequences encoded, and mask is the int
+          with the bits of the flags set.
+        """
+
+        key = tuple(flags)
+        encoding = self._encodings.get(key)
+        if encoding is None:
+            mask = 0
+            for flag in key:
+                mask |= self.bit(flag)
+            encoding = self._encodings[key] = (key, mask)
+        return encoding
+
+    def mask(self, flags):
+        """
+        Return the bitmask of the given flag names without adding them to the
+        vocabulary. Flags never met in the trace have no bit.
+        """
+        mask = 0
+        for flag in flags:
+            mask |= self.bits.get(flag, 0)
+        return mask
+
+    def decode(self, mask):
+        """
+        Return the list of flag names whose bits are set in mask, in bit order.
+        """
+        flags = []
+        index = 0
+        while mask:
+            if mask & 1:
+                flags.append(self.flags[index])
+            mask >>= 1
+            index += 1
+        return flags
+
+    def matching(self, masks, flags):
+        """
+        <Purpose>
+          Test many bitmasks of this vocabulary at once for the given flags.
+
+        <Arguments>
+          masks:
+            A sequence of bitmasks, e.g. the mask attribute of compact Flags
+            objects.
+
+          flags:
+            A sequence of flag names that must all be set.
+
+        <Exceptions>
+          None
+
+        <Side Effects>
+          None
+
+        <Returns>
+          A numpy array of booleans if numpy is installed, otherwise a list of
+          booleans, telling which masks have all the flags set.
+        """
+
+        required = self.mask(flags)
+        if any(flag not in self.bits for flag in flags):
+            # a flag never met in the trace is set in no mask.
+            required = -1
+
+        if numpy is None:
+            return [mask & required == required for mask in masks]
+
+        # masks of more than 63 flags do not fit in an int64.
+        if len(self.flags) < 64:
+            masks = numpy.asarray(masks, dtype=numpy.int64)
+        else:
+            masks = numpy.asarray(masks, dtype=object)
+        return (masks & required) == required
@@ -0,0 +1,381 @@
+"""
+<Purpose>
+  Export of parsed system calls to JSON Lines files: one JSON object per system
+  call and per line. The lines are encoded with orjson when it is installed
+  (pip install posix_omni_parser[orjson]), and with the json module otherwise,
+  and written through a buffer in chunks of buffer_size bytes.
+
+  Every line follows the same schema:
+
+    {"pid": 8085, "name": "openat", "type": "complete",
+     "ret": 3, "errno": null,
+     "timestamp": 1614797952000001000, "elapsed_time": 1e-05,
+     "inst_pointer": null,
+     "args": [{"type": "FileDescriptor", "value": "AT_FDCWD"},
+              {"type": "Filepath", "value": "/etc/passwd"},
+              {"type": "Flags", "value": ["O_RDONLY", "O_CLOEXEC"]}]}
+
+  type is "unfinished", "resumed" or "complete". ret is the return value: a
+  number, a string ("?", hex numbers) or a list of flags (fcntl), or null for
+  unfinished calls. timestamp is in nanoseconds, see the timestamps module.
+  args is null for the calls whose arguments are not parsed. Each argument
+  holds the name of its parsing class in type, and:
+
+    Int               "value": number
+    Hex               "value": the hex digits, without 0x
+    FileDescriptor    "value": number, or "AT_FDCWD"
+    Filepath          "value": the path, without quotes
+    Flags             "value": list of flag names
+    Sockaddr          "family", "port", "address", "path": the fields of the
+                      address, null when they do not apply, or "value": "NULL"
+    Stat              "fields": object of the raw fields, e.g.
+                      {"st_mode": "S_IFREG|0644"}, "abbreviated": whether
+                      strace printed the short layout ending with "..."
+    PollFDPointer     "value": list of {"fd", "events", "revents"}
+    Environment       "value": list of the variables as printed
+    MissingValue      "expected": {"type", "name"} of the definition
+                      parameter, "given": the text found instead, or null
+    anything else     "value": the argument as printed
+
+  Example using this module:
+
+    jsonl.export_trace(trace_path, pickle_file, "trace.jsonl")
+
+    with jsonl.JsonLinesWriter("trace.jsonl") as writer:
+        syscalls = parser.parse_trace(sinks=[writer])
+
+"""
+
+from builtins import object
+from builtins import str
+import io
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from . import Syscall
+from . import parsing_classes
+from .parsers.StraceParser import StraceParser
+
+# bumped whenever the schema of the lines changes.
+SCHEMA_VERSION = 1
+
+_TYPE_NAMES = {
+    Syscall.Syscall.UNFINISHED: "unfinished",
+    Syscall.Syscall.RESUMED: "resumed",
+    Syscall.Syscall.COMPLETE: "complete",
+}
+
+
+def _encode_sockaddr(arg, record):
+    if arg.address is None:
+        record["value"] = arg.value
+        return
+    address = arg.address
+    record["family"] = address.family
+    record["port"] = address.port
+    record["address"] = address.host
+    record["path"] = address.path
+
+
+def _encode_stat(arg, record):
+    fields = {}
+    abbreviated = False
+    for stat_arg in arg.value:
+        if stat_arg == "...":
+            abbreviated = True
+            continue
+        field, _, raw_value = stat_arg.partition("=")
+        fields[field] = raw_value
+    record["fields"] = fields
+    record["abbreviated"] = abbreviated
+
+
+def _encode_pollfds(arg, record):
+    record["value"] = [
+        {"fd": fd, "events": events, "revents": revents}
+        for fd, events, revents in (pollfd.value for pollfd in arg.value)
+    ]
+
+
+def _encode_missing(arg, record):
+    record["expected"] = {
+        "type": getattr(arg.expected_value, "type", None),
+        "name": getattr(arg.expected_value, "name", None),
+    }
+    record["given"] = arg.given_value
+
+
+def _encode_value(arg, record):
+    record["value"] = arg.value
+
+
+def _encode_list(arg, record):
+    record["value"] = list(arg.value)
+
+
+def _encode_text(arg, record):
+    record["value"] = str(arg)
+
+
+# the encoders of the argument classes of the schema. Subclasses of these, e.g.
+# StringArray of UnimplementedType, are encoded as printed.
+_ENCODERS = {
+    parsing_classes.Int: _encode_value,
+    parsing_classes.Hex: _encode_value,
+    parsing_classes.FileDescriptor: _encode_value,
+    parsing_classes.Filepath: _encode_value,
+    parsing_classes.Flags: _encode_list,
+    parsing_classes.Sockaddr: _encode_sockaddr,
+    parsing_classes.Stat: _encode_stat,
+    parsing_classes.PollFDPointer: _encode_pollfds,
+    parsing_classes.Environment: _encode_list,
+    parsing_classes.MissingValue: _encode_missing,
+}
+
+
+def arg_record(arg):
+    """
+    Return the dict of the schema of a system call argument. See the module
+    docstring.
+    """
+    record = {"type": arg.__class__.__name__}
+    _ENCODERS.get(arg.__class__, _encode_text)(arg, record)
+    return record
+
+
+def syscall_record(syscall):
+    """
+    <Purpose>
+      Encode a system call in the schema of the lines. See the module
+      docstring.
+
+    <Arguments>
+      syscall:
+        A Syscall object.
+
+    <Exceptions>
+      None
+
+    <Side Effects>
+      None
+
+    <Returns>
+      A dict of JSON serializable values.
+    """
+
+    value = error = None
+    if syscall.ret is not None:
+        value, error = syscall.ret
+
+    args = None
+    if syscall.args is not None:
+        args = [arg_record(arg) for arg in syscall.args]
+
+    return {
+        "pid": syscall.pid,
+        "name": syscall.name,
+        "type": _TYPE_NAMES[syscall.type],
+        "ret": value,
+        "errno": error,
+        "timestamp": syscall.timestamp,
+        "elapsed_time": syscall.elapsed_time,
+        "inst_pointer": syscall.inst_pointer,
+        "args": args,
+    }
+
+
+def _json_dumps(record):
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _orjson_dumps(record):
+    try:
+        return orjson.dumps(record)
+    except (orjson.JSONEncodeError, TypeError):
+        # orjson only takes 64 bit integers and valid UTF-8 strings.
+        return _json_dumps(record)
+
+
+def get_encoder(backend=None):
+    """
+    <Purpose>
+      Choose the function encoding a record to a JSON bytes string.
+
+    <Arguments>
+      backend:
+        "orjson", "json", or None for orjson if it is installed and json
+        otherwise.
+
+    <Exceptions>
+      ImportError:
+        If orjson is asked for but not installed.
+      ValueError:
+        If the backend is unknown.
+
+    <Side Effects>
+      None
+
+    <Returns>
+      A function taking a dict and returning bytes, without a newline.
+    """
+
+    if backend is None:
+        backend = "json" if orjson is None else "orjson"
+    if backend == "orjson":
+        if orjson is None:
+            raise ImportError(
+                "orjson is not installed, install posix_omni_parser[orjson]"
+            )
+        return _orjson_dumps
+    if backend == "json":
+        return _json_dumps
+    raise ValueError("Unknown JSON backend: " + repr(backend))
+
+
+class JsonLinesWriter(object):
+    """
+    <Purpose>
+      Writes system calls to a JSON Lines file. It can be passed as a sink to
+      StraceParser.parse_trace, and must be closed, or used as a context
+      manager, for the buffered lines to be written.
+
+    <Attributes>
+      self.path:
+        The path of the file written, or None if writing to a file object.
+
+      self.buffer_size:
+        The number of bytes of lines buffered before they are written.
+
+      self.count:
+        The number of system calls added.
+    """
+
+    def __init__(self, path_or_file, buffer_size=1 << 20, backend=None):
+        """
+        <Purpose>
+          Open the file to write.
+
+        <Arguments>
+          path_or_file:
+            The path of the file, or a binary file object, which is not closed
+            by close().
+          buffer_size:
+            The number of bytes of lines buffered before they are written.
+          backend:
+            The JSON backend, see get_encoder.
+
+        <Exceptions>
+          See get_encoder.
+
+        <Side Effects>
+          Creates the file.
+
+        <Returns>
+          None
+        """
+
+        self._encode = get_encoder(backend)
+        self.buffer_size = buffer_size
+        self.count = 0
+        self._lines = []
+        self._buffered = 0
+
+        if isinstance(path_or_file, str):
+            self.path = path_or_file
+            self._file = io.open(path_or_file, "wb")
+            self._owned = True
+        else:
+            self.path = None
+            self._file = path_or_file
+            self._owned = False
+
+    def add(self, syscall):
+        line = self._encode(syscall_record(syscall))
+        self._lines.append(line)
+        self._buffered += len(line) + 1
+        self.count += 1
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered lines.
+        """
+        if self._lines:
+            self._lines.append(b"")
+            self._file.write(b"\n".join(self._lines))
+            self._lines = []
+            self._buffered = 0
+
+    def close(self):
+        """
+        Write the buffered lines and close the file, if it was opened by the
+        writer.
+        """
+        if self._file is None:
+            return
+        self.flush()
+        if self._owned:
+            self._file.close()
+        else:
+            self._file.flush()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return (
+            "<JsonLinesWriter " + str(self.path) + " syscalls=" + str(self.count) + ">"
+        )
+
+
+def export_trace(
+    trace_path,
+    pickle_file,
+    output_path,
+    buffer_size=1 << 20,
+    backend=None,
+    **parser_options
+):
+    """
+    <Purpose>
+      Export the system calls of a trace file in one pass, without keeping the
+      parsed system calls.
+
+    <Arguments>
+      trace_path:
+        The path to the trace file.
+      pickle_file:
+        The path to the pickle file containing the parsed system call
+        representations.
+      output_path:
+        The path of the file to write.
+      buffer_size, backend:
+        See JsonLinesWriter.
+      parser_options:
+        Keyword arguments passed on to the parser, e.g. error_budget. See
+        StraceParser.
+
+    <Exceptions>
+      See JsonLinesWriter and StraceParser.parse_trace.
+
+    <Side Effects>
+      Writes output_path.
+
+    <Returns>
+      The number of system calls exported.
+    """
+
+    parser = StraceParser(trace_path, pickle_file, **parser_options)
+    with JsonLinesWriter(output_path, buffer_size, backend) as writer:
+        for syscall in parser.iter_syscalls():
+            writer.add(syscall)
+    return writer.count
@@ -0,0 +1,313 @@
+"""
+<Purpose>
+  A compressed view of the system calls of each process of a trace, where the
+  blocks of calls repeated back to back, like the poll, read, write iterations
+  of an event loop, are stored once with their number of repetitions.
+
+  Calls are compared by shape: their name and error label. Within a repeated
+  block, what varies from an iteration to the next (buffers, return values...)
+  is kept as the interned signatures of diffing.Signer: each distinct iteration
+  is stored once, and the sequence of iterations is run-length encoded. The
+  size of the view therefore grows with the number of distinct behaviours of
+  the process rather than with the length of the trace.
+
+  Example using this module:
+
+    for sequence in loops.compress(trace.syscalls):
+        for item in sequence.items:
+            if isinstance(item, loops.Repetition):
+                print(sequence.pid, item.count, "x", sequence.names(item.block))
+
+"""
+
+from builtins import object
+from builtins import range
+from builtins import str
+import array
+
+from . import diffing
+
+
+class Literal(object):
+    """
+    A run of calls that are not part of a repeated block: the calls of indexes
+    start to start + length - 1 in the sequence of their process, whose
+    signatures are kept in self.signatures.
+    """
+
+    def __init__(self, start, signatures):
+        self.start = start
+        self.signatures = signatures
+
+    @property
+    def length(self):
+        return len(self.signatures)
+
+    def __repr__(self):
+        return "<Literal start=" + str(self.start) + " length=" + str(self.length) + ">"
+
+
+class Repetition(object):
+    """
+    <Purpose>
+      A block of calls repeated back to back.
+
+    <Attributes>
+      self.start:
+        The index of the first call of the first iteration in the sequence of
+        the process.
+
+      self.block:
+        The tuple of the shapes of the calls of one iteration.
+
+      self.count:
+        The number of iterations.
+
+      self.variants:
+        The list of the distinct iterations, each a tuple of the signatures of
+        its calls.
+
+      self.runs:
+        The run-length encoded iterations: an array of variant index, run
+        length pairs, flattened.
+    """
+
+    def __init__(self, start, block):
+        self.start = start
+        self.block = block
+        self.count = 0
+        self.variants = []
+        self.runs = array.array("q")
+        self._variant_indexes = {}
+
+    def add_iteration(self, signatures):
+        index = self._variant_indexes.get(signatures)
+        if index is None:
+            index = self._variant_indexes[signatures] = len(self.variants)
+            self.variants.append(signatures)
+
+        runs = self.runs
+        if runs and runs[-2] == index:
+            runs[-1] += 1
+        else:
+            runs.append(index)
+            runs.append(1)
+        self.count += 1
+
+    @property
+    def length(self):
+        return self.count * len(self.block)
+
+    def iterations(self):
+        """
+        Yield the tuple of the signatures of every iteration, in order.
+        """
+        for pair in range(0, len(self.runs), 2):
+            variant = self.variants[self.runs[pair]]
+            for _ in range(self.runs[pair + 1]):
+                yield variant
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_variant_indexes"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._variant_indexes = dict(
+            (variant, index) for index, variant in enumerate(self.variants)
+        )
+
+    def __repr__(self):
+        return (
+            "<Repetition start="
+            + str(self.start)
+            + " block="
+            + str(len(self.block))
+            + " count="
+            + str(self.count)
+            + " variants="
+            + str(len(self.variants))
+            + ">"
+        )
+
+
+class CompressedSequence(object):
+    """
+    <Purpose>
+      The compressed calls of a process.
+
+    <Attributes>
+      self.pid:
+        The pid of the process.
+
+      self.items:
+        The list of the Literal and Repetition items covering the calls of the
+        process, in order.
+
+      self.shapes:
+        The list of the (name, error label) shapes, indexed by shape id.
+
+      self.positions:
+        An array of the positions of the calls of the process in the trace, or
+        None if they were not kept.
+    """
+
+    def __init__(self, pid, items, shapes, positions):
+        self.pid = pid
+        self.items = items
+        self.shapes = shapes
+        self.positions = positions
+
+    @property
+    def length(self):
+        """
+        The number of calls of the process.
+        """
+        return sum(item.length for item in self.items)
+
+    def names(self, block):
+        return [self.shapes[shape][0] for shape in block]
+
+    def signatures(self):
+        """
+        Yield the signature of every call of the process, in order, undoing the
+        compression.
+        """
+        for item in self.items:
+            if isinstance(item, Literal):
+                for signature in item.signatures:
+                    yield signature
+            else:
+                for iteration in item.iterations():
+                    for signature in iteration:
+                        yield signature
+
+    def __repr__(self):
+        return (
+            "<CompressedSequence pid="
+            + str(self.pid)
+            + " calls="
+            + str(self.length)
+            + " items="
+            + str(len(self.items))
+            + ">"
+        )
+
+
+def _find_repetition(shapes, index, max_period, min_repeats):
+    # the (period, count) of the block starting at index repeated the most calls,
+    # or None.
+    best = None
+    best_length = 0
+    end = len(shapes)
+    for period in range(1, max_period + 1):
+        if index + period * min_repeats > end:
+            break
+        count = 1
+        start = index + period
+        while (
+            start + period <= end
+            and shapes[start : start + period] == shapes[index : index + period]
+        ):
+            count += 1
+            start += period
+        if count >= min_repeats and period * count > best_length:
+            best = (period, count)
+            best_length = period * count
+    return best
+
+
+def _compress_pid(shapes, signatures, max_period, min_repeats):
+    items = []
+    literal = None
+    index = 0
+    while index < len(shapes):
+        found = _find_repetition(shapes, index, max_period, min_repeats)
+        if found is None:
+            if literal is None:
+                literal = Literal(index, array.array("q"))
+                items.append(literal)
+            literal.signatures.append(signatures[index])
+            index += 1
+            continue
+
+        literal = None
+        period, count = found
+        repetition = Repetition(index, tuple(shapes[index : index + period]))
+        for _ in range(count):
+            repetition.add_iteration(tuple(signatures[index : index + period]))
+            index += period
+        items.append(repetition)
+    return items
+
+
+def compress(syscalls, signer=None, max_period=16, min_repeats=3, keep_positions=True):
+    """
+    <Purpose>
+      Compress the calls of every process of a trace.
+
+    <Arguments>
+      syscalls:
+        The list of Syscall objects of the trace, e.g. Trace.syscalls.
+      signer:
+        The diffing.Signer giving the signatures of the calls, or None for one
+        with the default masks.
+      max_period:
+        The largest number of calls of a repeated block.
+      min_repeats:
+        The smallest number of iterations for a block to be taken as repeated.
+      keep_positions:
+        Whether to keep the positions of the calls of each process in the
+        trace, see CompressedSequence.positions.
+
+    <Exceptions>
+      None
+
+    <Side Effects>
+      Adds the signatures of the calls to the signer.
+
+    <Returns>
+      A list of CompressedSequence, one per process in order of appearance.
+      Blocks are found greedily: at each call, the block covering the most
+      calls with its repetitions is taken, the shortest one on ties.
+    """
+
+    if signer is None:
+        signer = diffing.Signer()
+
+    shape_ids = {}
+    shapes = []
+    sequences = {}
+    pids = []
+    for position, syscall in enumerate(syscalls):
+        sequence = sequences.get(syscall.pid)
+        if sequence is None:
+            sequence = sequences[syscall.pid] = (
+                array.array("q"),
+                array.array("q"),
+                array.array("q"),
+            )
+            pids.append(syscall.pid)
+
+        shape = (syscall.name, None if syscall.ret is None else syscall.ret[1])
+        shape_id = shape_ids.get(shape)
+        if shape_id is None:
+            shape_id = shape_ids[shape] = len(shapes)
+            shapes.append(shape)
+
+        sequence[0].append(shape_id)
+        sequence[1].append(signer.sign(syscall))
+        if keep_positions:
+            sequence[2].append(position)
+
+    compressed = []
+    for pid in pids:
+        pid_shapes, signatures, positions = sequences.pop(pid)
+        items = _compress_pid(pid_shapes, signatures, max_period, min_repeats)
+        compressed.append(
+            CompressedSequence(
+                pid, items, shapes, positions if keep_positions else None
+            )
+        )
+    return compressed
@@ -0,0 +1,167 @@
+"""
+<Purpose>
+  Many of the arguments decoded by parsing_classes repeat across a trace: the
+  same flags strings, modes, ports and IP addresses come up in millions of
+  system calls. This module memoizes the pure functions decoding them in
+  bounded least recently used caches, shared by all the parsers of a process
+  and safe to use from several threads.
+
+  Example using this module:
+
+    @memoization.memoize("flags", copy=list)
+    def _string_to_flags(flags_string):
+        ...
+
+    memoization.cache_info()["flags"].hits
+
+"""
+
+from builtins import object
+from collections import OrderedDict
+import threading
+
+# the default number of results kept by each cache.
+DEFAULT_MAXSIZE = 4096
+
+# name -> LRUCache of every memoized function.
+_caches = {}
+
+
+class CacheInfo(object):
+    def __init__(self, hits, misses, size, maxsize):
+        self.hits = hits
+        self.misses = misses
+        self.size = size
+        self.maxsize = maxsize
+
+    def __repr__(self):
+        return (
+            "<CacheInfo hits="
+            + str(self.hits)
+            + " misses="
+            + str(self.misses)
+            + " size="
+            + str(self.size)
+            + " maxsize="
+            + str(self.maxsize)
+            + ">"
+        )
+
+
+class LRUCache(object):
+    """
+    A mapping holding at most maxsize entries, evicting the least recently used
+    one when full. All the methods are thread safe.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        assert maxsize > 0, "The size of an LRUCache must be positive"
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        """
+        Return a (found, value) tuple, counting a hit or a miss.
+        """
+        with self._lock:
+            try:
+                # move the entry to the most recently used end.
+                value = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return False, None
+            self._entries[key] = value
+            self.hits += 1
+            return True, value
+
+    def store(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, len(self._entries), self.maxsize)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def memoize(name, maxsize=DEFAULT_MAXSIZE, copy=None):
+    """
+    <Purpose>
+      Decorator memoizing a pure function of one hashable argument in an
+      LRUCache registered under name.
+
+    <Arguments>
+      name:
+        The name the cache is reported under by cache_info().
+
+      maxsize:
+        The number of results to keep.
+
+      copy:
+        None if the results are immutable. Otherwise a callable making a fresh
+        copy of a result, e.g. list. The cache then keeps the result as a tuple
+        and every call returns a copy of it, so that callers can change the
+        results they get without changing the cache.
+
+    <Exceptions>
+      None. Exceptions raised by the function are propagated and not cached.
+
+    <Side Effects>
+      Registers the cache of the function.
+
+    <Returns>
+      The decorator.
+    """
+
+    assert name not in _caches, "A cache named " + name + " already exists"
+    cache = LRUCache(maxsize)
+    _caches[name] = cache
+
+    def decorator(function):
+        def memoized(argument):
+            found, result = cache.lookup(argument)
+            if not found:
+                result = function(argument)
+                if copy is not None:
+                    result = tuple(result)
+                cache.store(argument, result)
+            if copy is not None:
+                return copy(result)
+            return result
+
+        memoized.__name__ = function.__name__
+        memoized.__doc__ = function.__doc__
+        memoized.cache = cache
+        return memoized
+
+    return decorator
+
+
+def cache_info():
+    """
+    Return a dict mapping the name of every memoized function to the CacheInfo
+    of its cache.
+    """
+    return dict((name, cache.info()) for name, cache in _caches.items())
+
+
+def clear_caches():
+    """
+    Empty all the caches and reset their counters.
+    """
+    for cache in _caches.values():
+        cache.clear()
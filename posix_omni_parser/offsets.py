@@ -0,0 +1,374 @@
+"""
+<Purpose>
+  Random access into trace files too large to parse whole. An OffsetIndex is
+  built in one scan of the trace that only splits the front of the lines, and
+  records the byte offset of every interval-th system call line together with
+  the state carried from a line to the next at that point: the unfinished
+  system calls and the timestamp clock. It is saved next to the trace, in a
+  sidecar file, and reused as long as the trace does not change and is opened
+  with the same trace_date.
+
+  An IndexedTrace then answers trace[i] and range reads by seeking to the
+  closest offset before the system calls asked for and parsing from there, so
+  at most interval - 1 lines are parsed before them, and only split, not cast.
+
+  Example using this module:
+
+    trace = offsets.IndexedTrace(trace_path, pickle_file)
+    print(len(trace), trace[5000000])
+    for syscall in trace.read(5000000, 5000100):
+        print(syscall)
+
+"""
+
+from builtins import object
+from builtins import range
+from builtins import str
+import array
+import copy
+import os
+import pickle
+
+from .parsers.StraceParser import StraceParser
+
+# bumped whenever the content of the sidecar files changes.
+FORMAT_VERSION = 2
+
+_SIGNAL_MARKERS = (b"+++", b"---")
+
+
+class OffsetIndex(object):
+    """
+    <Purpose>
+      The byte offsets of every interval-th system call line of a trace.
+
+    <Attributes>
+      self.trace_size, self.trace_mtime:
+        The size and modification time of the trace file the index was built
+        for.
+
+      self.trace_date, self.trace_options:
+        The trace_date and detected trace_options of the parser the index was
+        built with. The clocks depend on both.
+
+      self.interval:
+        The number of system calls between two offsets.
+
+      self.count:
+        The number of system call lines of the trace.
+
+      self.offsets:
+        An array of the byte offsets of the lines of the system calls at
+        positions 0, interval, 2 * interval...
+
+      self.clocks:
+        For each offset, a copy of the timestamp clock in the state it had
+        before the line, or None if the trace has no timestamps.
+
+      self.unfinished:
+        For each offset, the tuple of the byte offsets of the lines of the
+        system calls that are unfinished before the line.
+    """
+
+    def __init__(self, trace_size, trace_mtime, trace_date, trace_options, interval):
+        self.trace_size = trace_size
+        self.trace_mtime = trace_mtime
+        self.trace_date = trace_date
+        self.trace_options = trace_options
+        self.interval = interval
+        self.count = 0
+        self.offsets = array.array("q")
+        self.clocks = []
+        self.unfinished = []
+
+    def matches(self, parser, interval):
+        """
+        Return whether the index was built for the current content of the trace
+        file of a StraceParser, with the same options as the parser and the
+        given interval.
+        """
+        trace_stat = os.stat(parser.trace_path)
+        return (
+            self.trace_size == trace_stat.st_size
+            and self.trace_mtime == trace_stat.st_mtime
+            and self.trace_date == parser.trace_date
+            and self.trace_options == parser.trace_options
+            and self.interval == interval
+        )
+
+    def __repr__(self):
+        return (
+            "<OffsetIndex syscalls="
+            + str(self.count)
+            + " interval="
+            + str(self.interval)
+            + " offsets="
+            + str(len(self.offsets))
+            + ">"
+        )
+
+
+def build_offset_index(parser, interval=1000):
+    """
+    <Purpose>
+      Build the OffsetIndex of a trace in one scan.
+
+      A line is counted as a system call if it is not empty, not a comment and
+      not a signal or exit line, exactly like StraceParser.iter_syscalls does
+      as long as the trace has no malformed lines. Skipped malformed lines shift
+      the positions of the system calls after them by one.
+
+    <Arguments>
+      parser:
+        The StraceParser of the trace, that has not parsed any line yet. Its
+        trace options tell the fields at the front of the lines.
+      interval:
+        The number of system calls between two recorded offsets.
+
+    <Exceptions>
+      ValueError:
+        If interval is not positive.
+
+    <Side Effects>
+      None
+
+    <Returns>
+      An OffsetIndex.
+    """
+
+    if interval < 1:
+        raise ValueError("The interval must be positive, not " + str(interval))
+
+    trace_stat = os.stat(parser.trace_path)
+    index = OffsetIndex(
+        trace_stat.st_size,
+        trace_stat.st_mtime,
+        parser.trace_date,
+        parser.trace_options,
+        interval,
+    )
+
+    has_timestamps = parser.trace_options["timestamp"] is not None
+    fields = 1 + has_timestamps + bool(parser.trace_options["inst_pointer"])
+    clock = parser.copy_clock()
+
+    # (pid, name, offset) of the unfinished system calls, in trace order.
+    pending = []
+    count = 0
+    offset = 0
+    with open(parser.trace_path, "rb") as fh:
+        for raw_line in fh:
+            line_offset = offset
+            offset += len(raw_line)
+
+            line = raw_line.strip()
+            if not line or line[:1] == b"#" or line[:2] == b"//":
+                continue
+            parts = line.split(None, fields)
+            if len(parts) <= fields:
+                continue
+            rest = parts[fields]
+
+            if rest[:3] in _SIGNAL_MARKERS:
+                # -r timestamps are relative to the previous line, whatever it is.
+                if has_timestamps:
+                    clock(parts[1].decode("utf-8", "replace"))
+                continue
+
+            if count % interval == 0:
+                index.offsets.append(line_offset)
+                index.clocks.append(copy.deepcopy(clock))
+                index.unfinished.append(tuple(item[2] for item in pending))
+            count += 1
+
+            if has_timestamps:
+                clock(parts[1].decode("utf-8", "replace"))
+
+            if b"<unfinished ..." in rest:
+                pending.append((parts[0], rest.split(b"(", 1)[0], line_offset))
+            elif b" resumed>" in rest:
+                name = rest[5 : rest.find(b" resumed>")]
+                for item in pending:
+                    if item[0] == parts[0] and item[1] == name:
+                        pending.remove(item)
+                        break
+
+    index.count = count
+    return index
+
+
+def load_offset_index(index_path):
+    """
+    Return the OffsetIndex saved in a sidecar file, or None if the file does
+    not exist or was written by another version of this module.
+    """
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, "rb") as fh:
+        version, index = pickle.load(fh)
+    if version != FORMAT_VERSION:
+        return None
+    return index
+
+
+def save_offset_index(index, index_path):
+    """
+    Save an OffsetIndex to a sidecar file. The file is written to a temporary
+    file first and renamed, so that readers never see a half written index.
+    """
+    with open(index_path + ".tmp", "wb") as fh:
+        pickle.dump((FORMAT_VERSION, index), fh, pickle.HIGHEST_PROTOCOL)
+    os.replace(index_path + ".tmp", index_path)
+
+
+class IndexedTrace(object):
+    """
+    <Purpose>
+      A trace whose system calls are read on demand from the trace file, by
+      position, through an OffsetIndex.
+
+    <Attributes>
+      self.trace_path:
+        The path to the trace file.
+
+      self.index_path:
+        The path of the sidecar file of the OffsetIndex.
+
+      self.parser:
+        The StraceParser used to read the system calls.
+
+      self.offset_index:
+        The OffsetIndex of the trace.
+    """
+
+    def __init__(
+        self, trace_path, pickle_file, index_path=None, interval=1000, **parser_options
+    ):
+        """
+        <Purpose>
+          Open a trace for random access, loading its OffsetIndex from the
+          sidecar file, or building and saving it if the sidecar file is
+          missing, out of date, or was built with other parser options.
+
+        <Arguments>
+          trace_path:
+            The path to the trace file.
+          pickle_file:
+            The path to the pickle file containing the parsed system call
+            representations.
+          index_path:
+            The path of the sidecar file, trace_path + ".offsets" by default.
+          interval:
+            The number of system calls between two recorded offsets. Reads
+            parse at most interval - 1 system calls they do not return.
+          parser_options:
+            Keyword arguments passed on to the parser, e.g. trace_date. See
+            StraceParser.
+
+        <Exceptions>
+          See StraceParser.
+
+        <Side Effects>
+          Writes the sidecar file if needed.
+
+        <Returns>
+          None
+        """
+
+        self.trace_path = trace_path
+        self.index_path = index_path
+        if index_path is None:
+            self.index_path = trace_path + ".offsets"
+
+        self.parser = StraceParser(trace_path, pickle_file, **parser_options)
+
+        self.offset_index = load_offset_index(self.index_path)
+        if self.offset_index is None or not self.offset_index.matches(
+            self.parser, interval
+        ):
+            self.offset_index = build_offset_index(self.parser, interval)
+            save_offset_index(self.offset_index, self.index_path)
+
+    def __len__(self):
+        return self.offset_index.count
+
+    def _read_line(self, fh, offset):
+        fh.seek(offset)
+        return fh.readline().decode("utf-8", "replace").strip()
+
+    def read(self, start, stop=None):
+        """
+        <Purpose>
+          Read the system calls from position start up to, and excluding,
+          position stop.
+
+        <Arguments>
+          start:
+            The position of the first system call, from 0 to len(self).
+          stop:
+            The position after the last system call, or None for the end of
+            the trace.
+
+        <Exceptions>
+          IndexError:
+            If start is out of range.
+
+        <Side Effects>
+          Resets the state of self.parser.
+
+        <Returns>
+          A generator of Syscall objects.
+        """
+
+        index = self.offset_index
+        if stop is None or stop > index.count:
+            stop = index.count
+        if not 0 <= start <= index.count:
+            raise IndexError("Position out of range: " + str(start))
+        if start >= stop:
+            return
+
+        checkpoint = start // index.interval
+        with open(self.trace_path, "rb") as fh:
+            unfinished_lines = [
+                self._read_line(fh, offset) for offset in index.unfinished[checkpoint]
+            ]
+        self.parser.restore_line_state(index.clocks[checkpoint], unfinished_lines)
+
+        remaining = stop - start
+        for syscall in self.parser.iter_syscalls(
+            index.offsets[checkpoint], start - checkpoint * index.interval
+        ):
+            yield syscall
+            remaining -= 1
+            if remaining == 0:
+                break
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            start, stop, step = position.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return list(self.read(start, stop))
+
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("Position out of range: " + str(position))
+        for syscall in self.read(position, position + 1):
+            return syscall
+        raise IndexError("Malformed system call at position " + str(position))
+
+    def __iter__(self):
+        return self.read(0)
+
+    def __repr__(self):
+        return (
+            "<IndexedTrace "
+            + self.trace_path
+            + " syscalls="
+            + str(len(self))
+            + " interval="
+            + str(self.offset_index.interval)
+            + ">"
+        )
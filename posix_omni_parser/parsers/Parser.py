@@ -15,9 +15,65 @@ from builtins import range
 from builtins import object
 import pickle
 
+# marks attributes that are read from the trace on first access.
+_NOT_READ = object()
+
+
+class MalformedLine(object):
+    """
+    An entry of the error log of a parser running with an error budget. Records a
+    trace line that could not be parsed, where it is in the trace file and why it
+    could not be parsed.
+    """
+
+    def __init__(self, offset, line, reason):
+        # byte offset of the line in the trace file.
+        self.offset = offset
+        self.line = line
+        self.reason = reason
+
+    def __eq__(self, other):
+        return (
+            type(other) is type(self)
+            and self.offset == other.offset
+            and self.line == other.line
+            and self.reason == other.reason
+        )
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return (
+            "<MalformedLine offset="
+            + str(self.offset)
+            + " reason="
+            + self.reason
+            + " line=`"
+            + self.line
+            + "`>"
+        )
+
+
+class ErrorBudgetExceeded(Exception):
+    """
+    Raised when a trace has more malformed lines than the error budget given to
+    the parser allows.
+    """
+
+    def __init__(self, errors):
+        Exception.__init__(
+            self,
+            "Error budget exceeded after "
+            + str(len(errors))
+            + " malformed lines. Last one: "
+            + repr(errors[-1]),
+        )
+        self.errors = errors
+
 
 class Parser(object):
-    def __init__(self, trace_path, pickle_file):
+    def __init__(self, trace_path, pickle_file, error_budget=None):
         """
         <Purpose>
           Creates an Parser object which acts as the parent of parsers targeting
@@ -30,6 +86,11 @@ class Parser(object):
           pickle_file:
             The path to the pickle file containing the parsed system call
             representations.
+          error_budget:
+            None to stop parsing at the first malformed line by raising the error
+            it caused. Otherwise the number of malformed lines to tolerate. Each
+            one is recorded in self.errors and skipped, and ErrorBudgetExceeded
+            is raised when one more is met.
 
         <Side Effects>
           None
@@ -40,6 +101,11 @@ class Parser(object):
 
         self.trace_path = trace_path
 
+        self.error_budget = error_budget
+
+        # MalformedLine entries of the lines skipped so far.
+        self.errors = []
+
         # get the system call definitions from the pickle file. These will be used
         # to parse the parameters of each system call.
         self.syscall_definitions = pickle.load(open(pickle_file, "rb"))
@@ -54,8 +120,54 @@ class Parser(object):
         # particular when a file bundle needs to be generated. To generate a file bundle all the
         # files referenced in the trace must be located and included in the bundle. The location of
         # these files is in respect to the HOME variable if one is found, otherwise the home
-        # directory is assumed to be the current directory (pwd)
-        self.home_env = self._get_home_environment()
+        # directory is assumed to be the current directory (pwd). It is only read
+        # from the trace when first needed.
+        self._home_env = _NOT_READ
+
+    @property
+    def home_env(self):
+        if self._home_env is _NOT_READ:
+            self._home_env = self._get_home_environment()
+        return self._home_env
+
+    @home_env.setter
+    def home_env(self, home_env):
+        self._home_env = home_env
+
+    def _record_error(self, offset, line, error):
+        """
+        <Purpose>
+          Record a malformed line in the error log, or re-raise the error it
+          caused if the parser has no error budget.
+
+        <Arguments>
+          offset:
+            The byte offset of the line in the trace file.
+          line:
+            The malformed line.
+          error:
+            The exception raised while parsing the line.
+
+        <Exceptions>
+          ErrorBudgetExceeded:
+            If recording this line exceeds the error budget.
+
+        <Side Effects>
+          Appends a MalformedLine to self.errors.
+
+        <Returns>
+          None
+        """
+
+        if self.error_budget is None:
+            raise error
+
+        self.errors.append(
+            MalformedLine(offset, line, error.__class__.__name__ + ": " + str(error))
+        )
+
+        if len(self.errors) > self.error_budget:
+            raise ErrorBudgetExceeded(self.errors)
 
     """ ABSTRACT METHODS """
 
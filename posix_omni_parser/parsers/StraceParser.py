@@ -29,14 +29,31 @@ from __future__ import print_function
 
 from builtins import str
 from builtins import range
+import copy
+import os
+import pickle
 import re
 
 from .. import Syscall
+from .. import interning
+from .. import parsing_classes
+from .. import spilling
+from .. import timestamps
 from .Parser import Parser
 
 
 DEBUG = False
 
+# lines starting with these markers (after the pid, timestamp and inst_pointer)
+# report signals and process exits rather than system calls.
+_SIGNAL_MARKERS = ("+++", "---")
+
+# 8216  +++ exited with 0 +++
+# 8216  15:32:16.190216 +++ killed by SIGKILL (core dumped) +++
+_RE_PROCESS_EXIT = re.compile(
+    r"(\d+)\s.*?\+\+\+ (?:exited with (-?\d+)|killed by (\w+))"
+)
+
 
 class StraceParser(Parser):
     """
@@ -56,18 +73,54 @@ class StraceParser(Parser):
         the current trace was being generated. See _detect_trace_options() for
         more information.
 
+      self.trace_date:
+        The datetime.date the -t and -tt timestamps are anchored to, or None
+        for 1970-01-01.
+
       self.home_env:
         This instance variable holds the contents of the HOME environment
         variable, if this information can be extracted from the trace file itself.
+        It is read from the trace on first access.
+
+      self.environment:
+        The Environment of the execve system call on the first line of the
+        trace, or None. It is read from the trace on first access. The
+        environments of later execve calls are the Environment arguments of
+        their Syscall objects.
 
       self._re_unfinished_syscall,
       self._re_resumed_syscall,
       self._re_complete_syscall:
         Regular expressions used to parse lines of the strace output. Each line of
         the strace output represents a system call.
+
+      self._clock:
+        Converts the timestamps of the trace to nanoseconds, or None if the trace
+        has no timestamps. See the timestamps module.
+
+      self._line_parser:
+        A version of _parse_line specialized for self.trace_options. See
+        _build_line_parser().
+
+      self.string_pool:
+        The InternPool shared by the system calls of the trace, or None if
+        strings are not interned.
+
+      self.flag_vocabulary:
+        The FlagVocabulary of the compact Flags of the trace, or None if Flags
+        are not compact.
     """
 
-    def __init__(self, trace_path, pickle_file):
+    def __init__(
+        self,
+        trace_path,
+        pickle_file,
+        trace_date=None,
+        error_budget=None,
+        intern_strings=True,
+        compact_flags=False,
+        spill_threshold=None,
+    ):
         """
         <Purpose>
           Creates an StraceParser object containing all the information needed to
@@ -80,6 +133,27 @@ class StraceParser(Parser):
           pickle_file:
             The path to the pickle file containing the parsed system call
             representations.
+          trace_date:
+            A datetime.date the trace was gathered on. Timestamps of traces
+            gathered with -t or -tt only hold the time of day, and are anchored
+            to this date. If not given they are anchored to 1970-01-01.
+          error_budget:
+            The number of malformed lines to skip before giving up on the trace,
+            or None to raise at the first one. See Parser.
+          intern_strings:
+            Whether the system call names, error labels, flags and paths that
+            repeat across the trace should share a single string object. This
+            saves a lot of memory on long traces.
+          compact_flags:
+            Whether Flags arguments should be stored in compact mode, as
+            bitmasks over a FlagVocabulary built for the trace. See
+            parsing_classes.Flags.
+          spill_threshold:
+            None to keep the whole trace in memory. Otherwise the length from
+            which arguments without a specific type (e.g. read and write
+            buffers) and the original lines of the system calls are not kept
+            in memory but read back from the trace file when accessed. See
+            _spill().
 
                                 <Side Effects>
           None
@@ -88,7 +162,7 @@ class StraceParser(Parser):
           None
         """
 
-        Parser.__init__(self, trace_path, pickle_file)
+        Parser.__init__(self, trace_path, pickle_file, error_budget)
 
         # regex compiled for _parse_line
         #
@@ -125,19 +199,58 @@ class StraceParser(Parser):
         # unfinished syscall, then it need to be recorded
         self.unfinished_syscalls = []
 
-    def _get_home_environment(self):
+        # byte offset of the first trace line not read yet by iter_syscalls.
+        self.offset = 0
+
+        # (pid, status) of the process exit lines read by iter_syscalls and not
+        # handed to the sinks yet. See parse_trace.
+        self.pending_exits = []
+
+        # timestamps of all formats are converted to nanoseconds by the clock of
+        # the detected timestamp option.
+        self.trace_date = trace_date
+        self._clock = None
+        if self.trace_options["timestamp"]:
+            self._clock = timestamps.make_clock(
+                self.trace_options["timestamp"], trace_date
+            )
+
+        # strings repeating across the trace are shared through a pool.
+        self.string_pool = None
+        self._intern = _keep
+        if intern_strings:
+            self.string_pool = interning.InternPool()
+            self._intern = self.string_pool.intern
+
+        self.flag_vocabulary = None
+        if compact_flags:
+            self.flag_vocabulary = interning.FlagVocabulary()
+
+        self.spill_threshold = spill_threshold
+        self._trace_file = None
+        if spill_threshold is not None:
+            self._trace_file = spilling.TraceFile(trace_path)
+
+        # set on the first access of self.environment.
+        self._environment = None
+        self._environment_read = False
+
+        # the trace options are known at this point so build the line parser
+        # specialized for them.
+        self._line_parser = self._build_line_parser()
+
+    @property
+    def environment(self):
+        if not self._environment_read:
+            self._environment = self._get_environment()
+            self._environment_read = True
+        return self._environment
+
+    def _get_environment(self):
         """
         <Purpose>
-          Read the first line of the trace file. If that line represents the execve
-          system call then examine it to see whether the HOME environment variable
-          is set. If it is set, extract it and return it, otherwise return None. The
-          HOME environment variable is sometimes set to a path other than the
-          current directory i.e the directory in which the traced application was
-          executed. This usually happens when running a benchmarks. Keeping track of
-          the HOME env. variable is particularly useful when reasoning about
-          relative paths that appear in the trace file. System calls referring to
-          files using relative paths, might refer to these files relative to the
-          HOME variable defined in the execve syscall.
+          Read the first line of the trace file. If that line represents the
+          execve system call, return the Environment of its envp argument.
 
         <Arguments>
           None
@@ -150,8 +263,8 @@ class StraceParser(Parser):
           None
 
         <Returns>
-          The HOME env path as defined in the execve system call, or None if the
-          HOME path was not found.
+          An Environment, or None if the trace does not start with an execve
+          system call printing its environment.
         """
 
         try:
@@ -161,30 +274,66 @@ class StraceParser(Parser):
         except IOError:
             raise IOError(
                 "Unable to read trace file when trying to extract the "
-                + "HOME environment variable."
+                + "environment variables."
             )
         finally:
             fh.close()
 
-        # If the 'HOME' variable is defined in the execve line, the HOME_PATH variable will be set
-        # to the path of 'HOME'.
-        if "execve(" in execve_line:
-            # split to get the arguments of the syscall
-            execve_parts = execve_line.split(", ")
-
-            # the parameter of the HOME variable in the execve syscall has this
-            # format:
-            # "HOME=/home/savvas/tests/" including the double quotes.
-            for part in execve_parts:
-                if part.startswith('"HOME='):
-                    # remove the double quotes
-                    part = part.strip('"')
+        if "execve(" not in execve_line:
+            return None
 
-                    # return the path excluding the "HOME="" label in front of it.
-                    return part[part.find("HOME=") + 5 :]
+        # only the arguments are needed, so the timestamp clock and the
+        # unfinished syscalls of the parser are left alone.
+        m = self._re_complete_syscall.match(execve_line.strip())
+        if not m:
+            m = self._re_unfinished_syscall.match(execve_line.strip())
+        if not m:
+            return None
 
+        args = parsing_classes.cast_args(
+            "execve",
+            Syscall.Syscall.COMPLETE,
+            self.syscall_definitions,
+            self._parse_args(m.group(2)),
+        )
+        for arg in args:
+            if isinstance(arg, parsing_classes.Environment):
+                return arg
         return None
 
+    def _get_home_environment(self):
+        """
+        <Purpose>
+          Look up the HOME environment variable in the environment of the execve
+          system call on the first line of the trace. If it is set, return it,
+          otherwise return None. The HOME environment variable is sometimes set
+          to a path other than the current directory i.e the directory in which
+          the traced application was executed. This usually happens when running a benchmarks. Keeping track of
+          the HOME env. variable is particularly useful when reasoning about
+          relative paths that appear in the trace file. System calls referring to
+          files using relative paths, might refer to these files relative to the
+          HOME variable defined in the execve syscall.
+
+        <Arguments>
+          None
+
+        <Exceptions>
+          IOError:
+            Unable to read from the trace file.
+
+        <Side Effects>
+          None
+
+        <Returns>
+          The HOME env path as defined in the execve system call, or None if the
+          HOME path was not found.
+        """
+
+        environment = self.environment
+        if environment is None:
+            return None
+        return environment.get("HOME")
+
     def _detect_trace_options(self):
         """
         <Purpose>
@@ -400,15 +549,14 @@ class StraceParser(Parser):
             )
 
         # let's first check for options -o -f -i, -r, -t, -tt and -ttt which impose
-        # changes before the name of the system call.
-        front_parts = upto_first_bracket_string.split()
+        # changes before the name of the system call. The greedy match above can
+        # run past the name of complicated calls (e.g. getsockopt()) whose
+        # arguments contain brackets, so only look at what comes before the first
+        # opening bracket.
+        front_parts = upto_first_bracket_string.split("(", 1)[0].split()
 
         # front_parts should include the name of the syscall, the pid and optionally
         # other information based on options used with the strace utility.
-        # HACK HACK HACK:  Parsing fails for complicated calls (e.g.
-        # getsockopt(). So we chop off the garbage knowing we will always use
-        # the same command switches
-        front_parts = front_parts[:2]
         if len(front_parts) < 1 or len(front_parts) > 4:
             # if the string before the first openning bracket has less than 1 parts or
             # more than 4 parts, the format of the trace line is incorrect.
@@ -483,7 +631,7 @@ class StraceParser(Parser):
                         "[" in front_parts[0] and "]" in front_parts[0]
                     ), "Invalid format when trying to parse value of -i option"
                     trace_options["inst_pointer"] = True
-                front_parts.pop(0)
+                    front_parts.pop(0)
 
         # all option values were consumed so there should be no more parts left.
         assert (
@@ -564,19 +712,51 @@ class StraceParser(Parser):
 
         return trace_options
 
-    def parse_trace(self):
+    def parse_trace(self, sinks=None, checkpoint_path=None, checkpoint_interval=100000):
         """
         <Purpose>
           Read each line of the trace file and parse it into a Syscall object.
 
+          Long parses can be checkpointed. Every checkpoint_interval system calls
+          the state of the parse is saved to checkpoint_path: the byte offset
+          reached in the trace, the pending unfinished syscalls, the trace
+          options, the HOME environment variable, the timestamp clock, the flag
+          vocabulary, the error log, the state of the sinks and the system calls
+          parsed so far (these are appended to checkpoint_path + ".syscalls").
+          If the parse is interrupted, calling parse_trace again with the same
+          checkpoint_path resumes from the last checkpoint and gives the same
+          result as an uninterrupted parse. The checkpoint files are removed once
+          the whole trace is parsed.
+
         <Arguments>
-          None
+          sinks:
+            A list of objects with an add(syscall) method, each called with every
+            parsed Syscall in trace order. To be checkpointed, a sink must be
+            picklable, or implement __getstate__ and __setstate__. Sinks with an
+            exited(pid, status) method are also told about the processes exiting,
+            in trace order: status is ("exited", exit code) for the
+            "+++ exited with N +++" lines and ("killed", signal name) for the
+            "+++ killed by SIGNAL +++" ones.
+
+          checkpoint_path:
+            The path of the checkpoint file, or None to not checkpoint.
+
+          checkpoint_interval:
+            The number of system calls parsed between checkpoints.
 
         <Exceptions>
-          None
+          ErrorBudgetExceeded:
+            If the parser has an error budget and the trace has more malformed
+            lines than it allows. Without an error budget the error raised by
+            the first malformed line is propagated instead.
+
+          Exception:
+            If the checkpoint to resume from was written for a different trace
+            file, or the trace file changed since.
 
         <Side Effects>
-          None
+          Malformed lines are recorded in self.errors if the parser has an error
+          budget. Checkpoint files are written, and removed at the end.
 
         <Returns>
           syscalls:
@@ -587,16 +767,363 @@ class StraceParser(Parser):
         # this list will hold all the parsed system calls.
         syscalls = []
 
-        # this list will hold all pending (i.e unfinished) syscalls
-        # unfinished_syscalls = []
+        if sinks is None:
+            sinks = []
+
+        offset = 0
+        if checkpoint_path is not None:
+            if os.path.exists(checkpoint_path):
+                offset = self._resume_from_checkpoint(checkpoint_path, syscalls, sinks)
+            else:
+                # drop the system calls of an earlier run that never reached its
+                # first checkpoint.
+                open(checkpoint_path + ".syscalls", "wb").close()
+
+        # number of system calls parsed since the last checkpoint.
+        pending = 0
+
+        exit_sinks = [sink for sink in sinks if hasattr(sink, "exited")]
+
+        for syscall in self.iter_syscalls(offset):
+            if self.pending_exits:
+                self._hand_exits(exit_sinks)
+            syscalls.append(syscall)
+            for sink in sinks:
+                sink.add(syscall)
+
+            if checkpoint_path is not None:
+                pending += 1
+                if pending == checkpoint_interval:
+                    self._write_checkpoint(checkpoint_path, syscalls[-pending:], sinks)
+                    pending = 0
+
+        self._hand_exits(exit_sinks)
 
+        if checkpoint_path is not None:
+            os.remove(checkpoint_path + ".syscalls")
+            if os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+
+        return syscalls
+
+    def _hand_exits(self, exit_sinks):
+        for pid, status in self.pending_exits:
+            for sink in exit_sinks:
+                sink.exited(pid, status)
+        self.pending_exits = []
+
+    def iter_syscalls(self, offset=0, skip=0):
+        """
+        <Purpose>
+          Like parse_trace, but yields the Syscall objects one at a time as the
+          trace file is read instead of collecting them in a list. Use this to
+          process traces that do not fit in memory.
+
+          Between two yielded system calls, self.offset holds the byte offset of
+          the first line not read yet. The process exit lines read are appended
+          to self.pending_exits as (pid, status) pairs, see parse_trace; callers
+          of iter_syscalls interested in them should empty it.
+
+        <Arguments>
+          offset:
+            The byte offset in the trace file to start parsing from. It must be
+            the start of a line.
+
+          skip:
+            The number of system calls to skip before the first one yielded.
+            The lines of the skipped system calls are only split into their
+            parts, to keep track of the unfinished syscalls and the timestamp
+            clock, and their arguments are not cast into Syscall objects.
+
+        <Exceptions>
+          See parse_trace.
+
+        <Side Effects>
+          See parse_trace.
+
+        <Returns>
+          A generator of Syscall objects.
+        """
+
+        for line_offset, line in self._read_lines(offset):
+            # the line_parts will be set to None if the trace line is not a
+            # valid system call trace. So we just ignore the line entirely.
+            try:
+                line_parts = self._line_parser(line)
+                if line_parts == None:
+                    if "+++ " in line:
+                        self._record_exit(line)
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                syscall = Syscall.Syscall(
+                    self.syscall_definitions,
+                    line,
+                    line_parts,
+                    self.string_pool,
+                    self.flag_vocabulary,
+                )
+                if self.spill_threshold is not None:
+                    self._spill(syscall, line_offset, line)
+            except Exception as e:
+                self._record_error(line_offset, line, e)
+                continue
+
+            yield syscall
+
+    def copy_clock(self):
+        """
+        Return a copy of the clock converting the timestamps of the trace in its
+        current state, or None if the trace has no timestamps. See
+        restore_line_state.
+        """
+        return copy.deepcopy(self._clock)
+
+    def restore_line_state(self, clock, unfinished_lines):
+        """
+        <Purpose>
+          Restore the state carried from a line of the trace to the next, so
+          that iter_syscalls can start from the middle of the trace.
+
+        <Arguments>
+          clock:
+            A clock returned by copy_clock, in the state it had before the line
+            to start from. It is copied, not used directly.
+
+          unfinished_lines:
+            The lines of the system calls that are unfinished before the line to
+            start from, in trace order.
+
+        <Exceptions>
+          See parse_trace, if an unfinished line is malformed.
+
+        <Side Effects>
+          Replaces self.unfinished_syscalls, empties self.pending_exits and
+          rebuilds the line parser with the clock.
+
+        <Returns>
+          None
+        """
+
+        self.unfinished_syscalls = []
+        self.pending_exits = []
+
+        # only the arguments of the unfinished lines are kept, so parse them with
+        # a throwaway clock.
+        self._clock = copy.deepcopy(clock)
+        self._line_parser = self._build_line_parser()
+        for line in unfinished_lines:
+            self._line_parser(line)
+
+        self._clock = copy.deepcopy(clock)
+        self._line_parser = self._build_line_parser()
+
+    def _record_exit(self, line):
+        m = _RE_PROCESS_EXIT.match(line.strip())
+        if m is None:
+            return
+        pid, code, signal = m.groups()
+        if code is not None:
+            self.pending_exits.append((int(pid), ("exited", int(code))))
+        else:
+            self.pending_exits.append((int(pid), ("killed", self._intern(signal))))
+
+    def _write_checkpoint(self, checkpoint_path, new_syscalls, sinks):
+        """
+        <Purpose>
+          Save the state of the parse so that it can be resumed from this point.
+          See parse_trace.
+
+        <Arguments>
+          checkpoint_path:
+            The path of the checkpoint file.
+
+          new_syscalls:
+            The system calls parsed since the previous checkpoint.
+
+          sinks:
+            The sinks given to parse_trace.
+
+        <Exceptions>
+          None
+
+        <Side Effects>
+          Appends new_syscalls to checkpoint_path + ".syscalls" and replaces the
+          checkpoint file.
+
+        <Returns>
+          None
+        """
+
+        # append the new system calls first. Until the checkpoint file is replaced
+        # the previous checkpoint still records where the old ones end.
+        with open(checkpoint_path + ".syscalls", "ab") as fh:
+            pickle.dump(new_syscalls, fh, pickle.HIGHEST_PROTOCOL)
+            fh.flush()
+            os.fsync(fh.fileno())
+            syscalls_size = fh.tell()
+
+        trace_stat = os.stat(self.trace_path)
+        checkpoint = {
+            "trace_path": self.trace_path,
+            "trace_size": trace_stat.st_size,
+            "trace_mtime": trace_stat.st_mtime,
+            "offset": self.offset,
+            "unfinished_syscalls": self.unfinished_syscalls,
+            "trace_options": self.trace_options,
+            "parser_options": self._checkpoint_options(),
+            "home_env": self.home_env,
+            "clock": self._clock,
+            "flag_vocabulary": self.flag_vocabulary,
+            "errors": self.errors,
+            "syscalls_size": syscalls_size,
+            "sinks": [_get_sink_state(sink) for sink in sinks],
+        }
+
+        # write to a temporary file and rename it so that an interruption never
+        # leaves a half written checkpoint behind.
+        with open(checkpoint_path + ".tmp", "wb") as fh:
+            pickle.dump(checkpoint, fh, pickle.HIGHEST_PROTOCOL)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(checkpoint_path + ".tmp", checkpoint_path)
+
+    def _checkpoint_options(self):
+        # the constructor options the state saved in a checkpoint depends on.
+        return {
+            "trace_date": self.trace_date,
+            "intern_strings": self.string_pool is not None,
+            "compact_flags": self.flag_vocabulary is not None,
+        }
+
+    def _resume_from_checkpoint(self, checkpoint_path, syscalls, sinks):
+        """
+        <Purpose>
+          Restore the state of the parse saved in a checkpoint. See parse_trace.
+
+        <Arguments>
+          checkpoint_path:
+            The path of the checkpoint file.
+
+          syscalls:
+            The list to which the system calls parsed before the checkpoint are
+            added.
+
+          sinks:
+            The sinks given to parse_trace. Their state is restored.
+
+        <Exceptions>
+          Exception:
+            If the checkpoint was written for a different trace file, the trace
+            file changed since, or it was written by a parser with different
+            trace_date, intern_strings or compact_flags options or a different
+            number of sinks. The parser state is left untouched.
+
+        <Side Effects>
+          Restores the parser state, and drops the system calls written to
+          checkpoint_path + ".syscalls" after the checkpoint.
+
+        <Returns>
+          offset:
+            The byte offset in the trace file to resume parsing from.
+        """
+
+        with open(checkpoint_path, "rb") as fh:
+            checkpoint = pickle.load(fh)
+
+        trace_stat = os.stat(self.trace_path)
+        if (
+            checkpoint["trace_path"] != self.trace_path
+            or checkpoint["trace_size"] != trace_stat.st_size
+            or checkpoint["trace_mtime"] != trace_stat.st_mtime
+        ):
+            raise Exception(
+                "Checkpoint `"
+                + checkpoint_path
+                + "` does not belong to trace `"
+                + self.trace_path
+                + "`"
+            )
+
+        if checkpoint.get("parser_options") != self._checkpoint_options():
+            raise Exception(
+                "Checkpoint `"
+                + checkpoint_path
+                + "` was written with parser options "
+                + repr(checkpoint.get("parser_options"))
+                + ", not "
+                + repr(self._checkpoint_options())
+            )
+
+        if len(sinks) != len(checkpoint["sinks"]):
+            raise Exception(
+                "Checkpoint `"
+                + checkpoint_path
+                + "` was written with "
+                + str(len(checkpoint["sinks"]))
+                + " sinks, not "
+                + str(len(sinks))
+            )
+
+        with open(checkpoint_path + ".syscalls", "r+b") as fh:
+            fh.truncate(checkpoint["syscalls_size"])
+            while fh.tell() < checkpoint["syscalls_size"]:
+                syscalls.extend(pickle.load(fh))
+
+        self.unfinished_syscalls = checkpoint["unfinished_syscalls"]
+        self.trace_options = checkpoint["trace_options"]
+        self.home_env = checkpoint["home_env"]
+        self.errors = checkpoint["errors"]
+
+        # compact Flags parsed from now on must use the bits of the ones parsed
+        # before the checkpoint.
+        self.flag_vocabulary = checkpoint["flag_vocabulary"]
+
+        # the line parser holds on to the clock, so rebuild it with the restored
+        # one.
+        self._clock = checkpoint["clock"]
+        self._line_parser = self._build_line_parser()
+
+        for sink, state in zip(sinks, checkpoint["sinks"]):
+            _set_sink_state(sink, state)
+
+        return checkpoint["offset"]
+
+    def _read_lines(self, offset=0):
+        """
+        <Purpose>
+          Read the lines of the trace file that may hold system calls, skipping
+          empty lines and comments.
+
+        <Arguments>
+          offset:
+            The byte offset in the trace file to start reading from. It must be
+            the start of a line.
+
+        <Exceptions>
+          None
+
+        <Side Effects>
+          None
+
+        <Returns>
+          A generator of (offset, line) tuples, where offset is the byte offset
+          in the trace file of the first non-blank character of the line and
+          line is the stripped line.
+        """
+
+        # read bytes rather than text so that byte offsets are known.
+        trace_file_handler = open(self.trace_path, "rb")
         try:
-            # open the trace file.
-            trace_file_handler = open(self.trace_path)
+            trace_file_handler.seek(offset)
 
-            # process each line of the trace.
-            for line in trace_file_handler:
-                line = line.strip()
+            for raw_line in trace_file_handler:
+                line_offset = offset + len(raw_line) - len(raw_line.lstrip())
+                offset += len(raw_line)
+                self.offset = offset
+
+                line = raw_line.decode("utf-8", "replace").strip()
 
                 # skip empty lines
                 if line == "":
@@ -609,19 +1136,98 @@ class StraceParser(Parser):
                 if DEBUG:
                     print(line)
 
-                # line_parts = self._parse_line(line, unfinished_syscalls)
-                line_parts = self._parse_line(line)
-
-                # the line_parts will be set to None if the trace line is not a valid
-                # system call trace. So we just ignore the line entirely.
-                if line_parts != None:
-                    syscalls.append(
-                        Syscall.Syscall(self.syscall_definitions, line, line_parts)
-                    )
+                yield line_offset, line
         finally:
             trace_file_handler.close()
 
-        return syscalls
+    def _spill(self, syscall, line_offset, line):
+        """
+        <Purpose>
+          Replace the long strings of a system call by references into the trace
+          file: its original line, and its UnimplementedType and Environment
+          arguments at least self.spill_threshold characters long. Arrays of
+          unknown arguments are split in one argument per item when parsed. If
+          such an array is that long its items are first joined back into a
+          single UnimplementedType argument.
+
+          Arguments of an unfinished system call are not in the line of the
+          resuming one, and are kept in memory.
+
+        <Arguments>
+          syscall:
+            The Syscall parsed from line.
+          line_offset:
+            The byte offset of line in the trace file.
+          line:
+            The stripped line.
+
+        <Exceptions>
+          None
+
+        <Side Effects>
+          The syscall is changed in place.
+
+        <Returns>
+          None
+        """
+
+        # the line is the only string the arguments come from, so nothing in it
+        # can reach the threshold if the line itself does not. Character
+        # positions in lines that were not valid UTF-8 do not map to bytes.
+        if len(line) < self.spill_threshold or "\ufffd" in line:
+            return
+
+        def span(start, string):
+            return spilling.FileSpan(
+                self._trace_file,
+                line_offset + len(line[:start].encode("utf-8")),
+                len(string.encode("utf-8")),
+            )
+
+        syscall.spill_line(span(0, line))
+
+        if not syscall.args:
+            return
+
+        args = []
+        position = 0
+        index = 0
+        while index < len(syscall.args):
+            arg = syscall.args[index]
+            index += 1
+            if isinstance(arg, parsing_classes.Environment):
+                value = str(arg)
+            elif isinstance(arg, parsing_classes.UnimplementedType):
+                value = arg.value
+            else:
+                args.append(arg)
+                continue
+
+            if value.startswith("[") and not value.endswith("]"):
+                # collect the items of the array up to the one closing it.
+                end = index
+                while (
+                    end < len(syscall.args)
+                    and type(syscall.args[end]) is parsing_classes.UnimplementedType
+                    and not syscall.args[end - 1].value.endswith("]")
+                ):
+                    end += 1
+                items = [value] + [a.value for a in syscall.args[index:end]]
+                if items[-1].endswith("]") and len(items) > 1:
+                    joined = ", ".join(items)
+                    if len(joined) >= self.spill_threshold:
+                        arg = parsing_classes.UnimplementedType([joined])
+                        value = joined
+                        index = end
+
+            if len(value) >= self.spill_threshold:
+                start = line.find(value, position)
+                if start != -1:
+                    arg.spill(span(start, value))
+                    position = start + len(value)
+            args.append(arg)
+
+        syscall.args = tuple(args)
 
     def parse_line(self, line):
         line = line.strip()
@@ -637,10 +1243,16 @@ class StraceParser(Parser):
         if DEBUG:
             print(line)
 
-        line_parts = self._parse_line(line)
+        line_parts = self._line_parser(line)
 
         if line_parts != None:
-            return Syscall.Syscall(self.syscall_definitions, line, line_parts)
+            return Syscall.Syscall(
+                self.syscall_definitions,
+                line,
+                line_parts,
+                self.string_pool,
+                self.flag_vocabulary,
+            )
         # pid can never be -1, so if -1 then Syscall is none
         return None
 
@@ -672,8 +1284,8 @@ class StraceParser(Parser):
           line_parts:
             A dictionaly with:
             type:         Type of system call ("completed", "unfinished", "resumed")
-            pid:          The process id (eg 8094)
-            timestamp:    Start time of the syscall.
+            pid:          The process id as an int (eg 8094)
+            timestamp:    Start time of the syscall in nanoseconds (int).
             inst_pointer: The instruction pointer at the time of the system call.
             name:         The name of the system call (eg "sendto")
             args:         A list of strings each representing a syscall arguments.
@@ -689,8 +1301,10 @@ class StraceParser(Parser):
           - timestamp, inst_pointer and elapsed_time are optional and exist only
             if the corresponding option is given. If the option is not given, the
             value is set to None.
-          - Format and meaning of timestamp value depends on the timestamp option
-            (r/t/tt/ttt).
+          - Meaning of timestamp value depends on the timestamp option. It is
+            nanoseconds since the epoch for ttt, since the midnight of the trace
+            date for t/tt and since the first line of the trace for r. See the
+            timestamps module.
           - For unfinished syscalls (type="unfinished"), args is an incomplete set
             of arguments. In addition, return and elapsed_time are always set to
             None.
@@ -703,25 +1317,16 @@ class StraceParser(Parser):
         remaining_line = line
 
         # pid is the first part of the line.
-        line_parts["pid"], remaining_line = remaining_line.split(None, 1)
-        assert line_parts["pid"].isdigit(), (
-            "Invalid format of parsed pid in line `" + line + "`"
-        )
-
-        # Ignore lines that indicate signals. These lines start with either "+++"
-        # or "---" (after the pid)
-        # Example:
-        # 14037 --- SIGCHLD (Child exited) @ 0 (0) ---
-        if remaining_line[:3] in ["+++", "---"]:
-            return None
+        pid, remaining_line = remaining_line.split(None, 1)
+        assert pid.isdigit(), "Invalid format of parsed pid in line `" + line + "`"
+        line_parts["pid"] = int(pid)
 
         # if the timestamp option is set, the next part of the line will be the
-        # timestamp.
+        # timestamp. Convert it to nanoseconds.
         line_parts["timestamp"] = None
         if self.trace_options["timestamp"]:
-            line_parts["timestamp"], remaining_line = float(
-                remaining_line.split(None, 1)
-            )
+            timestamp, remaining_line = remaining_line.split(None, 1)
+            line_parts["timestamp"] = self._clock(timestamp)
 
         # if the inst_pointer option is set, the next part of the line will be the
         # inst_pointer.
@@ -730,6 +1335,135 @@ class StraceParser(Parser):
             line_parts["inst_pointer"], remaining_line = remaining_line.split(None, 1)
             line_parts["inst_pointer"] = line_parts["inst_pointer"].strip("[]")
 
+        # Ignore lines that indicate signals. These lines start with either "+++"
+        # or "---" (after the pid and the optional timestamp and inst_pointer)
+        # Example:
+        # 14037 --- SIGCHLD (Child exited) @ 0 (0) ---
+        if remaining_line[:3] in _SIGNAL_MARKERS:
+            return None
+
+        # initialize elapsed_time
+        line_parts["elapsed_time"] = None
+
+        remaining_line = self._parse_syscall(line, line_parts, remaining_line)
+
+        # if the type of the syscall is unfinished then there is nothing else to parse.
+        if remaining_line is None:
+            return line_parts
+
+        # finally, if the elapsed_time option is set we should extract the elapsed
+        # time data. Because the remaining line could optionally include some
+        # unneeded information as shown in the examples of _parse_syscall, we'll
+        # only extract the data within the angle brackets. No elapsed time is
+        # provided in non returning syscalls.
+        if self.trace_options["elapsed_time"] and line_parts["return"] != ("?", None):
+            line_parts["elapsed_time"] = float(
+                remaining_line[
+                    remaining_line.rfind("<") + 1 : remaining_line.rfind(">")
+                ]
+            )
+
+        return line_parts
+
+    def _build_line_parser(self):
+        """
+        <Purpose>
+          The options detected by _detect_trace_options are fixed for the whole
+          trace, so there is no need to check them again for every line like
+          _parse_line does. Build a line parser specialized for the detected
+          combination of -t/-tt/-ttt/-r, -i and -T options. The returned function
+          splits the front of the line in a single step and has no per-line
+          option checks or trace_options lookups, while giving exactly the same
+          result as _parse_line.
+
+        <Arguments>
+          None
+
+        <Exceptions>
+          None
+
+        <Side Effects>
+          None
+
+        <Returns>
+          parse_line:
+            A function that takes a trace line and returns its line_parts, or None
+            if the line is not a system call. See _parse_line.
+        """
+
+        split_front = _FRONT_SPLITTERS[
+            (
+                self.trace_options["timestamp"] is not None,
+                self.trace_options["inst_pointer"],
+            )
+        ](self._clock)
+        parse_syscall = self._parse_syscall
+
+        if self.trace_options["elapsed_time"]:
+
+            def parse_line(line):
+                line_parts, remaining_line = split_front(line)
+                if line_parts is None:
+                    return None
+
+                remaining_line = parse_syscall(line, line_parts, remaining_line)
+                if remaining_line is not None and line_parts["return"] != ("?", None):
+                    line_parts["elapsed_time"] = float(
+                        remaining_line[
+                            remaining_line.rfind("<") + 1 : remaining_line.rfind(">")
+                        ]
+                    )
+
+                return line_parts
+
+        else:
+
+            def parse_line(line):
+                line_parts, remaining_line = split_front(line)
+                if line_parts is None:
+                    return None
+
+                parse_syscall(line, line_parts, remaining_line)
+                return line_parts
+
+        return parse_line
+
+    def _parse_syscall(self, line, line_parts, remaining_line):
+        """
+        <Purpose>
+          Parse the part of a trace line that follows the pid, timestamp and
+          inst_pointer, i.e. the name, arguments and return part of the system
+          call. This part of the line has the same format regardless of the
+          options used with strace, so it is shared between _parse_line and the
+          line parser returned by _build_line_parser.
+
+        <Arguments>
+          line:
+            A string representing the entire trace line, used in error messages.
+
+          line_parts:
+            The dictionary of line parts being built. The type, name, args and
+            return entries are added to it.
+
+          remaining_line:
+            The part of the line starting with the name of the system call.
+
+        <Exceptions>
+          Exception:
+            If the line does not match the format of an unfinished, resumed or
+            complete system call.
+
+        <Side Effects>
+          Unfinished syscalls are recorded in self.unfinished_syscalls and resumed
+          syscalls pop their unfinished counterpart from it.
+
+        <Returns>
+          remaining_line:
+            What is left of the line after the return part, which may hold the
+            elapsed time. None if the system call is unfinished, in which case
+            there is nothing more to parse.
+        """
+
         # next, let's parse the name, args and return part of the line, according to
         # the type of the syscall.
 
@@ -758,7 +1492,7 @@ class StraceParser(Parser):
                     "Invalid format when parsing unfinished trace line `" + line + "`"
                 )
 
-            line_parts["name"] = m.group(1)
+            line_parts["name"] = self._intern(m.group(1))
             line_parts["args"] = self._parse_args(m.group(2))
             line_parts["return"] = None
 
@@ -781,7 +1515,7 @@ class StraceParser(Parser):
                     "Invalid format when parsing resumed trace line `" + line + "`"
                 )
 
-            line_parts["name"] = m.group(1)
+            line_parts["name"] = self._intern(m.group(1))
 
             # there should be a saved unfinished syscall corresponding to this
             # resuming syscall. Let's find its index so we can pop it.
@@ -819,7 +1553,7 @@ class StraceParser(Parser):
                     "Invalid format when parsing completed trace line `" + line + "`"
                 )
 
-            line_parts["name"] = m.group(1)
+            line_parts["name"] = self._intern(m.group(1))
             line_parts["args"] = self._parse_args(m.group(2))
             line_parts["return"] = m.group(3)
             remaining_line = m.group(4)
@@ -827,12 +1561,9 @@ class StraceParser(Parser):
         # fix the arguments of some specific system calls.
         self._fix_args(line_parts)
 
-        # initialize elapsed_time
-        line_parts["elapsed_time"] = None
-
         # if the type of the syscall is unfinished then there is nothing else to parse.
         if line_parts["type"] == Syscall.Syscall.UNFINISHED:
-            return line_parts
+            return None
 
         # at this point the remaining line should include the error label eg ENOENT
         # in case of an error, followed by the elapsed time of the system call
@@ -845,14 +1576,15 @@ class StraceParser(Parser):
         # 16707 1371659593.868020 [b770e424] fcntl64(4, F_GETFL) = 0x402 (flags O_RDWR|O_APPEND) <0.000009>
         # 26896 poll([{fd=4, events=POLLIN}, {fd=0, events=POLLIN}], 2, -1) = 1 ([{fd=4, revents=POLLIN}])
 
-        # the return part should be a positive number or a '-1' or a hex or a '?'
+        # the return part should be a decimal number or a hex or a '?'
         r = line_parts["return"]
-        assert r.isdigit() or r == "-1" or r == "?" or r.startswith("0x"), (
+        is_decimal = r.lstrip("-").isdigit()
+        assert is_decimal or r == "?" or r.startswith("0x"), (
             "Invalid format of return part in trace line `" + line + "`"
         )
 
         # if the return part is a number let's cast it.
-        if r.isdigit() or r == "-1":
+        if is_decimal:
             r = int(r)
 
         # now if the return part is -1 it should be accompanied with an error label
@@ -890,25 +1622,13 @@ class StraceParser(Parser):
         # we can now form the complete syscall return part, which is the return
         # value of the syscall followed by the error label if one exists, or None if
         # it doesn't.
+        if error_label is not None:
+            error_label = self._intern(error_label)
         line_parts["return"] = (r, error_label)
 
         # in a few system calls the remaining part holds additional information, e.g in poll system
         # call which has a value-return parameter.
-        remaining_line = self._parse_remaining_line(line_parts, remaining_line)
-
-        # finally, if the elapsed_time option is set we should extract the elapsed
-        # time data. Because the remaining line could optionally include some
-        # unneeded information as shown in the examples above, we'll only extract
-        # the data within the angle brackets. No elapsed time is provided in non
-        # returning syscalls.
-        if self.trace_options["elapsed_time"] and line_parts["return"] != ("?", None):
-            line_parts["elapsed_time"] = float(
-                remaining_line[
-                    remaining_line.rfind("<") + 1 : remaining_line.rfind(">")
-                ]
-            )
-
-        return line_parts
+        return self._parse_remaining_line(line_parts, remaining_line)
 
     def _parse_args(self, args_string):
         """
@@ -1108,3 +1828,114 @@ class StraceParser(Parser):
         )
 
         return representation
+
+
+def _keep(string):
+    # stands in for InternPool.intern when strings are not interned.
+    return string
+
+
+def _get_sink_state(sink):
+    # sinks follow the pickle protocol for their checkpointed state.
+    if hasattr(sink, "__getstate__"):
+        return sink.__getstate__()
+    return sink.__dict__
+
+
+def _set_sink_state(sink, state):
+    if hasattr(sink, "__setstate__"):
+        sink.__setstate__(state)
+    elif state is not None:
+        sink.__dict__.update(state)
+
+
+def _front_splitter(clock):
+    def split_front(line):
+        # 8085  open("syscalls.txt", O_RDONLY|O_CREAT, 0664) = 3
+        pid, remaining_line = line.split(None, 1)
+        assert pid.isdigit(), "Invalid format of parsed pid in line `" + line + "`"
+        if remaining_line[:3] in _SIGNAL_MARKERS:
+            return None, None
+
+        line_parts = {
+            "pid": int(pid),
+            "timestamp": None,
+            "inst_pointer": None,
+            "elapsed_time": None,
+        }
+        return line_parts, remaining_line
+
+    return split_front
+
+
+def _timestamp_front_splitter(clock):
+    def split_front(line):
+        # 8097  15:32:16.190216 open("syscalls.txt", O_RDONLY|O_CREAT, 0664) = 3
+        pid, timestamp, remaining_line = line.split(None, 2)
+        assert pid.isdigit(), "Invalid format of parsed pid in line `" + line + "`"
+
+        # convert the timestamp even for signal lines, -r timestamps are relative
+        # to the previous line whatever it is.
+        timestamp = clock(timestamp)
+        if remaining_line[:3] in _SIGNAL_MARKERS:
+            return None, None
+
+        line_parts = {
+            "pid": int(pid),
+            "timestamp": timestamp,
+            "inst_pointer": None,
+            "elapsed_time": None,
+        }
+        return line_parts, remaining_line
+
+    return split_front
+
+
+def _inst_pointer_front_splitter(clock):
+    def split_front(line):
+        # 8088  [b7739424] open("syscalls.txt", O_RDONLY|O_CREAT, 0664) = 3
+        pid, inst_pointer, remaining_line = line.split(None, 2)
+        assert pid.isdigit(), "Invalid format of parsed pid in line `" + line + "`"
+        if remaining_line[:3] in _SIGNAL_MARKERS:
+            return None, None
+
+        line_parts = {
+            "pid": int(pid),
+            "timestamp": None,
+            "inst_pointer": inst_pointer.strip("[]"),
+            "elapsed_time": None,
+        }
+        return line_parts, remaining_line
+
+    return split_front
+
+
+def _timestamp_inst_pointer_front_splitter(clock):
+    def split_front(line):
+        # 8112  0.000587 [b7795424] open("syscalls.txt", O_RDONLY|O_CREAT, 0664) = 3
+        pid, timestamp, inst_pointer, remaining_line = line.split(None, 3)
+        assert pid.isdigit(), "Invalid format of parsed pid in line `" + line + "`"
+        timestamp = clock(timestamp)
+        if remaining_line[:3] in _SIGNAL_MARKERS:
+            return None, None
+
+        line_parts = {
+            "pid": int(pid),
+            "timestamp": timestamp,
+            "inst_pointer": inst_pointer.strip("[]"),
+            "elapsed_time": None,
+        }
+        return line_parts, remaining_line
+
+    return split_front
+
+
+# factories of the front splitters used by StraceParser._build_line_parser, keyed
+# by whether the trace has timestamps and whether it has instruction pointers.
+# Each factory takes the clock converting the timestamps of the trace.
+_FRONT_SPLITTERS = {
+    (False, False): _front_splitter,
+    (True, False): _timestamp_front_splitter,
+    (False, True): _inst_pointer_front_splitter,
+    (True, True): _timestamp_inst_pointer_front_splitter,
+}
@@ -18,7 +18,11 @@ from __future__ import print_function
 from builtins import str
 from builtins import range
 from builtins import object
+import collections
 import socket
+import stat
+
+from . import memoization
 
 DEBUG = False
 
@@ -30,6 +34,20 @@ class ParsingClass(object):
     def __str__(self):
         return str(self.value)
 
+    def has_value(self):
+        """
+        Whether the expected value was found. See _cast_syscall_arg.
+        """
+        return self.value is not None
+
+    def intern_strings(self, string_pool):
+        """
+        Replace the strings held by this object with the equal strings of the
+        given InternPool. Classes holding strings that repeat across system calls
+        override this.
+        """
+        pass
+
 
 # This class is used to wrap all arguments for which a specific type is not yet
 # implemented.
@@ -37,6 +55,28 @@ class UnimplementedType(ParsingClass):
     def __init__(self, string_args):
         self.value = string_args.pop(0)
 
+    @property
+    def value(self):
+        # a spilled value is read back from the trace file on every access.
+        if self._span is not None:
+            return self._span.read()
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self._span = None
+
+    def has_value(self):
+        return self._span is not None or self._value is not None
+
+    def spill(self, span):
+        """
+        Drop the value from memory, keeping the FileSpan it can be read from.
+        """
+        self._span = span
+        self._value = None
+
 
 # This object is used to indicate that a system call did not return the expected
 # value. This can happen for instance when a system call has an error, in which
@@ -242,9 +282,147 @@ class Filepath(ParsingClass):
         # Converting a Filepath to a string restores the surrounding quotes
         return '"' + self.value + '"'
 
+    def intern_strings(self, string_pool):
+        self.value = string_pool.intern(self.value)
+
+
+class StringArray(UnimplementedType):
+    """
+    An array of strings, e.g. the argv of execve, kept as the text strace
+    printed: ["ls", "-l"]. The argument splitter cuts the array in one argument
+    per item, so they are joined back.
+    """
+
+    def __init__(self, string_args):
+        items = [string_args.pop(0)]
+        while not items[-1].endswith("]") and len(string_args) > 0:
+            items.append(string_args.pop(0))
+        UnimplementedType.__init__(self, [", ".join(items)])
+
+
+class Environment(ParsingClass):
+    """
+    The environment array of execve. value is the list of variables as printed
+    by strace, e.g. ['"HOME=/root"', '"PWD=/tmp"'], and variables can be looked up
+    by name, e.g. environment["HOME"] or environment.get("PWD"). Values are
+    returned as printed, without the surrounding quotes.
+
+    The array is only scanned on the first lookup. When strace was run without
+    -v the variables are not printed ([/* 51 vars */]) and lookups find nothing.
+    """
+
+    def __init__(self, string_args):
+        # set by spill()
+        self._span = None
+
+        # name -> value, built on the first lookup.
+        self._variables = None
+
+        items = [string_args.pop(0)]
+        while not items[-1].endswith("]") and len(string_args) > 0:
+            items.append(string_args.pop(0))
+
+        items[0] = items[0][1:]
+        items[-1] = items[-1][:-1]
+        if items == [""]:
+            items = []
+        self._items = items
+
+    @property
+    def value(self):
+        # a spilled array is read back from the trace file on every access.
+        if self._span is not None:
+            items = self._span.read()[1:-1]
+            if items == "":
+                return []
+            return _merge_quoted_items(items.split(", "))
+        return self._items
+
+    def has_value(self):
+        return True
+
+    def spill(self, span):
+        """
+        Drop the array from memory, keeping the FileSpan it can be read from.
+        """
+        self._span = span
+        self._items = None
+
+    @property
+    def variables(self):
+        """
+        A dict of the variables of the environment.
+        """
+        if self._variables is None:
+            variables = {}
+            for item in self.value:
+                # skip "/* 51 vars */" and the "..." of truncated arrays.
+                if not item.startswith('"') or "=" not in item:
+                    continue
+                name, _, value = item[1:-1].partition("=")
+                variables[name] = value
+            self._variables = variables
+        return self._variables
+
+    def __getitem__(self, name):
+        return self.variables[name]
+
+    def __contains__(self, name):
+        return name in self.variables
+
+    def get(self, name, default=None):
+        return self.variables.get(name, default)
+
+    def __str__(self):
+        return "[" + ", ".join(self.value) + "]"
+
+    def __getstate__(self):
+        # the variables are cheap to scan again.
+        state = dict(self.__dict__)
+        state["_variables"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+
+def _merge_quoted_items(items):
+    """
+    Items split on ", " may be parts of a quoted string holding ", ". Join them
+    back. See also Parser._merge_quote_args.
+    """
+    merged = []
+    for item in items:
+        if merged and merged[-1].startswith('"') and not _is_closed(merged[-1]):
+            merged[-1] += ", " + item
+        else:
+            merged.append(item)
+    return merged
+
+
+def _is_closed(quoted):
+    # strace truncates long strings with "...
+    string = quoted[:-3] if quoted.endswith('"...') else quoted
+    if len(string) < 2 or not string.endswith('"'):
+        return False
+    backslashes = len(string[:-1]) - len(string[:-1].rstrip("\\"))
+    return backslashes % 2 == 0
+
 
 class Flags(ParsingClass):
+    """
+    A list of flags, e.g. O_RDONLY|O_CLOEXEC.
+
+    In compact mode (see compact()) the flags are also held as an int bitmask
+    over the FlagVocabulary of the trace, and the list of flags is stored as a
+    tuple shared by all the equal Flags of the trace. value still returns a list.
+    """
+
     def __init__(self, string_args):
+        # set by compact()
+        self.vocabulary = None
+        self.mask = None
+
         # Deal with flags values strace doesn't support but storing their
         # numeric value as a string
         if len(string_args) == 1 and string_args[0].isdigit():
@@ -252,11 +430,46 @@ class Flags(ParsingClass):
         else:
             self.value = _string_to_flags(string_args.pop(0))
 
+    @property
+    def value(self):
+        if self.vocabulary is None:
+            return self._flags
+        return list(self._flags)
+
+    @value.setter
+    def value(self, value):
+        self._flags = value
+        self.vocabulary = None
+        self.mask = None
+
     def __str__(self):
-        if len(self.value) == 1:
-            return str(self.value[0])
+        if len(self._flags) == 1:
+            return str(self._flags[0])
         else:
-            return "|".join(self.value)
+            return "|".join(self._flags)
+
+    def has_value(self):
+        return self._flags is not None
+
+    def __contains__(self, flag):
+        if self.vocabulary is None:
+            return flag in self._flags
+        bit = self.vocabulary.bits.get(flag)
+        return bit is not None and self.mask & bit != 0
+
+    def intern_strings(self, string_pool):
+        flags = [string_pool.intern(flag) for flag in self._flags]
+        if self.vocabulary is None:
+            self._flags = flags
+        else:
+            self._flags, self.mask = self.vocabulary.encode(flags)
+
+    def compact(self, vocabulary):
+        """
+        Switch to compact mode, encoding the flags with the given FlagVocabulary.
+        """
+        self._flags, self.mask = vocabulary.encode(self._flags)
+        self.vocabulary = vocabulary
 
 
 class SockFamily(ParsingClass):
@@ -278,54 +491,30 @@ class SockFamily(ParsingClass):
             raise Exception("Unknown Socket family: " + value)
         self.value = value
 
+    def intern_strings(self, string_pool):
+        self.value = string_pool.intern(self.value)
+
 
 class SockPort(ParsingClass):
     """
     A SockPort object can only appear as part of the Sockaddr object.
 
-    sin_port=htons(25588)
+    sin_port=htons(25588) or sin6_port=htons(25588)
     """
 
     def __init__(self, value):
-        if "sin_port=htons(" not in value:
-            raise Exception(
-                "Unexpected argument when parsing SockPort object: " + value
-            )
-
-        # get the part that comes between "sin_port=htons(" and ")". The remaining
-        # value should be a number.
-        try:
-            value = int(value[value.find("sin_port=htons(") + 15 : value.rfind(")")])
-        except:
-            raise Exception("Unexpected argument when parsing SockPort object " + value)
-
-        self.value = value
+        self.value = _decode_sock_port(value)
 
 
 class SockIP(ParsingClass):
     """
-    A SockPort object can only appear as part of the Sockaddr object.
+    A SockIP object can only appear as part of the Sockaddr object.
 
-    sin_addr=inet_addr("127.0.0.1")
+    sin_addr=inet_addr("127.0.0.1") or inet_pton(AF_INET6, "::1", &sin6_addr)
     """
 
     def __init__(self, value):
-        if 'sin_addr=inet_addr("' not in value:
-            raise Exception("Unexpected argument when parsing SockIP object: " + value)
-
-        # get the part that comes between sin_addr=inet_addr(" and ").
-        try:
-            value = value[value.find('sin_addr=inet_addr("') + 20 : value.rfind('")')]
-        except:
-            raise Exception("Unexpected argument when parsing SockIP object " + value)
-
-        # Let's check if the value we have is indeed an IP address.
-        try:
-            socket.inet_aton(value)
-        except socket.error:
-            raise Exception("Value is not a valid IP address: " + value)
-
-        self.value = value
+        self.value = _decode_sock_ip(value)
 
 
 class SockPath(ParsingClass):
@@ -371,6 +560,9 @@ class SockPath(ParsingClass):
             + ">"
         )
 
+    def intern_strings(self, string_pool):
+        self.value = string_pool.intern(self.value)
+
 
 class SockData(ParsingClass):
     """
@@ -425,7 +617,15 @@ class SockGroups(ParsingClass):
 
 
 class Sockaddr(ParsingClass):
+    """
+    A sockaddr structure. address holds it as a SockAddress, and value as a
+    list of SockFamily, SockPort, SockIP, SockPath, ... objects, built on first
+    access.
+    """
+
     def __init__(self, string_args):
+        self._sockaddr_args = None
+        self.address = None
         self.value = None
 
         """
@@ -449,7 +649,8 @@ class Sockaddr(ParsingClass):
             return
 
         # 11597 accept(3, 0, NULL)                = 4
-        if string_args[0] == "0":
+        # 20645 recvfrom(7, 0x7ffd1481ba50, 256, 0, NULL, NULL) = -1 ENOTCONN
+        if string_args[0] == "0" or string_args[0] == "NULL":
             string_args.pop(0)
             self.value = "NULL"
             return
@@ -475,59 +676,217 @@ class Sockaddr(ParsingClass):
             if sockaddr_args[-1].endswith("}"):
                 break
 
-        # Lets use these arguments to construct the value of the Sockaddr object.
-        self.value = []
+        self._sockaddr_args = tuple(sockaddr_args)
+
+        # the compact form of the address. Equal addresses decoded recently are
+        # the same SockAddress object.
+        self.address = _decode_sock_address(self._sockaddr_args)
+
+    @property
+    def value(self):
+        # the list of Sock* objects is only built when asked for.
+        if self._value is None and self._sockaddr_args is not None:
+            self._value = _sockaddr_to_list(list(self._sockaddr_args))
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+
+    def has_value(self):
+        return self._value is not None or self._sockaddr_args is not None
+
+    def intern_strings(self, string_pool):
+        if self.address is not None:
+            self.address = string_pool.intern(self.address)
+
 
-        # first item must show the sock address family
-        sa_family = sockaddr_args.pop(0)
-        self.value.append(SockFamily(sa_family))
-
-        if sa_family.endswith("_FILE"):
-            # sockaddr should include a path.
-            # 14037 connect(6, {sa_family=AF_FILE, path=@"/tmp/.X11-unix/X0"}, 20 )= 0
-            self.value.append(SockPath(sockaddr_args.pop(0)))
-        elif sa_family.endswith("_LOCAL"):
-            # sockaddr should include a path.
-            # 11597 connect(4, {sa_family=AF_LOCAL, sun_path="/var/run/nscd/socket"}, 110) = -1 ENOENT (No such file or directory)
-            self.value.append(SockPath(sockaddr_args.pop(0)))
-        elif sa_family.endswith("_UNSPEC"):
-            # sockaddr should include data bytes.
-            # 11597 connect(3, {sa_family=AF_UNSPEC, sa_data="\0\0\0\0\0\0\0\0\0\0\0\0\0\0"}, 16) = 0
-            self.value.append(SockData(sockaddr_args.pop(0)))
-        elif sa_family.endswith("_INET"):
-            # sockaddr should include IP and port
-            # 7123  bind(3, {sa_family=AF_INET, sin_port=htons(25588),
-            #                        sin_addr=inet_addr("127.0.0.1")}, 16) = 0
-            self.value.append(SockPort(sockaddr_args.pop(0)))
-            self.value.append(SockIP(sockaddr_args.pop(0)))
-        elif sa_family.endswith("_NETLINK"):
-            # sockaddr should include pid and groups
-            # 11597 bind(3, {sa_family=AF_NETLINK, pid=0, groups=00000000}, 12) = 0
-            self.value.append(SockPid(sockaddr_args.pop(0)))
-            self.value.append(SockGroups(sockaddr_args.pop(0)))
+def _sockaddr_to_list(sockaddr_args):
+    """
+    Transforms the arguments of a sockaddr structure to a list of SockFamily,
+    SockPort, SockIP, SockPath, ... objects.
+    """
+    value = []
+
+    # first item must show the sock address family
+    sa_family = sockaddr_args.pop(0)
+    value.append(SockFamily(sa_family))
+
+    if sa_family.endswith("_FILE"):
+        # sockaddr should include a path.
+        # 14037 connect(6, {sa_family=AF_FILE, path=@"/tmp/.X11-unix/X0"}, 20 )= 0
+        value.append(SockPath(sockaddr_args.pop(0)))
+    elif sa_family.endswith("_LOCAL"):
+        # sockaddr should include a path.
+        # 11597 connect(4, {sa_family=AF_LOCAL, sun_path="/var/run/nscd/socket"}, 110) = -1 ENOENT (No such file or directory)
+        value.append(SockPath(sockaddr_args.pop(0)))
+    elif sa_family.endswith("_UNSPEC"):
+        # sockaddr should include data bytes.
+        # 11597 connect(3, {sa_family=AF_UNSPEC, sa_data="\0\0\0\0\0\0\0\0\0\0\0\0\0\0"}, 16) = 0
+        value.append(SockData(sockaddr_args.pop(0)))
+    elif sa_family.endswith("_INET"):
+        # sockaddr should include IP and port
+        # 7123  bind(3, {sa_family=AF_INET, sin_port=htons(25588),
+        #                        sin_addr=inet_addr("127.0.0.1")}, 16) = 0
+        value.append(SockPort(sockaddr_args.pop(0)))
+        value.append(SockIP(sockaddr_args.pop(0)))
+    elif sa_family.endswith("_INET6"):
+        # sockaddr should include port and IP, followed by the flow info and the
+        # scope id, in an order that depends on the strace version.
+        # 11597 connect(3, {sa_family=AF_INET6, sin6_port=htons(6666), inet_pton(AF_INET6, "::1", &sin6_addr), sin6_flowinfo=0, sin6_scope_id=0}, 28) = -1 ENETUNREACH (Network is unreachable)
+        for field in _join_inet_pton(sockaddr_args):
+            if "_port=htons(" in field:
+                value.append(SockPort(field))
+            elif field.startswith("inet_pton("):
+                value.append(SockIP(field))
+            else:
+                value.append(field)
+        sockaddr_args = []
+    elif sa_family.endswith("_NETLINK"):
+        # sockaddr should include pid and groups
+        # 11597 bind(3, {sa_family=AF_NETLINK, pid=0, groups=00000000}, 12) = 0
+        value.append(SockPid(sockaddr_args.pop(0)))
+        value.append(SockGroups(sockaddr_args.pop(0)))
+    else:
+        if DEBUG:
+            print(
+                'Socket address family "'
+                + sa_family
+                + '" of Sockaddr structure not fully parsed'
+            )
+
+        while len(sockaddr_args) > 0:
+            value.append(sockaddr_args.pop(0))
+
+    # there should be no more items in the sockaddr_args list
+    assert (
+        len(sockaddr_args) == 0
+    ), "Additional arguments found when parsing Sockaddr object: " + str(sockaddr_args)
+
+    return value
+
+
+def _join_inet_pton(sockaddr_args):
+    """
+    inet_pton(AF_INET6, "::1", &sin6_addr) was split in three arguments on its
+    commas. Join them back.
+    """
+    fields = []
+    for sockaddr_arg in sockaddr_args:
+        if (
+            fields
+            and fields[-1].startswith("inet_pton(")
+            and not fields[-1].rstrip("}").endswith(")")
+        ):
+            fields[-1] += ", " + sockaddr_arg
         else:
-            if DEBUG:
-                print(
-                    'Socket address family "'
-                    + sa_family
-                    + '" of Sockaddr structure not fully parsed'
-                )
-
-            while len(sockaddr_args) > 0:
-                self.value.append(sockaddr_args.pop(0))
-
-        # there should be no more items in the sockaddr_args list
-        assert (
-            len(sockaddr_args) == 0
-        ), "Additional arguments found when parsing Sockaddr object: " + str(
-            sockaddr_args
-        )
+            fields.append(sockaddr_arg)
+    return fields
+
+
+class SockAddress(
+    collections.namedtuple("SockAddress", ["family", "port", "address", "path"])
+):
+    """
+    The compact, immutable and hashable form of a sockaddr structure.
+
+    family is the Linux number of the address family (AF_INET is 2, AF_INET6 is
+    10, ...) or None if unknown. port is an int, address is the packed bytes of
+    an IPv4 or IPv6 address as returned by socket.inet_pton, and path is the
+    path of a unix socket (starting with "@" for abstract sockets). Fields that
+    do not apply to the family are None.
+    """
+
+    __slots__ = ()
+
+    @property
+    def host(self):
+        """
+        The address in its text form, e.g. "127.0.0.1" or "::1".
+        """
+        if self.address is None:
+            return None
+        if len(self.address) == 16:
+            return socket.inet_ntop(socket.AF_INET6, self.address)
+        return socket.inet_ntop(socket.AF_INET, self.address)
+
+
+# Address families as numbered by Linux, where the traces come from. The
+# numbers of the socket module depend on the platform the parser runs on.
+_ADDRESS_FAMILIES = {
+    "UNSPEC": 0,
+    "LOCAL": 1,
+    "UNIX": 1,
+    "FILE": 1,
+    "INET": 2,
+    "INET6": 10,
+    "NETLINK": 16,
+    "PACKET": 17,
+}
+
+
+@memoization.memoize("sock_address")
+def _decode_sock_address(sockaddr_args):
+    """
+    Transforms the arguments of a sockaddr structure to a SockAddress.
+    """
+    fields = _join_inet_pton(sockaddr_args)
+    fields[0] = fields[0].lstrip("{")
+    fields[-1] = fields[-1][:-1]
+
+    family_name = fields[0][fields[0].find("sa_family=") + 10 :]
+    family = _ADDRESS_FAMILIES.get(family_name[3:])
+
+    port = None
+    address = None
+    path = None
+    for field in fields[1:]:
+        name, _, raw_value = field.partition("=")
+        if name.endswith("_port") and raw_value.startswith("htons("):
+            port = _decode_sock_port(field)
+        elif name == "sin_addr" or field.startswith("inet_pton("):
+            address = _pack_ip(field[field.find('"') + 1 : field.rfind('"')])
+        elif name in ("path", "sun_path"):
+            path = raw_value[raw_value.find('"') + 1 : raw_value.rfind('"')]
+            if raw_value.startswith("@"):
+                path = "@" + path
+
+    return SockAddress(family, port, address, path)
+
+
+def _pack_ip(ip):
+    try:
+        if ":" in ip:
+            return socket.inet_pton(socket.AF_INET6, ip)
+        return socket.inet_pton(socket.AF_INET, ip)
+    except (socket.error, ValueError):
+        raise Exception("Value is not a valid IP address: " + ip)
+
+
+# the major and minor numbers of a device, as decoded from makedev(0x8, 0x5).
+Device = collections.namedtuple("Device", ["major", "minor"])
 
 
 class Stat(ParsingClass):
+    """
+    A stat structure. value holds its fields as the strings printed by strace,
+    e.g. "st_gid=0" and "st_dev=makedev(0, 4)".
+
+    The fields can also be read as attributes, e.g. stat.st_size. These are
+    decoded on first access and cached: st_mode as an int of mode bits,
+    makedev() values as Device tuples, numbers as ints (dropping the comments
+    strace adds to times) and anything else as the raw string. A field missing
+    from the structure, e.g. because strace printed the abbreviated layout
+    {st_mode=S_IFREG|0644, st_size=98710, ...} rather than the -v one, reads as
+    None.
+    """
+
     def __init__(self, string_args):
         self.value = None
 
+        # field name -> raw value, built on the first field access.
+        self._raw_fields = None
+
         # Error condition, struct not parsed by strace.  Pointer value returned instead
         if string_args[0].startswith("0x"):
             return
@@ -550,22 +909,54 @@ class Stat(ParsingClass):
         stat_args[0] = stat_args[0].lstrip("{")
         stat_args[-1] = stat_args[-1].rstrip("}")
 
-        for i in range(len(stat_args)):
-            if stat_args[i].startswith("st_dev=makedev("):
-                stat_args[i] = stat_args[i] + ", " + stat_args[i + 1]
-                stat_args.pop(i + 1)
-                # break out here because we've shortened the list and will
-                # get an index out of range if we continue
-                break
+        # makedev(major, minor) was split in two arguments on its comma. It is
+        # used by st_dev, and by st_rdev for devices.
+        i = 0
+        while i < len(stat_args):
+            if "=makedev(" in stat_args[i] and not stat_args[i].endswith(")"):
+                stat_args[i] = stat_args[i] + ", " + stat_args.pop(i + 1)
+            i += 1
+
+        for stat_arg in stat_args:
+            # the abbreviated layout ends with "..."
+            assert "=" in stat_arg or stat_arg == "...", (
+                "Unexpected field `"
+                + stat_arg
+                + "` in stat structure "
+                + str(stat_args)
+            )
 
         self.value = stat_args
 
-        assert len(stat_args) == 15, (
-            "We did not get 15 arguments for stat structure.  Got instead: "
-            + str(len(stat_args))
-            + "args -> "
-            + str(stat_args)
-        )
+    def __getattr__(self, name):
+        # only called for attributes not set yet, i.e. fields not decoded yet.
+        if not name.startswith("st_"):
+            raise AttributeError(name)
+
+        if self._raw_fields is None:
+            self._raw_fields = {}
+            for stat_arg in self.value or []:
+                field, _, raw_value = stat_arg.partition("=")
+                self._raw_fields[field] = raw_value
+
+        raw_value = self._raw_fields.get(name)
+        if raw_value is None:
+            value = None
+        elif name == "st_mode":
+            value = _decode_stat_mode(raw_value)
+        else:
+            value = _decode_stat_field(raw_value)
+
+        # cache the decoded field so that __getattr__ is not called again.
+        setattr(self, name, value)
+        return value
+
+    def __getstate__(self):
+        # decoded fields are cheap to decode again.
+        return {"value": self.value, "_raw_fields": None}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
 
     def __str__(self):
         tmp = "{"
@@ -576,10 +967,95 @@ class Stat(ParsingClass):
     def __setitem__(self, index, value):
         self.value[index] = value
 
+        # drop the fields decoded from the old value.
+        for name in list(self.__dict__):
+            if name.startswith("st_"):
+                del self.__dict__[name]
+        self._raw_fields = None
+
     def __getitem__(self, index):
         return self.value[index]
 
 
+@memoization.memoize("stat_mode")
+def _decode_stat_mode(raw_value):
+    """
+    Transforms st_mode=S_IFREG|0644 to the int 0o100644.
+    """
+    mode = 0
+    for part in raw_value.split("|"):
+        if part.isdigit():
+            mode |= int(part, 8)
+        elif part.startswith("S_") and hasattr(stat, part):
+            mode |= getattr(stat, part)
+        else:
+            raise Exception("Unexpected st_mode format: " + raw_value)
+    return mode
+
+
+def _decode_stat_field(raw_value):
+    """
+    Transforms the raw value of a stat field to a Device, an int, or leaves it
+    as a string if it is neither.
+    """
+    # 1614758423 /* 2021-03-03T16:00:23.052449592+0800 */
+    number = raw_value.split(" /*", 1)[0]
+
+    if number.startswith("makedev(") and number.endswith(")"):
+        major, minor = number[8:-1].split(",")
+        return Device(_decode_int(major.strip()), _decode_int(minor.strip()))
+
+    try:
+        return _decode_int(number)
+    except ValueError:
+        return raw_value
+
+
+def _decode_int(number):
+    if number.startswith("0x"):
+        return int(number, 16)
+    return int(number)
+
+
+# The decoders of flags, modes, ports and addresses are pure functions of
+# strings that repeat across a trace, so their results are memoized. See the
+# memoization module.
+@memoization.memoize("sock_port")
+def _decode_sock_port(value):
+    """
+    Extracts the port number out of sin_port=htons(25588) or
+    sin6_port=htons(25588).
+    """
+    if "_port=htons(" not in value:
+        raise Exception("Unexpected argument when parsing SockPort object: " + value)
+
+    # get the part that comes between "_port=htons(" and ")". The remaining
+    # value should be a number.
+    try:
+        return int(value[value.find("_port=htons(") + 12 : value.rfind(")")])
+    except:
+        raise Exception("Unexpected argument when parsing SockPort object " + value)
+
+
+@memoization.memoize("sock_ip")
+def _decode_sock_ip(value):
+    """
+    Extracts the IP address out of sin_addr=inet_addr("127.0.0.1") or
+    inet_pton(AF_INET6, "::1", &sin6_addr).
+    """
+    if 'sin_addr=inet_addr("' not in value and not value.startswith("inet_pton("):
+        raise Exception("Unexpected argument when parsing SockIP object: " + value)
+
+    # get the part that comes between the double quotes.
+    value = value[value.find('"') + 1 : value.rfind('"')]
+
+    # Let's check if the value we have is indeed an IP address.
+    _pack_ip(value)
+
+    return value
+
+
+@memoization.memoize("string_to_flags", copy=list)
 def _string_to_flags(flags_string):
     """
     Transforms a string to a list of flags.
@@ -607,6 +1083,7 @@ def _string_to_flags(flags_string):
     return flags_list
 
 
+@memoization.memoize("mode_to_flags", copy=list)
 def _mode_to_flags(mode):
     """
     Transforms a number representing a mode to a list of flags.
@@ -676,6 +1153,12 @@ def _get_parsing_class(syscall_name, definition_parameter, value):
 
     if definition_parameter.type == "char" and definition_parameter.pointer:
         # char pointer type
+        if value.startswith("["):
+            # 17215 execve("./badread", ["./badread"], ["SHELL=/bin/bash", ...]) = 0
+            if definition_parameter.name == "envp":
+                return Environment
+            return StringArray
+
         if (
             "path" in definition_parameter.name
             or "filename" in definition_parameter.name
@@ -748,7 +1231,9 @@ def _get_parsing_class(syscall_name, definition_parameter, value):
     return UnimplementedType
 
 
-def _cast_syscall_arg(syscall_name, definition_parameter, string_args):
+def _cast_syscall_arg(
+    syscall_name, definition_parameter, string_args, string_pool, flag_vocabulary
+):
     # if the string_args list is empty, then the value is missing.
     if len(string_args) == 0:
         return MissingValue(definition_parameter, string_args)
@@ -760,7 +1245,14 @@ def _cast_syscall_arg(syscall_name, definition_parameter, string_args):
 
     arg = parsing_class(string_args)
 
-    if arg.value == None:
+    # share the strings repeating across system calls.
+    if string_pool is not None:
+        arg.intern_strings(string_pool)
+
+    if flag_vocabulary is not None and isinstance(arg, Flags):
+        arg.compact(flag_vocabulary)
+
+    if not arg.has_value():
         # if the value of the argument is None, it means that the expected value was
         # not found. This can occur when a system call has an error in which case
         # structure and pointer values are not dereferenced, and instead we get the
@@ -772,7 +1264,14 @@ def _cast_syscall_arg(syscall_name, definition_parameter, string_args):
     return arg
 
 
-def cast_args(syscall_name, syscall_type, syscall_definitions, string_args):
+def cast_args(
+    syscall_name,
+    syscall_type,
+    syscall_definitions,
+    string_args,
+    string_pool=None,
+    flag_vocabulary=None,
+):
     # we will consume these args (pop them off the list) so let's make a fresh
     # copy of them to avoid messing with the original list.
     string_args = string_args[:]
@@ -804,7 +1303,13 @@ def cast_args(syscall_name, syscall_type, syscall_definitions, string_args):
             # arguments.
             if syscall_type == "unfinished" and len(string_args) == 0:
                 break
-            ca = _cast_syscall_arg(syscall_name, definition_parameter, string_args)
+            ca = _cast_syscall_arg(
+                syscall_name,
+                definition_parameter,
+                string_args,
+                string_pool,
+                flag_vocabulary,
+            )
             casted_args.append(ca)
 
     # Since not all arguments have a type corresponding to them (yet), and
@@ -0,0 +1,259 @@
+"""
+<Purpose>
+  The tree of the processes and threads of a trace (strace -f), maintained
+  incrementally while the trace is parsed by passing a ProcessTree as a sink to
+  StraceParser.parse_trace. clone, fork and vfork create children, CLONE_THREAD
+  makes them threads of the thread group of their creator, execve changes the
+  image a process runs, and exit, exit_group and the "+++ exited" and
+  "+++ killed" lines of the trace end them.
+
+  Example using this module:
+
+    tree = processes.ProcessTree()
+    syscalls = parser.parse_trace(sinks=[tree])
+    for process in tree.walk(tree.roots[0].pid):
+        print(process.pid, process.image)
+
+"""
+
+from builtins import object
+from builtins import str
+
+from . import fdtables
+from . import parsing_classes
+
+
+class Process(object):
+    """
+    <Purpose>
+      A process, or a thread, of the trace.
+
+    <Attributes>
+      self.pid:
+        The pid of the process, or the tid of the thread.
+
+      self.parent:
+        The Process that created this one, or None for the processes that
+        started outside of the trace.
+
+      self.children:
+        The list of the Process objects this one created, in trace order,
+        threads included.
+
+      self.leader:
+        The leader of the thread group of the process: the process itself
+        unless it is a thread.
+
+      self.threads:
+        The threads of the group of a leader, in trace order.
+
+      self.image:
+        The path given to the last successful execve of the process, or the
+        image inherited from the parent, or None if unknown.
+
+      self.start:
+        The position of the system call that created the process, or of the
+        first system call of the processes that started outside of the trace.
+
+      self.end:
+        The position of the system call that ended the process, or None if it
+        did not end in the trace. Processes ended by a "+++" line get the
+        position of the next system call.
+
+      self.status:
+        ("exited", exit code) or ("killed", signal name) once the process
+        ended, None before.
+    """
+
+    def __init__(self, pid, parent, start):
+        self.pid = pid
+        self.parent = parent
+        self.children = []
+        self.leader = self
+        self.threads = []
+        self.image = None if parent is None else parent.image
+        self.start = start
+        self.end = None
+        self.status = None
+
+    @property
+    def is_thread(self):
+        return self.leader is not self
+
+    def __repr__(self):
+        return (
+            "<Process pid="
+            + str(self.pid)
+            + " parent="
+            + str(None if self.parent is None else self.parent.pid)
+            + " thread="
+            + str(self.is_thread)
+            + " image="
+            + str(self.image)
+            + " status="
+            + str(self.status)
+            + ">"
+        )
+
+
+def _returned_pid(syscall):
+    # the pid returned to the parent by a successful clone, fork or vfork.
+    if syscall.ret is None or syscall.ret[1] is not None:
+        return None
+    value = syscall.ret[0]
+    if not isinstance(value, int) or value <= 0:
+        return None
+    return value
+
+
+def _exit_code(syscall):
+    try:
+        return int(syscall.args[0].value)
+    except (IndexError, AttributeError, TypeError, ValueError):
+        return None
+
+
+class ProcessTree(object):
+    """
+    <Purpose>
+      Maintains the tree of the processes of a trace.
+
+    <Attributes>
+      self.count:
+        The number of system calls added so far.
+
+      self.processes:
+        A dict mapping each pid to its Process. A reused pid maps to the last
+        process that had it.
+
+      self.roots:
+        The processes that started outside of the trace, in trace order.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.processes = {}
+        self.roots = []
+
+    def add(self, syscall):
+        position = self.count
+        self.count += 1
+
+        process = self._process(syscall.pid, position)
+        name = syscall.name
+
+        if name in ("clone", "clone2", "clone3", "fork", "vfork"):
+            child_pid = _returned_pid(syscall)
+            if child_pid is not None:
+                self._create(
+                    process,
+                    child_pid,
+                    position,
+                    fdtables.has_flag(syscall, "CLONE_THREAD"),
+                )
+        elif name in ("execve", "execveat"):
+            if syscall.ret is not None and syscall.ret[1] is None:
+                for arg in syscall.args:
+                    if isinstance(arg, parsing_classes.Filepath):
+                        process.image = arg.value
+                        break
+        elif name == "exit_group":
+            status = ("exited", _exit_code(syscall))
+            leader = process.leader
+            for member in [leader] + leader.threads:
+                self._end(member, position, status)
+        elif name == "exit":
+            self._end(process, position, ("exited", _exit_code(syscall)))
+
+    def exited(self, pid, status):
+        """
+        Called by StraceParser.parse_trace for the "+++ exited with N +++" and
+        "+++ killed by SIGNAL +++" lines of the trace.
+        """
+        process = self.processes.get(pid)
+        if process is None:
+            return
+        if status[0] == "killed" or process.status is None:
+            process.status = status
+        if process.end is None:
+            process.end = self.count
+
+    def _process(self, pid, position):
+        process = self.processes.get(pid)
+        if process is None:
+            process = self.processes[pid] = Process(pid, None, position)
+            self.roots.append(process)
+        return process
+
+    def _create(self, parent, pid, position, thread):
+        child = self.processes.get(pid)
+        if child is not None and child.end is None and child.parent is None:
+            # the child ran before the clone of its parent returned in the
+            # trace, so it was taken for a process started outside of it.
+            self.roots.remove(child)
+            child.parent = parent
+            child.start = position
+            if child.image is None:
+                child.image = parent.image
+        else:
+            child = self.processes[pid] = Process(pid, parent, position)
+
+        parent.children.append(child)
+        if thread:
+            child.leader = parent.leader
+            parent.leader.threads.append(child)
+
+    def _end(self, process, position, status):
+        if process.end is None:
+            process.end = position
+            process.status = status
+
+    def get(self, pid):
+        """
+        Return the Process of a pid, or None if the pid is not in the trace.
+        """
+        return self.processes.get(pid)
+
+    def __getitem__(self, pid):
+        return self.processes[pid]
+
+    def __contains__(self, pid):
+        return pid in self.processes
+
+    def walk(self, pid):
+        """
+        <Purpose>
+          Walk the subtree of a process, depth first.
+
+        <Arguments>
+          pid:
+            The pid of the process at the root of the subtree.
+
+        <Exceptions>
+          KeyError:
+            If the pid is not in the trace.
+
+        <Side Effects>
+          None
+
+        <Returns>
+          A generator of the Process objects of the subtree, the root first and
+          the children of each process in the order they were created.
+        """
+
+        stack = [self.processes[pid]]
+        while stack:
+            process = stack.pop()
+            yield process
+            stack.extend(reversed(process.children))
+
+    def __repr__(self):
+        return (
+            "<ProcessTree syscalls="
+            + str(self.count)
+            + " processes="
+            + str(len(self.processes))
+            + " roots="
+            + str(len(self.roots))
+            + ">"
+        )
@@ -0,0 +1,566 @@
+"""
+<Purpose>
+  A small filter language over parsed system calls. An expression is compiled
+  once into a Query: a predicate taking a Syscall, plus a plan that answers the
+  query from the indexes of a Trace when it has them (see Trace.index).
+
+  Example using this module:
+
+    q = query.compile_query(
+        'name in {openat, open} and ret.err == ENOENT and arg.path startswith "/etc"'
+    )
+    failed = [syscall for syscall in trace.syscalls if q(syscall)]
+    failed = q.select(trace)  # the same, using the indexes of the trace
+
+  Grammar:
+
+    expression := term ("or" term)*
+    term       := factor ("and" factor)*
+    factor     := "not" factor | "(" expression ")" | field operator value
+
+  Fields:
+
+    name, pid, type, timestamp, elapsed_time, inst_pointer
+    ret          the return value (also ret.value)
+    ret.err      the error label, e.g. ENOENT, or None if the call succeeded
+    arg[N]       the value of the Nth argument, None if it is missing
+    arg.path     any path used by the call (see indexes.syscall_paths)
+
+  Operators:
+
+    == != < <= > >=
+    in           the field is one of a set of values, e.g. {open, openat}
+    startswith   the field is a string starting with the value
+    glob         the field is a string matching a shell pattern
+    matches      the field is a string containing a match of a regex
+    contains     the field, e.g. the list of a Flags argument, holds the value
+
+  Values are numbers, double quoted strings, None, or bare words, which are
+  strings, e.g. ENOENT or O_CREAT.
+
+"""
+
+from builtins import object
+import fnmatch
+import re
+
+from . import indexes
+from . import memoization
+
+
+class QueryError(Exception):
+    """
+    Raised when an expression cannot be compiled.
+    """
+
+    def __init__(self, message, expression, offset):
+        Exception.__init__(
+            self, message + " at offset " + str(offset) + " of `" + expression + "`"
+        )
+        self.expression = expression
+        self.offset = offset
+
+
+_TOKEN = re.compile(
+    r"\s*(?:"
+    r'(?P<string>"(?:[^"\\]|\\.)*")'
+    r"|(?P<number>-?\d+(?:\.\d+)?)"
+    r"|(?P<symbol>==|!=|<=|>=|<|>|[(){},])"
+    r"|(?P<word>[A-Za-z_][\w.]*(?:\[\d+\])?)"
+    r")"
+)
+
+_COMPARISONS = set(["==", "!=", "<", "<=", ">", ">="])
+_WORD_OPERATORS = set(["in", "startswith", "glob", "matches", "contains"])
+
+# the largest timestamp, for open ended time windows.
+_MAX_TIME = 2**63 - 1
+
+
+def _tokenize(expression):
+    tokens = []
+    offset = 0
+    expression_end = len(expression.rstrip())
+    while offset < expression_end:
+        m = _TOKEN.match(expression, offset)
+        if m is None or m.end() == offset:
+            raise QueryError("Unexpected character", expression, offset)
+        kind = m.lastgroup
+        text = m.group(kind)
+        if kind == "string":
+            value = re.sub(r"\\(.)", r"\1", text[1:-1])
+        elif kind == "number":
+            value = float(text) if "." in text else int(text)
+        else:
+            value = text
+        tokens.append((kind, value, m.start(kind)))
+        offset = m.end()
+    return tokens
+
+
+def _get_ret(syscall):
+    return None if syscall.ret is None else syscall.ret[0]
+
+
+def _get_err(syscall):
+    return None if syscall.ret is None else syscall.ret[1]
+
+
+_FIELDS = {
+    "name": lambda syscall: syscall.name,
+    "pid": lambda syscall: syscall.pid,
+    "type": lambda syscall: syscall.type,
+    "timestamp": lambda syscall: syscall.timestamp,
+    "elapsed_time": lambda syscall: syscall.elapsed_time,
+    "inst_pointer": lambda syscall: syscall.inst_pointer,
+    "ret": _get_ret,
+    "ret.value": _get_ret,
+    "ret.err": _get_err,
+}
+
+_ARG_FIELD = re.compile(r"args?\[(\d+)\]$")
+
+
+def _arg_getter(index):
+    def get_arg(syscall):
+        # the arguments of unknown syscall_NNN calls are not parsed.
+        if syscall.args is None or index >= len(syscall.args):
+            return None
+        # MissingValue arguments have no value.
+        return getattr(syscall.args[index], "value", None)
+
+    return get_arg
+
+
+def _make_test(operator, value):
+    # a function telling whether a field value passes the comparison.
+    if operator == "==":
+        return lambda field: field == value
+    if operator == "!=":
+        return lambda field: field != value
+    if operator in ("<", "<=", ">", ">="):
+        compare = {
+            "<": lambda field: field < value,
+            "<=": lambda field: field <= value,
+            ">": lambda field: field > value,
+            ">=": lambda field: field >= value,
+        }[operator]
+
+        def is_ordered(field):
+            try:
+                return compare(field)
+            except TypeError:
+                # missing fields and fields of another type, e.g. the "?" return
+                # of a call that never returned, are not ordered against the value.
+                return False
+
+        return is_ordered
+    if operator == "in":
+
+        def is_in(field):
+            try:
+                return field in value
+            except TypeError:
+                # unhashable fields, e.g. lists of flags, are in no set.
+                return False
+
+        return is_in
+    if operator == "startswith":
+        return lambda field: isinstance(field, str) and field.startswith(value)
+    if operator == "glob":
+        match = re.compile(fnmatch.translate(value)).match
+        return lambda field: isinstance(field, str) and match(field) is not None
+    if operator == "matches":
+        search = re.compile(value).search
+        return lambda field: isinstance(field, str) and search(field) is not None
+    if operator == "contains":
+        return lambda field: isinstance(field, (list, str)) and value in field
+    raise ValueError("Unknown operator: " + operator)
+
+
+class _Parser(object):
+    """
+    Recursive descent parser turning the tokens of an expression into a tree of
+    tuples: ("or", [children]), ("and", [children]), ("not", child) and
+    ("compare", field, operator, value).
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = _tokenize(expression)
+        self.index = 0
+
+    def parse(self):
+        tree = self._expression()
+        kind, value, offset = self._peek()
+        if kind != "end":
+            raise QueryError("Unexpected `" + str(value) + "`", self.expression, offset)
+        return tree
+
+    def _peek(self):
+        if self.index < len(self.tokens):
+            return self.tokens[self.index]
+        return ("end", None, len(self.expression))
+
+    def _next(self):
+        token = self._peek()
+        self.index += 1
+        return token
+
+    def _is_word(self, word):
+        kind, value, _ = self._peek()
+        return kind == "word" and value == word
+
+    def _expect(self, symbol):
+        kind, value, offset = self._next()
+        if kind != "symbol" or value != symbol:
+            raise QueryError("Expected `" + symbol + "`", self.expression, offset)
+
+    def _expression(self):
+        children = [self._term()]
+        while self._is_word("or"):
+            self._next()
+            children.append(self._term())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def _term(self):
+        children = [self._factor()]
+        while self._is_word("and"):
+            self._next()
+            children.append(self._factor())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def _factor(self):
+        if self._is_word("not"):
+            self._next()
+            return ("not", self._factor())
+
+        kind, value, offset = self._peek()
+        if kind == "symbol" and value == "(":
+            self._next()
+            tree = self._expression()
+            self._expect(")")
+            return tree
+
+        return self._comparison()
+
+    def _comparison(self):
+        kind, field, offset = self._next()
+        if kind != "word" or (
+            field not in _FIELDS and field != "arg.path" and not _ARG_FIELD.match(field)
+        ):
+            raise QueryError("Expected a field", self.expression, offset)
+
+        kind, operator, offset = self._next()
+        if not (
+            (kind == "symbol" and operator in _COMPARISONS)
+            or (kind == "word" and operator in _WORD_OPERATORS)
+        ):
+            raise QueryError("Expected an operator", self.expression, offset)
+
+        if operator == "in":
+            value = self._set()
+        else:
+            value = self._value()
+            if operator in ("startswith", "glob", "matches") and not isinstance(
+                value, str
+            ):
+                raise QueryError(
+                    "Expected a string after " + operator, self.expression, offset
+                )
+        return ("compare", field, operator, value)
+
+    def _set(self):
+        self._expect("{")
+        values = []
+        if self._peek()[:2] != ("symbol", "}"):
+            values.append(self._value())
+            while self._peek()[:2] == ("symbol", ","):
+                self._next()
+                values.append(self._value())
+        self._expect("}")
+        return frozenset(values)
+
+    def _value(self):
+        kind, value, offset = self._next()
+        if kind in ("string", "number"):
+            return value
+        if kind == "word":
+            return None if value == "None" else value
+        raise QueryError("Expected a value", self.expression, offset)
+
+
+def _compile_tree(tree):
+    # turn a tree of the parser into a predicate over system calls.
+    kind = tree[0]
+    if kind == "and":
+        predicates = [_compile_tree(child) for child in tree[1]]
+        return lambda syscall: all(predicate(syscall) for predicate in predicates)
+    if kind == "or":
+        predicates = [_compile_tree(child) for child in tree[1]]
+        return lambda syscall: any(predicate(syscall) for predicate in predicates)
+    if kind == "not":
+        predicate = _compile_tree(tree[1])
+        return lambda syscall: not predicate(syscall)
+
+    _, field, operator, value = tree
+    test = _make_test(operator, value)
+    if field == "arg.path":
+        return lambda syscall: any(
+            test(path) for path in indexes.syscall_paths(syscall)
+        )
+    if field in _FIELDS:
+        get = _FIELDS[field]
+    else:
+        get = _arg_getter(int(_ARG_FIELD.match(field).group(1)))
+    return lambda syscall: test(get(syscall))
+
+
+def _values(operator, value):
+    # the values an == or in comparison looks up in an index.
+    if operator == "==":
+        return [value]
+    if operator == "in":
+        return list(value)
+    return None
+
+
+def _candidates(tree, trace):
+    """
+    The set of positions of the system calls of trace that may match the tree,
+    from the indexes of the trace, or None if the indexes cannot narrow it down.
+    """
+
+    kind = tree[0]
+    if kind == "and":
+        result = None
+        for child in tree[1]:
+            positions = _candidates(child, trace)
+            if positions is None:
+                continue
+            result = positions if result is None else result & positions
+        return result
+    if kind == "or":
+        result = set()
+        for child in tree[1]:
+            positions = _candidates(child, trace)
+            if positions is None:
+                return None
+            result |= positions
+        return result
+    if kind == "not":
+        return None
+
+    _, field, operator, value = tree
+    values = _values(operator, value)
+
+    postings = None
+    if trace.index is not None and values is not None:
+        postings = {
+            "name": trace.index.names,
+            "pid": trace.index.pids,
+            "ret.err": trace.index.errnos,
+        }.get(field)
+    if postings is not None and None not in values:
+        result = set()
+        for key in values:
+            result.update(postings.get(key, ()))
+        return result
+
+    path_index = trace.path_index
+    if path_index is not None and field == "arg.path":
+        if values is not None:
+            result = set()
+            for path in values:
+                if isinstance(path, str):
+                    result.update(path_index.exact(path))
+            return result
+        if operator == "glob":
+            return set(path_index.glob(value))
+        if operator == "startswith" and not re.search(r"[*?[]", value):
+            return set(path_index.glob(value + "*"))
+
+    time_index = trace.time_index
+    if time_index is not None and field == "timestamp" and value is not None:
+        window = {
+            "==": (value, value + 1),
+            "<": (-_MAX_TIME, value),
+            "<=": (-_MAX_TIME, value + 1),
+            ">": (value + 1, _MAX_TIME),
+            ">=": (value, _MAX_TIME),
+        }.get(operator)
+        if window is not None and isinstance(value, int):
+            return set(int(position) for position in time_index.window(*window))
+
+    return None
+
+
+def _zone_test(tree):
+    """
+    A function telling whether a zonemaps.Zone may hold system calls matching
+    the tree, or None if the zones cannot rule any out.
+    """
+
+    kind = tree[0]
+    if kind == "and":
+        tests = [_zone_test(child) for child in tree[1]]
+        tests = [test for test in tests if test is not None]
+        if not tests:
+            return None
+        return lambda zone: all(test(zone) for test in tests)
+    if kind == "or":
+        tests = [_zone_test(child) for child in tree[1]]
+        if None in tests:
+            return None
+        return lambda zone: any(test(zone) for test in tests)
+    if kind == "not":
+        return None
+
+    _, field, operator, value = tree
+    values = _values(operator, value)
+
+    if values is not None and field in ("name", "arg.path"):
+        kind = "name" if field == "name" else "path"
+        keys = [key for key in values if isinstance(key, str)]
+        return lambda zone: any(zone.might_contain(kind, key) for key in keys)
+
+    if values is not None and field == "pid":
+        return lambda zone: any(pid in zone.pids for pid in values)
+
+    if values is not None and field == "ret.err":
+
+        def has_errno(zone):
+            for label in values:
+                if label is None:
+                    # successful and unfinished calls.
+                    if zone.errors < zone.count:
+                        return True
+                elif zone.errors and zone.might_contain("err", label):
+                    return True
+            return False
+
+        return has_errno
+
+    if field == "timestamp" and isinstance(value, int):
+        window = {
+            "==": (value, value),
+            "<": (-_MAX_TIME, value - 1),
+            "<=": (-_MAX_TIME, value),
+            ">": (value + 1, _MAX_TIME),
+            ">=": (value, _MAX_TIME),
+        }.get(operator)
+        if window is not None:
+            low, high = window
+            return lambda zone: (
+                zone.min_timestamp is not None
+                and zone.min_timestamp <= high
+                and zone.max_timestamp >= low
+            )
+
+    return None
+
+
+class Query(object):
+    """
+    <Purpose>
+      A compiled expression. Calling it with a Syscall tells whether the system
+      call matches. See compile_query.
+
+    <Attributes>
+      self.expression:
+        The expression the query was compiled from.
+
+      self.tree:
+        The parsed expression.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tree = _Parser(expression).parse()
+        self._predicate = _compile_tree(self.tree)
+        self._zone_test = _zone_test(self.tree)
+
+    def __call__(self, syscall):
+        return self._predicate(syscall)
+
+    def may_match(self, zone):
+        """
+        Return False if no system call of a zonemaps.Zone can match the query,
+        from its summary: == and in on name, pid, ret.err and arg.path, and
+        comparisons of timestamp rule zones out. Return True otherwise.
+        """
+        if self._zone_test is None:
+            return True
+        return self._zone_test(zone)
+
+    def positions(self, trace):
+        """
+        <Purpose>
+          Find the system calls of a trace matching the query. The indexes of the
+          trace narrow down the system calls to test when the query has
+          comparisons they can answer: == and in on name, pid and ret.err, ==,
+          in, startswith and glob on arg.path, and comparisons of timestamp.
+
+        <Arguments>
+          trace:
+            A Trace.
+
+        <Exceptions>
+          None
+
+        <Side Effects>
+          None
+
+        <Returns>
+          A list of the positions of the matching system calls in
+          trace.syscalls, in trace order.
+        """
+
+        syscalls = trace.syscalls
+        predicate = self._predicate
+
+        candidates = _candidates(self.tree, trace)
+        if candidates is None:
+            return [
+                position
+                for position, syscall in enumerate(syscalls)
+                if predicate(syscall)
+            ]
+        return [
+            position for position in sorted(candidates) if predicate(syscalls[position])
+        ]
+
+    def select(self, trace):
+        """
+        Return the system calls of a trace matching the query, in trace order.
+        """
+        syscalls = trace.syscalls
+        return [syscalls[position] for position in self.positions(trace)]
+
+    def __repr__(self):
+        return "<Query " + self.expression + ">"
+
+
+@memoization.memoize("query", maxsize=256)
+def compile_query(expression):
+    """
+    <Purpose>
+      Compile a filter expression, see the grammar of this module.
+
+    <Arguments>
+      expression:
+        The expression string.
+
+    <Exceptions>
+      QueryError:
+        If the expression is not valid.
+
+    <Side Effects>
+      None
+
+    <Returns>
+      A Query. Queries are cached by expression, so compiling the same one
+      again is cheap.
+    """
+
+    return Query(expression)
@@ -0,0 +1,283 @@
+"""
+<Purpose>
+  Streaming quantile sketches of the elapsed times of strace -T traces. A
+  LogHistogram counts values in buckets whose bounds grow geometrically, so
+  that its quantiles are within a fixed relative error of the exact ones while
+  its size only grows with the logarithm of the range of the values. Sketches
+  of parts of a trace, e.g. parsed by parallel workers, merge into the sketch
+  of the whole trace with no loss of accuracy.
+
+  Example using this module:
+
+    latencies = sketches.LatencySketches(key="name")
+    syscalls = parser.parse_trace(sinks=[latencies])
+    p50, p99, p999 = latencies.quantiles("read", (0.5, 0.99, 0.999))
+
+"""
+
+from builtins import object
+from builtins import str
+import math
+
+# values at or below this (a nanosecond, in seconds) are counted as zeros.
+MIN_VALUE = 1e-9
+
+
+class LogHistogram(object):
+    """
+    <Purpose>
+      A mergeable quantile sketch of positive values (the algorithm of
+      DDSketch). Bucket i counts the values in (gamma^(i-1), gamma^i], where
+      gamma = (1 + relative_error) / (1 - relative_error), and a quantile is
+      estimated by the middle of its bucket.
+
+      Error bound: for any q, quantile(q) is within relative_error of the value
+      of rank floor(q * (count - 1)) among the values added, as long as no
+      buckets were collapsed. With the default relative_error of 1% and
+      max_buckets of 2048, values from 1 nanosecond to 10^8 seconds fit without
+      collapsing, so the bound holds for any elapsed time. Should more buckets
+      be needed, the lowest ones are collapsed together, which only affects the
+      accuracy of the lowest quantiles.
+
+    <Attributes>
+      self.relative_error:
+        The relative error of the quantiles.
+
+      self.max_buckets:
+        The largest number of buckets kept.
+
+      self.buckets:
+        A dict mapping bucket indexes to their counts.
+
+      self.zeros:
+        The number of values at or below MIN_VALUE.
+
+      self.count, self.total, self.minimum, self.maximum:
+        The number, sum, smallest and largest of the values added.
+    """
+
+    def __init__(self, relative_error=0.01, max_buckets=2048):
+        assert 0 < relative_error < 1, "The relative error must be in (0, 1)"
+
+        self.relative_error = relative_error
+        self.max_buckets = max_buckets
+        self._gamma = (1 + relative_error) / (1 - relative_error)
+        self._log_gamma = math.log(self._gamma)
+
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+        if value <= MIN_VALUE:
+            self.zeros += 1
+            return
+
+        index = int(math.ceil(math.log(value) / self._log_gamma))
+        buckets = self.buckets
+        if index in buckets:
+            buckets[index] += 1
+        else:
+            buckets[index] = 1
+            if len(buckets) > self.max_buckets:
+                self._collapse()
+
+    def merge(self, other):
+        """
+        <Purpose>
+          Add the values of another sketch to this one.
+
+        <Arguments>
+          other:
+            A LogHistogram with the same relative error.
+
+        <Exceptions>
+          ValueError:
+            If the sketches have different relative errors.
+
+        <Side Effects>
+          Updates the buckets and the totals.
+
+        <Returns>
+          self
+        """
+
+        if other.relative_error != self.relative_error:
+            raise ValueError("Cannot merge sketches of different relative errors")
+
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        if other.minimum is not None and (
+            self.minimum is None or other.minimum < self.minimum
+        ):
+            self.minimum = other.minimum
+        if other.maximum is not None and (
+            self.maximum is None or other.maximum > self.maximum
+        ):
+            self.maximum = other.maximum
+        return self
+
+    def _collapse(self):
+        # fold the lowest buckets into the lowest one kept.
+        indexes = sorted(self.buckets)
+        excess = len(indexes) - self.max_buckets
+        folded = 0
+        for index in indexes[:excess]:
+            folded += self.buckets.pop(index)
+        self.buckets[indexes[excess]] += folded
+
+    def quantile(self, q):
+        """
+        <Purpose>
+          Estimate a quantile of the values added.
+
+        <Arguments>
+          q:
+            The quantile, between 0 and 1, e.g. 0.99.
+
+        <Exceptions>
+          ValueError:
+            If q is not between 0 and 1.
+
+        <Side Effects>
+          None
+
+        <Returns>
+          The estimated value, or None if no value was added.
+        """
+
+        if not 0 <= q <= 1:
+            raise ValueError("Quantiles are between 0 and 1, not " + str(q))
+        if self.count == 0:
+            return None
+
+        rank = int(q * (self.count - 1))
+        if rank < self.zeros:
+            return self.minimum
+
+        seen = self.zeros
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                estimate = 2 * self._gamma**index / (self._gamma + 1)
+                # the exact extremes are known.
+                return min(max(estimate, self.minimum), self.maximum)
+        return self.maximum
+
+    @property
+    def mean(self):
+        if self.count == 0:
+            return None
+        return self.total / self.count
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_gamma"]
+        del state["_log_gamma"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._gamma = (1 + self.relative_error) / (1 - self.relative_error)
+        self._log_gamma = math.log(self._gamma)
+
+    def __repr__(self):
+        return (
+            "<LogHistogram count="
+            + str(self.count)
+            + " buckets="
+            + str(len(self.buckets))
+            + " relative_error="
+            + str(self.relative_error)
+            + ">"
+        )
+
+
+class LatencySketches(object):
+    """
+    <Purpose>
+      Keeps a LogHistogram of the elapsed times of the system calls of a trace,
+      in seconds, for every system call name or pid. System calls without an
+      elapsed time (traces without -T, unfinished calls) are skipped.
+
+    <Attributes>
+      self.key:
+        "name" or "pid", the Syscall attribute the sketches are keyed by.
+
+      self.relative_error:
+        The relative error of the sketches, see LogHistogram.
+
+      self.sketches:
+        A dict mapping each key to its LogHistogram.
+    """
+
+    def __init__(self, key="name", relative_error=0.01):
+        if key not in ("name", "pid"):
+            raise ValueError("Cannot key latency sketches by " + repr(key))
+
+        self.key = key
+        self.relative_error = relative_error
+        self.sketches = {}
+
+    def add(self, syscall):
+        elapsed_time = syscall.elapsed_time
+        if elapsed_time is None:
+            return
+
+        key = getattr(syscall, self.key)
+        sketch = self.sketches.get(key)
+        if sketch is None:
+            sketch = self.sketches[key] = LogHistogram(self.relative_error)
+        sketch.add(elapsed_time)
+
+    def merge(self, other):
+        """
+        Add the sketches of another LatencySketches with the same key and
+        relative error to these ones. Returns self.
+        """
+
+        if other.key != self.key:
+            raise ValueError("Cannot merge latency sketches of different keys")
+
+        for key, other_sketch in other.sketches.items():
+            sketch = self.sketches.get(key)
+            if sketch is None:
+                sketch = self.sketches[key] = LogHistogram(self.relative_error)
+            sketch.merge(other_sketch)
+        return self
+
+    def quantiles(self, key, qs=(0.5, 0.99, 0.999)):
+        """
+        Return the estimated quantiles of the elapsed times of a key, as a list
+        with one value per quantile of qs, or None if the key has no sketch.
+        """
+
+        sketch = self.sketches.get(key)
+        if sketch is None:
+            return None
+        return [sketch.quantile(q) for q in qs]
+
+    def __repr__(self):
+        return (
+            "<LatencySketches key="
+            + self.key
+            + " sketches="
+            + str(len(self.sketches))
+            + ">"
+        )
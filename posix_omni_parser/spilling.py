@@ -0,0 +1,98 @@
+"""
+<Purpose>
+  Large string arguments, e.g. the buffers of read and write or the environment
+  array of execve, need not be kept in memory: they can be read back from the
+  trace file when asked for. A FileSpan references such a string as a byte
+  range of the trace file, which is read through an mmap of the file.
+
+  The trace file must not change while spans into it are in use.
+
+  Example using this module:
+
+    trace_file = spilling.TraceFile(trace_path)
+    span = spilling.FileSpan(trace_file, offset, length)
+    span.read()
+
+"""
+
+from builtins import object
+import mmap
+
+
+class TraceFile(object):
+    """
+    Read access to byte ranges of a trace file. The file is mapped in memory on
+    the first read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._map = None
+
+    def read(self, offset, length):
+        if self._map is None:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[offset : offset + length].decode("utf-8", "replace")
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+
+    def __getstate__(self):
+        # the mapping is opened again on the first read after unpickling.
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def __repr__(self):
+        return "<TraceFile " + self.path + ">"
+
+
+class FileSpan(object):
+    """
+    A string stored in a trace file, length bytes long starting at offset.
+    """
+
+    __slots__ = ("trace_file", "offset", "length")
+
+    def __init__(self, trace_file, offset, length):
+        self.trace_file = trace_file
+        self.offset = offset
+        self.length = length
+
+    def read(self):
+        return self.trace_file.read(self.offset, self.length)
+
+    def __getstate__(self):
+        return (self.trace_file, self.offset, self.length)
+
+    def __setstate__(self, state):
+        self.trace_file, self.offset, self.length = state
+
+    def __eq__(self, other):
+        return (
+            type(other) is type(self)
+            and self.trace_file.path == other.trace_file.path
+            and self.offset == other.offset
+            and self.length == other.length
+        )
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return (
+            "<FileSpan "
+            + self.trace_file.path
+            + " offset="
+            + str(self.offset)
+            + " length="
+            + str(self.length)
+            + ">"
+        )
@@ -0,0 +1,128 @@
+"""
+<Purpose>
+  Converts the timestamps printed by strace with the -t, -tt, -ttt and -r
+  options into a single representation: an integer number of nanoseconds.
+
+  -ttt timestamps are seconds since the epoch, so they become nanoseconds since
+  the epoch. -t and -tt timestamps are a time of day. They are anchored to the
+  date the trace was gathered on (or to 1970-01-01 if no date is given), and a
+  day is added every time the clock wraps around midnight. -r timestamps are the
+  time since the previous line, so they are summed up into the time since the
+  first line of the trace.
+
+  Example using this module:
+
+    clock = timestamps.make_clock("tt", datetime.date(2021, 3, 4))
+    clock("15:32:16.190216")  # 1614871936190216000
+
+"""
+
+from builtins import object
+import datetime
+
+NANOSECONDS_PER_SECOND = 1000000000
+NANOSECONDS_PER_DAY = 86400 * NANOSECONDS_PER_SECOND
+
+# a time of day smaller than the previous one by more than this is taken to mean
+# that the clock went past midnight. Smaller steps back can happen in -f traces
+# where the lines of different processes are slightly out of order.
+_MIDNIGHT_THRESHOLD = NANOSECONDS_PER_DAY // 2
+
+_EPOCH_DATE = datetime.date(1970, 1, 1)
+
+
+def _date_to_nanoseconds(trace_date):
+    if trace_date is None:
+        return 0
+    return (trace_date - _EPOCH_DATE).days * NANOSECONDS_PER_DAY
+
+
+def _seconds_to_nanoseconds(token):
+    # 1371472360.671434 or 0.000539
+    seconds, _, fraction = token.partition(".")
+    return int(seconds) * NANOSECONDS_PER_SECOND + int(fraction[:9].ljust(9, "0"))
+
+
+def _time_of_day_to_nanoseconds(token):
+    # 15:31:56 or 15:32:16.190216
+    clock, _, fraction = token.partition(".")
+    hours, minutes, seconds = clock.split(":")
+    return (
+        (int(hours) * 60 + int(minutes)) * 60 + int(seconds)
+    ) * NANOSECONDS_PER_SECOND + int(fraction[:9].ljust(9, "0"))
+
+
+class TimeOfDayClock(object):
+    """
+    Clock for the -t and -tt options.
+    """
+
+    def __init__(self, trace_date=None):
+        # nanoseconds since the epoch at the start of the current day.
+        self.day_start = _date_to_nanoseconds(trace_date)
+        self.last_time_of_day = 0
+
+    def __call__(self, token):
+        time_of_day = _time_of_day_to_nanoseconds(token)
+        if time_of_day < self.last_time_of_day - _MIDNIGHT_THRESHOLD:
+            self.day_start += NANOSECONDS_PER_DAY
+        self.last_time_of_day = time_of_day
+        return self.day_start + time_of_day
+
+
+class EpochClock(object):
+    """
+    Clock for the -ttt option.
+    """
+
+    def __call__(self, token):
+        return _seconds_to_nanoseconds(token)
+
+
+class RelativeClock(object):
+    """
+    Clock for the -r option. Every line of the trace, including signal and exit
+    lines, must be passed to the clock for the sum to be correct.
+    """
+
+    def __init__(self):
+        self.elapsed = 0
+
+    def __call__(self, token):
+        self.elapsed += _seconds_to_nanoseconds(token)
+        return self.elapsed
+
+
+def make_clock(timestamp_option, trace_date=None):
+    """
+    <Purpose>
+      Create the clock converting the timestamps of a trace to nanoseconds.
+
+    <Arguments>
+      timestamp_option:
+        The timestamp option detected in the trace: "t", "tt", "ttt" or "r".
+
+      trace_date:
+        A datetime.date the trace was gathered on. Only used by -t and -tt
+        timestamps.
+
+    <Exceptions>
+      ValueError:
+        If the timestamp option is unknown.
+
+    <Side Effects>
+      None
+
+    <Returns>
+      A callable that takes a timestamp string and returns an int of
+      nanoseconds. Clocks of -t, -tt and -r keep state, so they must be called
+      with the timestamps in the order they appear in the trace.
+    """
+
+    if timestamp_option in ("t", "tt"):
+        return TimeOfDayClock(trace_date)
+    if timestamp_option == "ttt":
+        return EpochClock()
+    if timestamp_option == "r":
+        return RelativeClock()
+    raise ValueError("Unknown timestamp option: " + str(timestamp_option))
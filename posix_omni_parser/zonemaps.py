@@ -0,0 +1,488 @@
+"""
+<Purpose>
+  Summaries of the blocks of a trace that let repeated queries skip the blocks
+  that cannot match. The system calls of a trace are cut into blocks of
+  block_size calls, and each block gets a Zone: its smallest and largest
+  timestamps, its pids, its number of failed calls and a Bloom filter over the
+  names, error labels and paths of its calls. The zones are saved next to the
+  trace, in a summary file, and reused as long as the trace does not change and
+  is opened with the same trace_date.
+
+  A SummarizedTrace answers a query by testing the zones first, see
+  Query.may_match, and parsing only the blocks that may hold matching calls,
+  through an offsets.IndexedTrace whose interval is the block size.
+
+  Example using this module:
+
+    trace = zonemaps.SummarizedTrace(trace_path, pickle_file)
+    for syscall in trace.select('name == unlink and arg.path == "/var/lib/x"'):
+        print(syscall)
+
+"""
+
+from builtins import object
+from builtins import range
+from builtins import str
+import os
+import pickle
+import zlib
+
+from . import indexes
+from . import offsets
+from . import query
+from .parsers.StraceParser import StraceParser
+
+# bumped whenever the content of the summary files changes.
+FORMAT_VERSION = 2
+
+
+class BloomFilter(object):
+    """
+    <Purpose>
+      A set of strings that may answer that a string is in it when it is not,
+      but never the opposite. The bit positions of a string come from its
+      CRC-32 and Adler-32 checksums (double hashing), which, unlike hash(), do
+      not change from a Python process to the next, so that filters can be
+      saved.
+
+    <Attributes>
+      self.size:
+        The number of bits of the filter.
+
+      self.hashes:
+        The number of bits set per string.
+
+      self.bits:
+        The bytearray holding the bits.
+    """
+
+    def __init__(self, size=8192, hashes=4):
+        assert size > 0 and size % 8 == 0, "The size must be a multiple of 8"
+
+        self.size = size
+        self.hashes = hashes
+        self.bits = bytearray(size // 8)
+
+    def _positions(self, key):
+        data = key.encode("utf-8", "replace")
+        first = zlib.crc32(data)
+        # an odd step visits different bits as long as the size is even.
+        step = zlib.adler32(data) | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __repr__(self):
+        return (
+            "<BloomFilter size=" + str(self.size) + " hashes=" + str(self.hashes) + ">"
+        )
+
+
+class Zone(object):
+    """
+    <Purpose>
+      The summary of a block of system calls.
+
+    <Attributes>
+      self.start:
+        The position of the first system call of the block.
+
+      self.count:
+        The number of system calls of the block.
+
+      self.errors:
+        The number of system calls of the block that failed with an error label.
+
+      self.min_timestamp, self.max_timestamp:
+        The smallest and largest timestamps of the block, or None if its calls
+        have no timestamps.
+
+      self.pids:
+        The set of the pids of the block.
+
+      self.bloom:
+        A BloomFilter of the names, error labels and paths of the block, see
+        might_contain.
+    """
+
+    def __init__(self, start, bloom):
+        self.start = start
+        self.count = 0
+        self.errors = 0
+        self.min_timestamp = None
+        self.max_timestamp = None
+        self.pids = set()
+        self.bloom = bloom
+
+    def add(self, syscall):
+        self.count += 1
+        self.pids.add(syscall.pid)
+
+        timestamp = syscall.timestamp
+        if timestamp is not None:
+            if self.min_timestamp is None or timestamp < self.min_timestamp:
+                self.min_timestamp = timestamp
+            if self.max_timestamp is None or timestamp > self.max_timestamp:
+                self.max_timestamp = timestamp
+
+        bloom = self.bloom
+        bloom.add("name:" + syscall.name)
+        if syscall.ret is not None and syscall.ret[1] is not None:
+            self.errors += 1
+            bloom.add("err:" + syscall.ret[1])
+        for path in indexes.syscall_paths(syscall):
+            bloom.add("path:" + path)
+
+    def might_contain(self, kind, key):
+        """
+        Return False if no system call of the block has the key, True if one
+        may have it. kind is "name", "err" or "path".
+        """
+        return kind + ":" + key in self.bloom
+
+    def __repr__(self):
+        return (
+            "<Zone start="
+            + str(self.start)
+            + " count="
+            + str(self.count)
+            + " pids="
+            + str(len(self.pids))
+            + " errors="
+            + str(self.errors)
+            + ">"
+        )
+
+
+class ZoneMapBuilder(object):
+    """
+    <Purpose>
+      Cuts the system calls added into blocks and summarizes each one in a
+      Zone. It can be passed as a sink to StraceParser.parse_trace.
+
+    <Attributes>
+      self.block_size:
+        The number of system calls per block.
+
+      self.bloom_size, self.bloom_hashes:
+        The size and number of hashes of the BloomFilter of each zone.
+
+      self.zones:
+        The list of the zones, the last one possibly not full.
+    """
+
+    def __init__(self, block_size=4096, bloom_size=8192, bloom_hashes=4):
+        if block_size < 1:
+            raise ValueError("The block size must be positive, not " + str(block_size))
+
+        self.block_size = block_size
+        self.bloom_size = bloom_size
+        self.bloom_hashes = bloom_hashes
+        self.zones = []
+        self._zone = None
+
+    def add(self, syscall):
+        zone = self._zone
+        if zone is None or zone.count == self.block_size:
+            start = len(self.zones) * self.block_size
+            zone = self._zone = Zone(
+                start, BloomFilter(self.bloom_size, self.bloom_hashes)
+            )
+            self.zones.append(zone)
+        zone.add(syscall)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_zone"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._zone = self.zones[-1] if self.zones else None
+
+
+class ZoneMaps(object):
+    """
+    <Purpose>
+      The zones of a trace, as saved in its summary file.
+
+    <Attributes>
+      self.trace_size, self.trace_mtime:
+        The size and modification time of the trace file the zones were built
+        for.
+
+      self.trace_date, self.trace_options:
+        The trace_date and detected trace_options of the parser the zones were
+        built with. The timestamps of the zones depend on both.
+
+      self.block_size:
+        The number of system calls per block.
+
+      self.zones:
+        The list of the Zone of every block, in trace order.
+    """
+
+    def __init__(
+        self, trace_size, trace_mtime, trace_date, trace_options, block_size, zones
+    ):
+        self.trace_size = trace_size
+        self.trace_mtime = trace_mtime
+        self.trace_date = trace_date
+        self.trace_options = trace_options
+        self.block_size = block_size
+        self.zones = zones
+
+    def matches(self, parser, block_size):
+        """
+        Return whether the zones were built for the current content of the trace
+        file of a StraceParser, with the same options as the parser and the
+        given block size.
+        """
+        trace_stat = os.stat(parser.trace_path)
+        return (
+            self.trace_size == trace_stat.st_size
+            and self.trace_mtime == trace_stat.st_mtime
+            and self.trace_date == parser.trace_date
+            and self.trace_options == parser.trace_options
+            and self.block_size == block_size
+        )
+
+    def __repr__(self):
+        return (
+            "<ZoneMaps zones="
+            + str(len(self.zones))
+            + " block_size="
+            + str(self.block_size)
+            + ">"
+        )
+
+
+def build_zone_maps(parser, block_size=4096, bloom_size=8192, bloom_hashes=4):
+    """
+    <Purpose>
+      Parse a whole trace once and summarize its blocks.
+
+    <Arguments>
+      parser:
+        The StraceParser of the trace, that has not parsed any line yet.
+      block_size:
+        The number of system calls per block.
+      bloom_size, bloom_hashes:
+        The size in bits and number of hashes of the Bloom filters. The
+        defaults keep false positives under 1% for up to about 800 distinct
+        names, error labels and paths per block.
+
+    <Exceptions>
+      See StraceParser.parse_trace.
+
+    <Side Effects>
+      None
+
+    <Returns>
+      A ZoneMaps.
+    """
+
+    trace_stat = os.stat(parser.trace_path)
+    builder = ZoneMapBuilder(block_size, bloom_size, bloom_hashes)
+    for syscall in parser.iter_syscalls():
+        builder.add(syscall)
+    return ZoneMaps(
+        trace_stat.st_size,
+        trace_stat.st_mtime,
+        parser.trace_date,
+        parser.trace_options,
+        block_size,
+        builder.zones,
+    )
+
+
+def load_zone_maps(summary_path):
+    """
+    Return the ZoneMaps saved in a summary file, or None if the file does not
+    exist or was written by another version of this module.
+    """
+    if not os.path.exists(summary_path):
+        return None
+    with open(summary_path, "rb") as fh:
+        version, zone_maps = pickle.load(fh)
+    if version != FORMAT_VERSION:
+        return None
+    return zone_maps
+
+
+def save_zone_maps(zone_maps, summary_path):
+    """
+    Save a ZoneMaps to a summary file, through a temporary file renamed once
+    written.
+    """
+    with open(summary_path + ".tmp", "wb") as fh:
+        pickle.dump((FORMAT_VERSION, zone_maps), fh, pickle.HIGHEST_PROTOCOL)
+    os.replace(summary_path + ".tmp", summary_path)
+
+
+class SummarizedTrace(object):
+    """
+    <Purpose>
+      A trace queried block by block, skipping the blocks whose zones cannot
+      match.
+
+    <Attributes>
+      self.trace_path:
+        The path to the trace file.
+
+      self.summary_path:
+        The path of the summary file.
+
+      self.zone_maps:
+        The ZoneMaps of the trace.
+
+      self.indexed:
+        The offsets.IndexedTrace the blocks are read through.
+    """
+
+    def __init__(
+        self,
+        trace_path,
+        pickle_file,
+        summary_path=None,
+        block_size=4096,
+        bloom_size=8192,
+        bloom_hashes=4,
+        **parser_options
+    ):
+        """
+        <Purpose>
+          Open a trace for block skipping queries, loading its zones from the
+          summary file, or building and saving them if the summary file is
+          missing, out of date, or was built with other parser options.
+
+        <Arguments>
+          trace_path:
+            The path to the trace file.
+          pickle_file:
+            The path to the pickle file containing the parsed system call
+            representations.
+          summary_path:
+            The path of the summary file, trace_path + ".zones" by default. The
+            offsets of the blocks are saved in summary_path + ".offsets".
+          block_size, bloom_size, bloom_hashes:
+            See build_zone_maps.
+          parser_options:
+            Keyword arguments passed on to the parsers, e.g. trace_date. See
+            StraceParser.
+
+        <Exceptions>
+          Exception:
+            If the number of system calls parsed differs from the number of
+            system call lines, which happens when malformed lines are skipped
+            under an error budget: the positions of the zones would not line up
+            with the blocks read.
+
+        <Side Effects>
+          Writes the summary and offsets files if needed.
+
+        <Returns>
+          None
+        """
+
+        self.trace_path = trace_path
+        self.summary_path = summary_path
+        if summary_path is None:
+            self.summary_path = trace_path + ".zones"
+
+        self.indexed = offsets.IndexedTrace(
+            trace_path,
+            pickle_file,
+            self.summary_path + ".offsets",
+            block_size,
+            **parser_options
+        )
+
+        self.zone_maps = load_zone_maps(self.summary_path)
+        if self.zone_maps is None or not self.zone_maps.matches(
+            self.indexed.parser, block_size
+        ):
+            parser = StraceParser(trace_path, pickle_file, **parser_options)
+            self.zone_maps = build_zone_maps(
+                parser, block_size, bloom_size, bloom_hashes
+            )
+            parsed = sum(zone.count for zone in self.zone_maps.zones)
+            if parsed != len(self.indexed):
+                raise Exception(
+                    "Parsed "
+                    + str(parsed)
+                    + " system calls out of the "
+                    + str(len(self.indexed))
+                    + " lines of trace `"
+                    + trace_path
+                    + "`"
+                )
+            save_zone_maps(self.zone_maps, self.summary_path)
+
+    def __len__(self):
+        return len(self.indexed)
+
+    def blocks(self, expression):
+        """
+        Return the indexes of the blocks that may hold system calls matching a
+        query, given as a Query or an expression string.
+        """
+        if not isinstance(expression, query.Query):
+            expression = query.compile_query(expression)
+        return [
+            block
+            for block, zone in enumerate(self.zone_maps.zones)
+            if expression.may_match(zone)
+        ]
+
+    def select(self, expression):
+        """
+        <Purpose>
+          Find the system calls of the trace matching a query, parsing only the
+          blocks that may hold some.
+
+        <Arguments>
+          expression:
+            A Query, or an expression string. See the query module.
+
+        <Exceptions>
+          query.QueryError:
+            If the expression is malformed.
+
+        <Side Effects>
+          None
+
+        <Returns>
+          A generator of the matching Syscall objects, in trace order.
+        """
+
+        if not isinstance(expression, query.Query):
+            expression = query.compile_query(expression)
+
+        block_size = self.zone_maps.block_size
+        for block in self.blocks(expression):
+            start = block * block_size
+            for syscall in self.indexed.read(start, start + block_size):
+                if expression(syscall):
+                    yield syscall
+
+    def __repr__(self):
+        return (
+            "<SummarizedTrace "
+            + self.trace_path
+            + " syscalls="
+            + str(len(self))
+            + " zones="
+            + str(len(self.zone_maps.zones))
+            + ">"
+        )
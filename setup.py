@@ -16,6 +16,14 @@ setup(
     # the namespace.
     packages=["posix_omni_parser", "posix_omni_parser.parsers", "sysDef"],
     install_requires=["future"],
+    extras_require={
+        # faster builds and lookups of the timestamp index.
+        "numpy": ["numpy"],
+        # export to Apache Arrow and Parquet files.
+        "arrow": ["pyarrow"],
+        # faster JSON Lines export.
+        "orjson": ["orjson"],
+    },
     entry_points={
         "console_scripts": [
             "parse_syscall_definitions = posix_omni_parser.parse_syscall_definitions:main"
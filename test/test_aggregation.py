@@ -0,0 +1,115 @@
+from posix_omni_parser import Trace
+from posix_omni_parser import aggregation
+from posix_omni_parser.parsers.StraceParser import StraceParser
+import collections
+import os
+import pickle
+import pytest
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+TIMED_LINES = [
+    '1 open("a", O_RDONLY) = 3 <0.000010>',
+    '1 open("b", O_RDONLY) = -1 ENOENT (No such file or directory) <0.000030>',
+    '2 read(3, "x", 1) = 1 <0.000200>',
+    "1 close(3) = 0 <0.000002>",
+    '2 rename("a", "b") = 0 <0.000050>',
+]
+
+
+def write_trace(directory):
+    trace_path = os.path.join(str(directory), "timed.strace")
+    with open(trace_path, "w") as fh:
+        fh.write("\n".join(TIMED_LINES) + "\n")
+    return trace_path
+
+
+class TestAggregator(object):
+    def test_counts_match_trace(self):
+        strace_path = get_test_data_path("../testbins/shell.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        t = Trace.Trace(strace_path, syscall_definitions, error_budget=100)
+
+        by_name = aggregation.aggregate_trace(
+            strace_path, syscall_definitions, error_budget=100
+        )
+        counts = collections.Counter(s.name for s in t.syscalls)
+        assert dict((k, v.count) for k, v in by_name.groups.items()) == counts
+        errors = collections.Counter(s.name for s in t.syscalls if s.ret and s.ret[1])
+        assert dict(
+            (k, v.errors) for k, v in by_name.groups.items() if v.errors
+        ) == dict(errors)
+        assert by_name.total().count == len(t.syscalls)
+        # the trace has no elapsed times.
+        assert by_name.total().mean is None
+
+    def test_merge(self):
+        strace_path = get_test_data_path("../testbins/shell.strace")
+        parser = StraceParser(
+            strace_path,
+            get_test_data_path("syscall_definitions.pickle"),
+            error_budget=100,
+        )
+        syscalls = parser.parse_trace()
+
+        whole = aggregation.Aggregator(("pid", "errno"))
+        halves = [
+            aggregation.Aggregator(("pid", "errno")),
+            aggregation.Aggregator(("pid", "errno")),
+        ]
+        for position, syscall in enumerate(syscalls):
+            whole.add(syscall)
+            halves[position * 2 // len(syscalls)].add(syscall)
+
+        # partial results travel between workers pickled.
+        merged = pickle.loads(pickle.dumps(halves[0])).merge(halves[1])
+        assert merged.groups == whole.groups
+        assert len(whole.groups) > 2
+
+        with pytest.raises(ValueError):
+            merged.merge(aggregation.Aggregator("name"))
+
+    def test_elapsed_time(self, tmp_path):
+        trace_path = write_trace(tmp_path)
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+
+        by_name = aggregation.aggregate_trace(trace_path, syscall_definitions)
+        opens = by_name.groups["open"]
+        assert (opens.count, opens.errors) == (2, 1)
+        assert opens.minimum == 0.00001
+        assert opens.maximum == 0.00003
+        assert abs(opens.mean - 0.00002) < 1e-12
+
+        summary = by_name.format_summary().splitlines()
+        assert summary[0].split() == [
+            "%",
+            "time",
+            "seconds",
+            "usecs/call",
+            "calls",
+            "errors",
+            "name",
+        ]
+        assert summary[2].split() == ["68.49", "0.000200", "200", "1", "read"]
+        assert summary[-1].split() == ["100.00", "0.000292", "5", "1", "total"]
+
+        by_path = aggregation.Aggregator("path")
+        StraceParser(trace_path, syscall_definitions).parse_trace(sinks=[by_path])
+        assert by_path.groups["a"].count == 2
+        assert by_path.groups["b"].count == 2
+        assert by_path.groups[None].count == 2
+
+        # unknown system calls have no parsed arguments, so no paths.
+        unknown = StraceParser(trace_path, syscall_definitions).parse_trace()[0]
+        unknown.name = "syscall_332"
+        unknown.args = None
+        by_path.add(unknown)
+        assert by_path.groups[None].count == 3
+
+        with pytest.raises(ValueError):
+            aggregation.Aggregator("size")
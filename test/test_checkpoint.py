@@ -0,0 +1,172 @@
+from posix_omni_parser.parsers.StraceParser import StraceParser
+import datetime
+import os
+import pytest
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+class Preempted(Exception):
+    pass
+
+
+class CountingSink(object):
+    """
+    Counts the parsed system calls per name, and can simulate the job being
+    preempted after a number of calls.
+    """
+
+    def __init__(self, preempt_after=None):
+        self.counts = {}
+        self.seen = 0
+        self.preempt_after = preempt_after
+
+    def add(self, syscall):
+        if self.seen == self.preempt_after:
+            raise Preempted()
+        self.seen += 1
+        self.counts[syscall.name] = self.counts.get(syscall.name, 0) + 1
+
+    # only the counts are part of the checkpointed state.
+    def __getstate__(self):
+        return (self.counts, self.seen)
+
+    def __setstate__(self, state):
+        self.counts, self.seen = state
+
+
+def summary(syscalls):
+    return [(s.pid, s.name, s.original_line, s.ret, str(s.args)) for s in syscalls]
+
+
+class TestCheckpoint(object):
+    def test_resume_gives_identical_output(self, tmp_path):
+        strace_path = get_test_data_path("../testbins/shell.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        checkpoint_path = os.path.join(str(tmp_path), "shell.checkpoint")
+
+        full_sink = CountingSink()
+        parser = StraceParser(strace_path, syscall_definitions, error_budget=100)
+        expected = parser.parse_trace(sinks=[full_sink])
+        expected_errors = parser.errors
+
+        # the first run is preempted between two checkpoints.
+        parser = StraceParser(strace_path, syscall_definitions, error_budget=100)
+        with pytest.raises(Preempted):
+            parser.parse_trace(
+                sinks=[CountingSink(preempt_after=1234)],
+                checkpoint_path=checkpoint_path,
+                checkpoint_interval=500,
+            )
+        assert os.path.exists(checkpoint_path)
+
+        # the restarted job picks up from the checkpoint written after 1000 calls.
+        parser = StraceParser(strace_path, syscall_definitions, error_budget=100)
+        resumed_sink = CountingSink()
+        resumed = parser.parse_trace(
+            sinks=[resumed_sink],
+            checkpoint_path=checkpoint_path,
+            checkpoint_interval=500,
+        )
+
+        assert summary(resumed) == summary(expected)
+        assert resumed_sink.seen == full_sink.seen
+        assert resumed_sink.counts == full_sink.counts
+        assert parser.errors == expected_errors
+
+        # a finished parse cleans up after itself.
+        assert not os.path.exists(checkpoint_path)
+        assert not os.path.exists(checkpoint_path + ".syscalls")
+
+    def test_resume_with_unfinished_syscall(self, tmp_path):
+        trace_path = os.path.join(str(tmp_path), "unfinished.strace")
+        with open(trace_path, "w") as fh:
+            fh.write(
+                "8215  0.000000 wait4(8216,  <unfinished ...>\n"
+                "8216  0.000050 close(3) = 0\n"
+                "8216  0.000100 exit_group(0) = ?\n"
+                "8216  0.000100 +++ exited with 0 +++\n"
+                "8215  0.000200 <... wait4 resumed> NULL, 0, NULL) = 8216\n"
+            )
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        checkpoint_path = os.path.join(str(tmp_path), "unfinished.checkpoint")
+
+        expected = StraceParser(trace_path, syscall_definitions).parse_trace()
+
+        parser = StraceParser(trace_path, syscall_definitions)
+        with pytest.raises(Preempted):
+            parser.parse_trace(
+                sinks=[CountingSink(preempt_after=3)],
+                checkpoint_path=checkpoint_path,
+                checkpoint_interval=2,
+            )
+
+        parser = StraceParser(trace_path, syscall_definitions)
+        resumed = parser.parse_trace(
+            checkpoint_path=checkpoint_path, sinks=[CountingSink()]
+        )
+
+        assert summary(resumed) == summary(expected)
+        assert [s.timestamp for s in resumed] == [s.timestamp for s in expected]
+
+    def test_resume_with_other_options(self, tmp_path):
+        trace_path = os.path.join(str(tmp_path), "time_of_day.strace")
+        with open(trace_path, "w") as fh:
+            fh.write(
+                "8215  15:32:16.190000 wait4(8216,  <unfinished ...>\n"
+                "8216  15:32:16.190050 close(3) = 0\n"
+                "8216  15:32:16.190100 exit_group(0) = ?\n"
+                "8216  15:32:16.190100 +++ exited with 0 +++\n"
+                "8215  15:32:16.190200 <... wait4 resumed> NULL, 0, NULL) = 8216\n"
+            )
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        checkpoint_path = os.path.join(str(tmp_path), "time_of_day.checkpoint")
+
+        parser = StraceParser(
+            trace_path, syscall_definitions, trace_date=datetime.date(2020, 1, 1)
+        )
+        with pytest.raises(Preempted):
+            parser.parse_trace(
+                sinks=[CountingSink(preempt_after=3)],
+                checkpoint_path=checkpoint_path,
+                checkpoint_interval=2,
+            )
+
+        # the timestamps before the checkpoint are anchored to another day.
+        parser = StraceParser(
+            trace_path, syscall_definitions, trace_date=datetime.date(2021, 1, 1)
+        )
+        with pytest.raises(Exception, match="parser options"):
+            parser.parse_trace(checkpoint_path=checkpoint_path, sinks=[CountingSink()])
+        assert parser.unfinished_syscalls == []
+
+        parser = StraceParser(
+            trace_path,
+            syscall_definitions,
+            trace_date=datetime.date(2020, 1, 1),
+            compact_flags=True,
+        )
+        with pytest.raises(Exception, match="parser options"):
+            parser.parse_trace(checkpoint_path=checkpoint_path, sinks=[CountingSink()])
+
+        # a rejected resume leaves the parser and the checkpoint untouched.
+        parser = StraceParser(
+            trace_path, syscall_definitions, trace_date=datetime.date(2020, 1, 1)
+        )
+        with pytest.raises(Exception, match="sinks"):
+            parser.parse_trace(checkpoint_path=checkpoint_path, sinks=[])
+        assert parser.unfinished_syscalls == []
+        assert parser.errors == []
+
+        expected = StraceParser(
+            trace_path, syscall_definitions, trace_date=datetime.date(2020, 1, 1)
+        ).parse_trace()
+        resumed = parser.parse_trace(
+            checkpoint_path=checkpoint_path, sinks=[CountingSink()]
+        )
+        assert summary(resumed) == summary(expected)
+        assert [s.timestamp for s in resumed] == [s.timestamp for s in expected]
@@ -0,0 +1,148 @@
+from posix_omni_parser import Trace
+from posix_omni_parser import columnar
+from posix_omni_parser.parsers.StraceParser import StraceParser
+import os
+import pytest
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+LINES = [
+    '100 1614797952.000001 openat(AT_FDCWD, "/etc/passwd", O_RDONLY|O_CLOEXEC) = 3 <0.000010>',
+    "100 1614797952.000002 connect(4, {sa_family=AF_INET, sin_port=htons(80), "
+    + 'sin_addr=inet_addr("127.0.0.1")}, 16) = -1 ECONNREFUSED (Connection refused) <0.000020>',
+    "100 1614797952.000003 poll([{fd=3, events=POLLIN}], 1, 1000) = 1 ([{fd=3, revents=POLLIN}]) <0.000030>",
+    "100 1614797952.000004 read(3,  <unfinished ...>",
+    "101 1614797952.000005 brk(NULL) = 0x5563763d2000 <0.000040>",
+    '100 1614797952.000006 <... read resumed> "root", 4096) = 4 <0.000050>',
+    "100 1614797952.000007 exit_group(0) = ?",
+]
+
+
+def write_trace(directory):
+    trace_path = os.path.join(str(directory), "export.strace")
+    with open(trace_path, "w") as fh:
+        fh.write("\n".join(LINES) + "\n")
+    return trace_path
+
+
+def parse(trace_path):
+    return Trace.Trace(
+        trace_path, get_test_data_path("syscall_definitions.pickle")
+    ).syscalls
+
+
+class TestArgRecord(object):
+    def test_typed_args(self, tmp_path):
+        syscalls = parse(write_trace(tmp_path))
+
+        openat = [columnar.arg_record(arg) for arg in syscalls[0].args]
+        assert openat[0] == {
+            "type": "FileDescriptor",
+            "int": None,
+            "text": "AT_FDCWD",
+            "items": None,
+        }
+        assert openat[1]["type"] == "Filepath"
+        assert openat[1]["text"] == '"/etc/passwd"'
+        assert openat[2]["items"] == ["O_RDONLY", "O_CLOEXEC"]
+
+        connect = [columnar.arg_record(arg) for arg in syscalls[1].args]
+        assert connect[0]["int"] == 4
+        assert connect[1]["type"] == "Sockaddr"
+        assert connect[1]["items"] == ["family=2", "port=80", "address=127.0.0.1"]
+
+        poll = columnar.arg_record(syscalls[2].args[0])
+        assert poll["type"] == "PollFDPointer"
+        assert poll["items"] == ["{fd=3, events=POLLIN, revents=POLLIN}"]
+
+        stat = parse(get_test_data_path("fstat.strace"))[0].args[1]
+        record = columnar.arg_record(stat)
+        assert record["type"] == "Stat"
+        assert record["items"][0] == "st_dev=makedev(0, 4)"
+
+    def test_int64_overflow(self, tmp_path):
+        syscalls = parse(write_trace(tmp_path))
+        arg = syscalls[0].args[0]
+        arg.value = 2**64 - 1
+        assert columnar.arg_record(arg)["text"] == str(2**64 - 1)
+
+
+class TestArrowExport(object):
+    def test_parquet(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        import pyarrow.parquet
+
+        trace_path = write_trace(tmp_path)
+        output_path = os.path.join(str(tmp_path), "export.parquet")
+        count = columnar.export_trace(
+            trace_path,
+            get_test_data_path("syscall_definitions.pickle"),
+            output_path,
+            batch_size=3,
+            row_group_size=2,
+        )
+        assert count == len(LINES)
+
+        parquet_file = pyarrow.parquet.ParquetFile(output_path)
+        # batches of 3, 3 and 1 rows, cut in row groups of at most 2.
+        assert parquet_file.metadata.num_row_groups == 5
+        table = parquet_file.read()
+        assert table.schema.equals(columnar.arrow_schema(), check_metadata=True)
+
+        rows = table.to_pylist()
+        assert [row["name"] for row in rows] == [
+            "openat",
+            "connect",
+            "poll",
+            "read",
+            "brk",
+            "read",
+            "exit_group",
+        ]
+        assert rows[1]["ret"] == -1
+        assert rows[1]["errno"] == "ECONNREFUSED"
+        assert rows[3]["type"] == "unfinished"
+        assert rows[3]["ret"] is None
+        assert rows[4]["ret_text"] == "0x5563763d2000"
+        assert rows[6]["ret_text"] == "?"
+        assert rows[0]["timestamp"] == 1614797952000001000
+        assert rows[0]["elapsed_time"] == 0.00001
+        assert rows[5]["args"][1]["text"] == '"root"'
+
+    def test_arrow_formats(self, tmp_path):
+        pyarrow = pytest.importorskip("pyarrow")
+        import pyarrow.ipc
+
+        trace_path = write_trace(tmp_path)
+        parser = StraceParser(
+            trace_path, get_test_data_path("syscall_definitions.pickle")
+        )
+        syscalls = parser.parse_trace()
+
+        arrow_path = os.path.join(str(tmp_path), "export.arrow")
+        with columnar.ArrowExporter(arrow_path, "arrow", batch_size=4) as exporter:
+            for syscall in syscalls:
+                exporter.add(syscall)
+        reader = pyarrow.ipc.open_file(arrow_path)
+        assert reader.num_record_batches == 2
+        assert reader.read_all().num_rows == len(syscalls)
+
+        stream_path = os.path.join(str(tmp_path), "export.stream")
+        with columnar.ArrowExporter(
+            stream_path, "stream", compression=None
+        ) as exporter:
+            for syscall in syscalls:
+                exporter.add(syscall)
+        with pyarrow.OSFile(stream_path) as fh:
+            table = pyarrow.ipc.open_stream(fh).read_all()
+        assert table.column("pid").to_pylist() == [s.pid for s in syscalls]
+
+    def test_unknown_format(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        with pytest.raises(ValueError):
+            columnar.ArrowExporter(os.path.join(str(tmp_path), "x.csv"), "csv")
@@ -0,0 +1,149 @@
+from posix_omni_parser import Trace
+from posix_omni_parser import diffing
+import os
+import random
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+RECORDED = [
+    "100 brk(NULL) = 0x5563763d2000",
+    '100 openat(AT_FDCWD, "/etc/passwd", O_RDONLY|O_CLOEXEC) = 3',
+    '100 read(3, "root:x:0:0", 4096) = 10',
+    "100 close(3) = 0",
+    "100 clone(child_stack=NULL, flags=SIGCHLD, child_tidptr=0x7fcf9d4af810) = 101",
+    '101 write(1, "hi", 2) = 2',
+    "100 exit_group(0) = ?",
+]
+
+REPLAYED = [
+    "200 brk(NULL) = 0x55aa00000000",
+    '200 openat(AT_FDCWD, "/etc/passwd", O_RDONLY|O_CLOEXEC) = 3',
+    '200 read(3, "root:x:0:0", 4096) = -1 EIO (Input/output error)',
+    "200 close(3) = 0",
+    "200 clone(child_stack=NULL, flags=SIGCHLD, child_tidptr=0x7f0000000010) = 201",
+    '201 write(1, "hi", 2) = 2',
+    "200 exit_group(0) = ?",
+]
+
+
+def parse(directory, name, lines):
+    trace_path = os.path.join(str(directory), name)
+    with open(trace_path, "w") as fh:
+        fh.write("\n".join(lines) + "\n")
+    return Trace.Trace(trace_path, get_test_data_path("syscall_definitions.pickle"))
+
+
+def apply_opcodes(a, b, opcodes):
+    # rebuild b from a and the opcodes, checking that they are consistent.
+    rebuilt = []
+    i = j = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert (i1, j1) == (i, j)
+        if tag == "equal":
+            assert list(a[i1:i2]) == list(b[j1:j2])
+        rebuilt.extend(b[j1:j2])
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+    return rebuilt
+
+
+class TestDiffSignatures(object):
+    def test_random_edits(self):
+        generator = random.Random(0)
+        for _ in range(500):
+            a = [generator.randrange(6) for _ in range(generator.randrange(40))]
+            b = list(a)
+            for _ in range(generator.randrange(6)):
+                if b and generator.random() < 0.5:
+                    del b[generator.randrange(len(b))]
+                else:
+                    b.insert(generator.randrange(len(b) + 1), generator.randrange(8))
+            for max_cost in (0, 3, 1000):
+                opcodes = diffing.diff_signatures(a, b, max_cost)
+                assert apply_opcodes(a, b, opcodes) == b
+
+    def test_edit_distance(self):
+        a = list(range(1000)) * 2
+        b = a[:500] + [5000] + a[500:1500] + a[1501:]
+        opcodes = diffing.diff_signatures(a, b)
+        assert [op[0] for op in opcodes] == [
+            "equal",
+            "insert",
+            "equal",
+            "delete",
+            "equal",
+        ]
+        assert diffing.diff_signatures([], [1, 2]) == [("insert", 0, 0, 0, 2)]
+        assert diffing.diff_signatures([1, 2], [1, 2]) == [("equal", 0, 2, 0, 2)]
+
+
+class TestDiffTraces(object):
+    def test_replay(self, tmp_path):
+        recorded = parse(tmp_path, "recorded.strace", RECORDED)
+        replayed = parse(tmp_path, "replayed.strace", REPLAYED)
+
+        diffs = diffing.diff_traces(recorded.syscalls, replayed.syscalls)
+        assert [(d.pid_a, d.pid_b) for d in diffs] == [(100, 200), (101, 201)]
+
+        # pointers differ between the runs but are masked.
+        parent = diffs[0]
+        assert parent.opcodes == [
+            ("equal", 0, 2, 0, 2),
+            ("replace", 2, 3, 2, 3),
+            ("equal", 3, 6, 3, 6),
+        ]
+        assert parent.distance == 2
+        changed = parent.syscalls_b(replayed.syscalls)[2]
+        assert changed.ret == (-1, "EIO")
+        assert diffs[1].is_equal
+
+        unmasked = diffing.Signer(mask_pointers=False)
+        diffs = diffing.diff_traces(recorded.syscalls, replayed.syscalls, unmasked)
+        assert diffs[0].distance == 6
+
+        ignoring_returns = diffing.Signer(mask_returns=True)
+        diffs = diffing.diff_traces(
+            recorded.syscalls, replayed.syscalls, ignoring_returns
+        )
+        # the error label is still part of the signature.
+        assert diffs[0].distance == 2
+
+    def test_unmatched_pids(self, tmp_path):
+        recorded = parse(tmp_path, "recorded.strace", RECORDED)
+        replayed = parse(tmp_path, "replayed.strace", REPLAYED)
+        diffs = diffing.diff_traces(
+            recorded.syscalls, replayed.syscalls, pid_map={100: 200}
+        )
+        assert [(d.pid_a, d.pid_b) for d in diffs] == [
+            (100, 200),
+            (101, None),
+            (None, 201),
+        ]
+        assert diffs[1].opcodes == [("delete", 0, 1, 0, 0)]
+        assert diffs[2].opcodes == [("insert", 0, 0, 0, 1)]
+
+    def test_same_trace(self):
+        strace_path = get_test_data_path("../testbins/shell.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        first = Trace.Trace(strace_path, syscall_definitions, error_budget=100)
+        second = Trace.Trace(strace_path, syscall_definitions, error_budget=100)
+        diffs = diffing.diff_traces(first.syscalls, second.syscalls)
+        assert len(diffs) > 1
+        assert all(d.is_equal and d.pid_a == d.pid_b for d in diffs)
+
+    def test_unknown_syscall(self, tmp_path):
+        lines = RECORDED[:2] + ["100 syscall_332(0x3, 0x7ffd2a4c1e20, 0) = 0"]
+        trace = parse(tmp_path, "unknown.strace", lines)
+        diffs = diffing.diff_traces(trace.syscalls, trace.syscalls)
+        assert [d.is_equal for d in diffs] == [True]
+
+        # only the names and returns of unknown system calls are signed.
+        signer = diffing.Signer()
+        unknown = trace.syscalls[2]
+        assert signer.sign(unknown) == signer.sign(unknown)
+        assert signer.signatures == {("syscall_332", (), (0, None)): 0}
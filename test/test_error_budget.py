@@ -0,0 +1,71 @@
+from posix_omni_parser import Trace
+from posix_omni_parser.parsers.Parser import ErrorBudgetExceeded
+import os
+import pytest
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+def write_trace(directory, lines):
+    trace_path = os.path.join(str(directory), "malformed.strace")
+    with open(trace_path, "w") as fh:
+        fh.write("\n".join(lines) + "\n")
+    return trace_path
+
+
+MALFORMED_TRACE = [
+    '35388 open("test.txt", O_RDONLY, 0) = 3',
+    '35388 <... read resumed> "abc", 3) = 3',
+    "35388 close(3) = zero",
+    "35388 getpid() = 34355",
+]
+
+
+class TestErrorBudget(object):
+    def test_strict_by_default(self, tmp_path):
+        trace_path = write_trace(tmp_path, MALFORMED_TRACE)
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+
+        with pytest.raises(Exception) as excinfo:
+            Trace.Trace(trace_path, syscall_definitions)
+        assert "Unfinished syscall not found" in str(excinfo.value)
+
+    def test_malformed_lines_are_logged(self, tmp_path):
+        trace_path = write_trace(tmp_path, MALFORMED_TRACE)
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        t = Trace.Trace(trace_path, syscall_definitions, error_budget=2)
+
+        assert [syscall.name for syscall in t.syscalls] == ["open", "getpid"]
+
+        errors = t.parser.errors
+        assert len(errors) == 2
+        assert errors[0].line == MALFORMED_TRACE[1]
+        assert "Unfinished syscall not found" in errors[0].reason
+        assert errors[1].line == MALFORMED_TRACE[2]
+
+        # the offsets point at the malformed lines in the trace file.
+        with open(trace_path, "rb") as fh:
+            for error in errors:
+                fh.seek(error.offset)
+                assert fh.readline().decode().strip() == error.line
+
+    def test_budget_exceeded(self, tmp_path):
+        trace_path = write_trace(tmp_path, MALFORMED_TRACE)
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+
+        with pytest.raises(ErrorBudgetExceeded) as excinfo:
+            Trace.Trace(trace_path, syscall_definitions, error_budget=1)
+        assert len(excinfo.value.errors) == 2
+
+    def test_testbins_trace(self):
+        strace_path = get_test_data_path("../testbins/server.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        t = Trace.Trace(strace_path, syscall_definitions, error_budget=10)
+
+        assert len(t.syscalls) == 33
+        assert len(t.parser.errors) == 1
+        assert t.parser.errors[0].line.startswith("20655 accept(7, NULL, NULL")
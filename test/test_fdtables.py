@@ -0,0 +1,123 @@
+from posix_omni_parser import Trace
+from posix_omni_parser import fdtables
+from posix_omni_parser.fdtables import Resource
+import os
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+FD_LINES = [
+    '1 openat(AT_FDCWD, "/etc", O_RDONLY|O_DIRECTORY) = 3',
+    '1 openat(3, "passwd", O_RDONLY|O_CLOEXEC) = 4',
+    "1 pipe([5, 6]) = 0",
+    "1 dup2(4, 7) = 7",
+    "1 close(4) = 0",
+    "1 socket(AF_INET, SOCK_STREAM|SOCK_CLOEXEC, IPPROTO_TCP) = 8",
+    "1 fcntl(5, F_DUPFD_CLOEXEC, 0) = 9",
+    "1 close(42) = -1 EBADF (Bad file descriptor)",
+    "1 clone(child_stack=NULL, flags=CLONE_CHILD_SETTID|SIGCHLD, child_tidptr=0x7f) = 2",
+    "1 clone(child_stack=0x7f, flags=CLONE_VM|CLONE_FILES|CLONE_THREAD) = 3",
+    "2 close(7) = 0",
+    '2 execve("/bin/ls", ["ls"], 0x7ffc /* 3 vars */) = 0',
+    '3 open("/tmp/x", O_WRONLY|O_CREAT, 0644) = 10',
+]
+
+
+def write_trace(directory):
+    trace_path = os.path.join(str(directory), "fds.strace")
+    with open(trace_path, "w") as fh:
+        fh.write("\n".join(FD_LINES) + "\n")
+    return Trace.Trace(
+        trace_path, get_test_data_path("syscall_definitions.pickle"), track_fds=True
+    )
+
+
+class TestFdTracker(object):
+    def test_lookups(self, tmp_path):
+        t = write_trace(tmp_path)
+        fds = t.fds
+        assert isinstance(fds, fdtables.FdTracker)
+        assert fds.count == len(t.syscalls) == len(FD_LINES)
+
+        passwd = Resource("file", "/etc/passwd", 1)
+        # changes take effect after the system call that made them.
+        assert fds.resource(1, 4, 1) is None
+        assert fds.resource(1, 4, 2) == passwd
+        assert fds.resource(1, 7, 4) == passwd
+        assert fds.resource(1, 4, 4) == passwd
+        assert fds.resource(1, 4, 5) is None
+        assert fds.resource(1, 5, 3) == Resource("pipe", "read", 2)
+        assert fds.resource(1, 6, 3) == Resource("pipe", "write", 2)
+        assert fds.resource(1, 9) == fds.resource(1, 5)
+        assert fds.resource(1, 8) == Resource("socket", "AF_INET", 5)
+        assert fds.resource(1, 0) is None
+        assert fds.resource(99, 3) is None
+
+    def test_inheritance(self, tmp_path):
+        t = write_trace(tmp_path)
+        fds = t.fds
+
+        # the forked child gets a copy of the table, and execve closes the file
+        # descriptors marked close-on-exec.
+        assert sorted(fds.open_fds(2, 10)) == [3, 5, 6, 7, 8, 9]
+        assert sorted(fds.open_fds(2)) == [3, 5, 6]
+        assert 7 in fds.open_fds(1)
+
+        # the thread shares the table of its parent.
+        assert fds.tables[3] is fds.tables[1]
+        assert fds.resource(1, 10) == Resource("file", "/tmp/x", 12)
+        assert fds.resource(2, 10) is None
+        assert fds.open_fds(1, 0) == {}
+
+    def test_child_before_resumed_clone(self, tmp_path):
+        trace_path = os.path.join(str(tmp_path), "early_child.strace")
+        with open(trace_path, "w") as fh:
+            fh.write(
+                '10 open("/etc/a", O_RDONLY) = 3\n'
+                "10 clone(child_stack=NULL, flags=SIGCHLD <unfinished ...>\n"
+                '11 open("/etc/b", O_RDONLY) = 4\n'
+                "11 close(3) = 0\n"
+                "10 <... clone resumed> , child_tidptr=0x7f) = 11\n"
+                "10 clone(child_stack=0x7f, flags=CLONE_VM|CLONE_FILES <unfinished ...>\n"
+                '12 open("/etc/c", O_RDONLY) = 5\n'
+                "10 <... clone resumed> , child_tidptr=0x7f) = 12\n"
+            )
+        fds = Trace.Trace(
+            trace_path, get_test_data_path("syscall_definitions.pickle"), track_fds=True
+        ).fds
+
+        # the child keeps what it opened and closed before the clone returned in
+        # the trace, and inherits the rest of the table of its parent.
+        assert fds.resource(11, 4) == Resource("file", "/etc/b", 2)
+        assert fds.resource(11, 3) is None
+        assert fds.resource(11, 3, 3) == Resource("file", "/etc/a", 0)
+        assert sorted(fds.open_fds(11)) == [4]
+        assert sorted(fds.open_fds(10)) == [3, 5]
+
+        # a child sharing the table brings its file descriptors along.
+        assert fds.tables[12] is fds.tables[10]
+        assert fds.resource(10, 5) == Resource("file", "/etc/c", 6)
+        assert fds.resource(10, 5, 6) is None
+        assert fds.clone_starts == {}
+
+    def test_real_trace(self):
+        t = Trace.Trace(
+            get_test_data_path("../testbins/shell.strace"),
+            get_test_data_path("syscall_definitions.pickle"),
+            track_fds=True,
+            error_budget=100,
+        )
+        assert t.fds.count == len(t.syscalls)
+
+        # the fd returned by every successful openat resolves to the file it
+        # opened, right after the call.
+        for position, syscall in enumerate(t.syscalls):
+            if syscall.name == "openat" and syscall.ret[1] is None:
+                resource = t.fds.resource(syscall.pid, syscall.ret[0], position + 1)
+                assert resource.kind == "file"
+                assert resource.position == position
+                assert resource.name.endswith(syscall.args[1].value.lstrip("."))
@@ -0,0 +1,202 @@
+from posix_omni_parser import Trace
+from posix_omni_parser import indexes
+import os
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+class TestSyscallIndex(object):
+    def test_lookups_match_scans(self):
+        strace_path = get_test_data_path("../testbins/shell.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        indexed = Trace.Trace(
+            strace_path, syscall_definitions, index=True, error_budget=100
+        )
+        plain = Trace.Trace(strace_path, syscall_definitions, error_budget=100)
+        assert plain.index is None
+        assert indexed.index.count == len(indexed.syscalls)
+
+        pids = set(s.pid for s in plain.syscalls)
+        assert len(pids) > 1
+        for pid in pids:
+            assert [s.original_line for s in indexed.by_pid(pid)] == [
+                s.original_line for s in plain.by_pid(pid)
+            ]
+
+        for name in ("openat", "execve", "close"):
+            assert len(indexed.by_name(name)) > 0
+            assert [s.original_line for s in indexed.by_name(name)] == [
+                s.original_line for s in plain.by_name(name)
+            ]
+
+        enoent = indexed.by_errno("ENOENT")
+        assert len(enoent) > 0
+        assert all(s.ret[1] == "ENOENT" for s in enoent)
+        assert len(enoent) == len(plain.by_errno("ENOENT"))
+
+        assert indexed.by_name("not_a_syscall") == []
+
+    def test_index_as_sink(self, tmp_path):
+        trace_path = os.path.join(str(tmp_path), "index.strace")
+        with open(trace_path, "w") as fh:
+            fh.write(
+                "1 close(3) = 0\n"
+                '2 open("a", O_RDONLY) = -1 ENOENT (No such file or directory)\n'
+                "1 close(4) = -1 EBADF (Bad file descriptor)\n"
+            )
+        t = Trace.Trace(
+            trace_path, get_test_data_path("syscall_definitions.pickle"), index=True
+        )
+        assert list(t.index.pids[1]) == [0, 2]
+        assert list(t.index.names["close"]) == [0, 2]
+        assert list(t.index.errnos["EBADF"]) == [2]
+        assert isinstance(t.index, indexes.SyscallIndex)
+
+
+TIMED_LINES = [
+    '1 1614797952.000000 open("a", O_RDONLY) = 3 <0.000010>',
+    '1 1614797952.000100 read(3, "x", 1) = 1 <0.000005>',
+    "2 1614797952.000200 wait4(-1, NULL, 0, NULL) = 1 <0.500000>",
+    # -f traces can step back in time a little.
+    "1 1614797952.000150 close(3) = 0 <0.000001>",
+    '1 1614797952.300000 open("b", O_RDONLY) = 3 <0.000010>',
+    "1 1614797952.600000 close(3) = 0 <0.000001>",
+]
+
+
+def write_timed_trace(directory, index):
+    trace_path = os.path.join(str(directory), "timed.strace")
+    with open(trace_path, "w") as fh:
+        fh.write("\n".join(TIMED_LINES) + "\n")
+    return Trace.Trace(
+        trace_path, get_test_data_path("syscall_definitions.pickle"), index=index
+    )
+
+
+def seconds(value):
+    # nanoseconds since the epoch of a number of seconds into the trace.
+    return 1614797952 * 10**9 + int(round(value * 10**9))
+
+
+class TestTimeIndex(object):
+    def check_windows(self, indexed, plain):
+        windows = [
+            (0.0, 0.0002),
+            (0.00015, 0.00016),
+            (0.1, 0.4),
+            (0.7, 1.0),
+            (-1.0, 1.0),
+            (0.4, 0.1),
+        ]
+        for start, end in windows:
+            start, end = seconds(start), seconds(end)
+            assert [s.original_line for s in indexed.between(start, end)] == [
+                s.original_line for s in plain.between(start, end)
+            ]
+            assert [s.original_line for s in indexed.overlapping(start, end)] == [
+                s.original_line for s in plain.overlapping(start, end)
+            ]
+
+    def test_windows(self, tmp_path):
+        indexed = write_timed_trace(tmp_path, True)
+        plain = write_timed_trace(tmp_path, False)
+        assert plain.time_index is None
+        assert isinstance(indexed.time_index, indexes.TimeIndex)
+
+        window = indexed.between(seconds(0.0), seconds(0.0002))
+        assert [s.name for s in window] == ["open", "read", "close"]
+
+        # the blocking wait4 is running during the window but started before it.
+        assert indexed.between(seconds(0.1), seconds(0.4))[0].name == "open"
+        running = indexed.overlapping(seconds(0.1), seconds(0.4))
+        assert [s.name for s in running] == ["wait4", "open"]
+
+        self.check_windows(indexed, plain)
+
+    def test_windows_without_numpy(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(indexes, "numpy", None)
+        indexed = write_timed_trace(tmp_path, True)
+        plain = write_timed_trace(tmp_path, False)
+        self.check_windows(indexed, plain)
+
+        positions = indexed.time_index.window(seconds(0.0), seconds(0.0002))
+        assert isinstance(positions, memoryview)
+        assert list(positions) == [0, 1, 3]
+
+    def test_untimed_trace(self):
+        t = Trace.Trace(
+            get_test_data_path("openclose.strace"),
+            get_test_data_path("syscall_definitions.pickle"),
+            index=True,
+        )
+        assert t.time_index is None
+        assert t.between(0, 2**62) == []
+
+
+class TestPathIndex(object):
+    def test_lookups_match_scans(self):
+        strace_path = get_test_data_path("../testbins/shell.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        indexed = Trace.Trace(
+            strace_path, syscall_definitions, index=True, error_budget=100
+        )
+        plain = Trace.Trace(strace_path, syscall_definitions, error_budget=100)
+        assert plain.path_index is None
+
+        lookups = [
+            ("by_path", "/etc/ld.so.cache"),
+            ("by_path_prefix", "/usr/lib"),
+            ("by_path_prefix", "/"),
+            ("by_path_glob", "*.so*"),
+            ("by_path_glob", "/lib/x86_64-linux-gnu/lib?.so.*"),
+            ("by_path", "/not/a/path"),
+        ]
+        for method, argument in lookups:
+            assert [s.original_line for s in getattr(indexed, method)(argument)] == [
+                s.original_line for s in getattr(plain, method)(argument)
+            ]
+        assert len(indexed.by_path_glob("*.so*")) > 0
+
+    def test_path_index(self, tmp_path):
+        trace_path = os.path.join(str(tmp_path), "paths.strace")
+        with open(trace_path, "w") as fh:
+            fh.write(
+                '1 openat(AT_FDCWD, "/etc", O_RDONLY|O_DIRECTORY) = 3\n'
+                '1 open("/etcetera/x", O_RDONLY) = 4\n'
+                '1 rename("/etc/a", "/etc/a") = 0\n'
+                '1 connect(5, {sa_family=AF_LOCAL, sun_path="/etc/sock"}, 110) = 0\n'
+                '1 stat("/etc/a.conf", {st_mode=S_IFREG|0644, st_size=5, ...}) = 0\n'
+            )
+        t = Trace.Trace(
+            trace_path, get_test_data_path("syscall_definitions.pickle"), index=True
+        )
+        paths = t.path_index
+        assert isinstance(paths, indexes.PathIndex)
+        assert list(paths.exact("/etc/a")) == [2]
+        assert list(paths.exact("/etc/sock")) == [3]
+        assert list(paths.prefix("/etc")) == [0, 2, 3, 4]
+        assert list(paths.prefix("/etc/")) == [0, 2, 3, 4]
+        assert list(paths.prefix("/etcetera")) == [1]
+        assert list(paths.glob("/etc/a*")) == [2, 4]
+        assert list(paths.glob("/etc*/?")) == [1, 2]
+        assert list(paths.glob("*.txt")) == []
+
+    def test_unknown_syscall(self, tmp_path):
+        trace_path = os.path.join(str(tmp_path), "unknown.strace")
+        with open(trace_path, "w") as fh:
+            fh.write(
+                "1 syscall_332(0x3, 0x7ffd2a4c1e20, 0, 0xfff, 0x7ffd2a4c1e30) = 0\n"
+                '1 open("/etc/a", O_RDONLY) = 3\n'
+            )
+        t = Trace.Trace(
+            trace_path, get_test_data_path("syscall_definitions.pickle"), index=True
+        )
+        # the arguments of unknown system calls are not parsed.
+        assert t.syscalls[0].args is None
+        assert indexes.syscall_paths(t.syscalls[0]) == []
+        assert list(t.path_index.exact("/etc/a")) == [1]
+        assert [s.name for s in t.by_path_prefix("/etc")] == ["open"]
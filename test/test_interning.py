@@ -0,0 +1,113 @@
+from posix_omni_parser import Trace
+from posix_omni_parser import interning
+from posix_omni_parser import parsing_classes
+from posix_omni_parser.interning import FlagVocabulary
+from posix_omni_parser.interning import InternPool
+import os
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+def copy_string(string):
+    # build an equal string that is a different object.
+    return "".join(list(string))
+
+
+class TestInterning(object):
+    def test_pool(self):
+        pool = InternPool()
+        first = pool.intern(copy_string("O_RDONLY"))
+        second = pool.intern(copy_string("O_RDONLY"))
+        assert first == second == "O_RDONLY"
+        assert first is second
+        assert pool.intern(("O_RDONLY", "O_CLOEXEC")) == ("O_RDONLY", "O_CLOEXEC")
+        assert len(pool) == 2
+        assert "O_RDONLY" in pool
+
+    def test_trace_strings_are_shared(self):
+        strace_path = get_test_data_path("../testbins/shell.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        t = Trace.Trace(strace_path, syscall_definitions, error_budget=100)
+
+        opens = [s for s in t.syscalls if s.name == "openat" and s.args]
+        assert len(opens) > 1
+        assert all(s.name is opens[0].name for s in opens)
+
+        flags = [f for s in opens for f in s.args[2].value if f == "O_RDONLY"]
+        assert len(flags) > 1
+        assert all(f is flags[0] for f in flags)
+
+        errors = [s.ret[1] for s in t.syscalls if s.ret and s.ret[1] == "ENOENT"]
+        assert len(errors) > 1
+        assert all(e is errors[0] for e in errors)
+
+    def test_interning_does_not_change_the_trace(self):
+        strace_path = get_test_data_path("../testbins/shell.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        interned = Trace.Trace(strace_path, syscall_definitions, error_budget=100)
+        plain = Trace.Trace(
+            strace_path, syscall_definitions, error_budget=100, intern_strings=False
+        )
+
+        assert plain.parser.string_pool is None
+        assert len(interned.syscalls) == len(plain.syscalls)
+        for a, b in zip(interned.syscalls, plain.syscalls):
+            assert repr(a) == repr(b)
+
+
+class TestCompactFlags(object):
+    def test_vocabulary(self):
+        vocabulary = FlagVocabulary()
+        flags, mask = vocabulary.encode(["O_RDONLY", "O_CLOEXEC"])
+        assert flags == ("O_RDONLY", "O_CLOEXEC")
+        assert mask == 0b11
+        assert vocabulary.encode(["O_RDONLY", "O_CLOEXEC"])[0] is flags
+        assert vocabulary.encode(["O_CLOEXEC"]) == (("O_CLOEXEC",), 0b10)
+        assert vocabulary.decode(0b11) == ["O_RDONLY", "O_CLOEXEC"]
+        assert vocabulary.mask(["O_CLOEXEC", "O_CREAT"]) == 0b10
+        assert "O_CREAT" not in vocabulary.bits
+
+        assert list(vocabulary.matching([0b11, 0b10, 0b01], ["O_RDONLY"])) == [
+            True,
+            False,
+            True,
+        ]
+        assert list(vocabulary.matching([0b11, 0b10], ["O_CREAT"])) == [False, False]
+
+    def test_matching_without_numpy(self, monkeypatch):
+        vocabulary = FlagVocabulary()
+        masks = [vocabulary.encode(flags)[1] for flags in (["A", "B"], ["B"], [])]
+        monkeypatch.setattr(interning, "numpy", None)
+        assert vocabulary.matching(masks, ["B"]) == [True, True, False]
+        assert vocabulary.matching(masks, ["A", "B"]) == [True, False, False]
+
+    def test_compact_trace(self):
+        strace_path = get_test_data_path("../testbins/shell.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        compact = Trace.Trace(
+            strace_path, syscall_definitions, error_budget=100, compact_flags=True
+        )
+        plain = Trace.Trace(strace_path, syscall_definitions, error_budget=100)
+
+        # value and __str__ are unchanged.
+        for a, b in zip(compact.syscalls, plain.syscalls):
+            assert repr(a) == repr(b)
+
+        opens = [s for s in compact.syscalls if s.name == "openat" and s.args]
+        flags = [s.args[2] for s in opens]
+        assert all(isinstance(f, parsing_classes.Flags) for f in flags)
+        assert all(f.vocabulary is compact.parser.flag_vocabulary for f in flags)
+
+        cloexec = [f for f in flags if "O_CLOEXEC" in f]
+        assert len(cloexec) > 0
+        assert cloexec == [f for f in flags if "O_CLOEXEC" in f.value]
+        assert str(cloexec[0]).split("|") == cloexec[0].value
+
+        selected = compact.parser.flag_vocabulary.matching(
+            [f.mask for f in flags], ["O_CLOEXEC"]
+        )
+        assert [f for f, keep in zip(flags, selected) if keep] == cloexec
@@ -0,0 +1,149 @@
+from posix_omni_parser import Trace
+from posix_omni_parser import jsonl
+import io
+import json
+import os
+import pytest
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+LINES = [
+    '100 1614797952.000001 openat(AT_FDCWD, "/etc/passwd", O_RDONLY|O_CLOEXEC) = 3 <0.000010>',
+    "100 1614797952.000002 connect(4, {sa_family=AF_INET, sin_port=htons(80), "
+    + 'sin_addr=inet_addr("127.0.0.1")}, 16) = -1 ECONNREFUSED (Connection refused) <0.000020>',
+    "100 1614797952.000003 poll([{fd=3, events=POLLIN}], 1, 1000) = 1 ([{fd=3, revents=POLLIN}]) <0.000030>",
+    "100 1614797952.000004 read(3,  <unfinished ...>",
+    "101 1614797952.000005 brk(NULL) = 0x5563763d2000 <0.000040>",
+    '100 1614797952.000006 <... read resumed> "root", 4096) = 4 <0.000050>',
+    "100 1614797952.000007 recv(6, 0xb7199058, 4096, 0) = -1 EAGAIN (Resource temporarily unavailable) <0.000060>",
+    "100 1614797952.000008 exit_group(0) = ?",
+]
+
+
+def write_trace(directory):
+    trace_path = os.path.join(str(directory), "export.strace")
+    with open(trace_path, "w") as fh:
+        fh.write("\n".join(LINES) + "\n")
+    return trace_path
+
+
+def parse(trace_path):
+    return Trace.Trace(
+        trace_path, get_test_data_path("syscall_definitions.pickle")
+    ).syscalls
+
+
+class TestRecords(object):
+    def test_syscall_record(self, tmp_path):
+        syscalls = parse(write_trace(tmp_path))
+
+        assert jsonl.syscall_record(syscalls[0]) == {
+            "pid": 100,
+            "name": "openat",
+            "type": "complete",
+            "ret": 3,
+            "errno": None,
+            "timestamp": 1614797952000001000,
+            "elapsed_time": 0.00001,
+            "inst_pointer": None,
+            "args": [
+                {"type": "FileDescriptor", "value": "AT_FDCWD"},
+                {"type": "Filepath", "value": "/etc/passwd"},
+                {"type": "Flags", "value": ["O_RDONLY", "O_CLOEXEC"]},
+                {
+                    "type": "MissingValue",
+                    "expected": {"type": "mode_t", "name": "mode"},
+                    "given": None,
+                },
+            ],
+        }
+
+        connect = jsonl.syscall_record(syscalls[1])
+        assert connect["ret"] == -1
+        assert connect["errno"] == "ECONNREFUSED"
+        assert connect["args"][1] == {
+            "type": "Sockaddr",
+            "family": 2,
+            "port": 80,
+            "address": "127.0.0.1",
+            "path": None,
+        }
+
+        poll = jsonl.syscall_record(syscalls[2])
+        assert poll["args"][0] == {
+            "type": "PollFDPointer",
+            "value": [{"fd": 3, "events": "POLLIN", "revents": "POLLIN"}],
+        }
+
+        unfinished = jsonl.syscall_record(syscalls[3])
+        assert unfinished["type"] == "unfinished"
+        assert unfinished["ret"] is None
+        assert jsonl.syscall_record(syscalls[5])["type"] == "resumed"
+        assert jsonl.syscall_record(syscalls[4])["ret"] == "0x5563763d2000"
+
+        # arguments without a specific parsing class are kept as printed.
+        assert jsonl.syscall_record(syscalls[6])["args"][1] == {
+            "type": "UnimplementedType",
+            "value": "0xb7199058",
+        }
+
+    def test_stat(self):
+        stat = parse(get_test_data_path("fstat.strace"))[0].args[1]
+        record = jsonl.arg_record(stat)
+        assert record["type"] == "Stat"
+        assert record["abbreviated"] is False
+        assert record["fields"]["st_dev"] == "makedev(0, 4)"
+        assert record["fields"]["st_mode"] == "S_IFREG|0444"
+
+
+class TestJsonLinesWriter(object):
+    def test_backends_agree(self, tmp_path):
+        trace_path = write_trace(tmp_path)
+        syscalls = parse(trace_path)
+        expected = [jsonl.syscall_record(syscall) for syscall in syscalls]
+
+        backends = ["json"]
+        if jsonl.orjson is not None:
+            backends.append("orjson")
+        for backend in backends:
+            output_path = os.path.join(str(tmp_path), backend + ".jsonl")
+            count = jsonl.export_trace(
+                trace_path,
+                get_test_data_path("syscall_definitions.pickle"),
+                output_path,
+                buffer_size=100,
+                backend=backend,
+            )
+            assert count == len(LINES)
+            with open(output_path, "rb") as fh:
+                lines = fh.read().split(b"\n")
+            assert lines[-1] == b""
+            assert [json.loads(line.decode("utf-8")) for line in lines[:-1]] == expected
+
+    def test_file_object(self, tmp_path):
+        syscalls = parse(write_trace(tmp_path))
+        output = io.BytesIO()
+        writer = jsonl.JsonLinesWriter(output, backend="json")
+        for syscall in syscalls:
+            writer.add(syscall)
+        # nothing is written before the buffer fills up.
+        assert output.getvalue() == b""
+        writer.close()
+        assert not output.closed
+        assert output.getvalue().count(b"\n") == len(syscalls)
+
+    def test_large_integers(self, tmp_path):
+        syscalls = parse(write_trace(tmp_path))
+        syscalls[1].args[0].value = 2**64 - 1
+        encode = jsonl.get_encoder()
+        record = json.loads(encode(jsonl.syscall_record(syscalls[1])).decode("utf-8"))
+        assert record["args"][0]["value"] == 2**64 - 1
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            jsonl.get_encoder("yaml")
@@ -0,0 +1,99 @@
+from posix_omni_parser.parsers.StraceParser import StraceParser
+import itertools
+import os
+import pytest
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+# (pid, rest of line, whether strace -T appends an elapsed time to the line)
+TRACE_LINES = [
+    ("8215", 'execve("/bin/ls", ["ls"], [/* 51 vars */]) = 0', True),
+    ("8215", 'open("syscalls.txt", O_RDONLY|O_CREAT, 0664) = 3', True),
+    (
+        "8215",
+        'access("/etc/ld.so.nohwcap", F_OK) = -1 ENOENT (No such file or directory)',
+        True,
+    ),
+    ("8215", "fcntl64(4, F_GETFL) = 0x402 (flags O_RDWR|O_APPEND)", True),
+    ("8215", "wait4(8216,  <unfinished ...>", False),
+    ("8216", "exit_group(0) = ?", False),
+    ("8216", "+++ exited with 0 +++", False),
+    ("8215", "<... wait4 resumed> NULL, 0, NULL) = 8216", True),
+    ("8215", "--- SIGCHLD {si_signo=SIGCHLD, si_code=CLD_EXITED} ---", False),
+]
+
+TIMESTAMPS = {
+    None: None,
+    "t": "15:31:56",
+    "tt": "15:32:16.190216",
+    "ttt": "1614797952.046825",
+    "r": "0.000539",
+}
+
+
+def write_trace(directory, timestamp, inst_pointer, elapsed_time):
+    lines = []
+    for pid, rest, returns in TRACE_LINES:
+        front = [pid]
+        if timestamp:
+            front.append(TIMESTAMPS[timestamp])
+        if inst_pointer:
+            front.append("[b7739424]")
+        line = "  ".join(front) + " " + rest
+        if elapsed_time and returns:
+            line += " <0.000037>"
+        lines.append(line)
+
+    trace_path = os.path.join(str(directory), "options.strace")
+    with open(trace_path, "w") as fh:
+        fh.write("\n".join(lines) + "\n")
+    return trace_path, lines
+
+
+@pytest.mark.parametrize(
+    "timestamp,inst_pointer,elapsed_time",
+    list(itertools.product(sorted(TIMESTAMPS, key=str), [False, True], [False, True])),
+)
+def test_line_parser_matches_parse_line(
+    tmp_path, timestamp, inst_pointer, elapsed_time
+):
+    trace_path, lines = write_trace(tmp_path, timestamp, inst_pointer, elapsed_time)
+    syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+
+    # each parser keeps its own unfinished syscalls, so use one per path.
+    generic = StraceParser(trace_path, syscall_definitions)
+    specialized = StraceParser(trace_path, syscall_definitions)
+
+    assert generic.trace_options["fork"]
+    assert generic.trace_options["timestamp"] == timestamp
+    assert generic.trace_options["inst_pointer"] == inst_pointer
+    assert generic.trace_options["elapsed_time"] == elapsed_time
+
+    for line in lines:
+        assert specialized._line_parser(line) == generic._parse_line(line)
+
+    assert generic.unfinished_syscalls == specialized.unfinished_syscalls == []
+
+
+def test_line_parser_fields(tmp_path):
+    trace_path, lines = write_trace(tmp_path, "tt", True, True)
+    parser = StraceParser(trace_path, get_test_data_path("syscall_definitions.pickle"))
+
+    line_parts = parser._line_parser(lines[2])
+    assert line_parts["pid"] == 8215
+    assert line_parts["timestamp"] == (15 * 3600 + 32 * 60 + 16) * 10**9 + 190216000
+    assert line_parts["inst_pointer"] == "b7739424"
+    assert line_parts["name"] == "access"
+    assert line_parts["return"] == (-1, "ENOENT")
+    assert line_parts["elapsed_time"] == 0.000037
+
+    # signal and exit lines are not system calls.
+    assert parser._line_parser(lines[6]) is None
+    assert parser._line_parser(lines[8]) is None
+
+    assert len(parser.parse_trace()) == 7
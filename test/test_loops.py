@@ -0,0 +1,111 @@
+from posix_omni_parser import Trace
+from posix_omni_parser import diffing
+from posix_omni_parser import loops
+import os
+import pickle
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+def parse(directory, lines):
+    trace_path = os.path.join(str(directory), "loop.strace")
+    with open(trace_path, "w") as fh:
+        fh.write("\n".join(lines) + "\n")
+    return Trace.Trace(trace_path, get_test_data_path("syscall_definitions.pickle"))
+
+
+def event_loop(pid, iterations):
+    lines = []
+    for iteration in range(iterations):
+        ready = 1 if iteration % 10 else 0
+        lines.append(
+            str(pid)
+            + " poll([{fd=3, events=POLLIN}], 1, 1000) = "
+            + str(ready)
+            + " ([{fd=3, revents=POLLIN}])"
+        )
+        lines.append(str(pid) + ' read(3, "ping", 4096) = 4')
+        lines.append(str(pid) + ' write(4, "pong", 4) = 4')
+    return lines
+
+
+class TestCompress(object):
+    def test_event_loop(self, tmp_path):
+        lines = (
+            ['100 openat(AT_FDCWD, "/etc/passwd", O_RDONLY) = 3']
+            + event_loop(100, 100)
+            + ["100 close(3) = 0", "100 exit_group(0) = ?"]
+        )
+        trace = parse(tmp_path, lines)
+        sequences = loops.compress(trace.syscalls)
+
+        assert len(sequences) == 1
+        sequence = sequences[0]
+        assert sequence.pid == 100
+        assert sequence.length == len(trace.syscalls)
+        kinds = [type(item) for item in sequence.items]
+        assert kinds == [loops.Literal, loops.Repetition, loops.Literal]
+
+        repetition = sequence.items[1]
+        assert repetition.start == 1
+        assert repetition.count == 100
+        assert sequence.names(repetition.block) == ["poll", "read", "write"]
+        # the iterations where poll returned 0 differ from the others.
+        assert len(repetition.variants) == 2
+        assert len(repetition.runs) == 2 * 20
+        assert sequence.items[2].start == 301
+        assert sequence.items[2].length == 2
+
+    def test_lossless(self, tmp_path):
+        lines = []
+        for pid in (100, 101):
+            lines.extend(event_loop(pid, 7))
+            lines.append(str(pid) + ' write(1, "done", 4) = 4')
+            lines.extend(event_loop(pid, 2))
+        trace = parse(tmp_path, lines)
+
+        signer = diffing.Signer()
+        sequences = loops.compress(trace.syscalls, signer)
+        reference = diffing.Signer()
+        for sequence in sequences:
+            syscalls = [trace.syscalls[p] for p in sequence.positions]
+            assert all(syscall.pid == sequence.pid for syscall in syscalls)
+            signatures = [reference.sign(syscall) for syscall in syscalls]
+            assert list(sequence.signatures()) == signatures
+
+    def test_unknown_syscall(self, tmp_path):
+        lines = []
+        for iteration in range(5):
+            lines.append("100 syscall_332(0x3, 0x7ffd2a4c1e20, 0) = 0")
+            lines.append('100 read(3, "ping", 4096) = 4')
+        trace = parse(tmp_path, lines)
+        sequence = loops.compress(trace.syscalls)[0]
+        assert len(sequence.items) == 1
+        assert sequence.items[0].count == 5
+
+    def test_period_choice(self, tmp_path):
+        # a run of the same call is taken as a block of one call repeated.
+        lines = ['100 write(1, "x", 1) = 1'] * 12
+        sequence = loops.compress(parse(tmp_path, lines).syscalls)[0]
+        assert len(sequence.items) == 1
+        assert sequence.items[0].block == (0,)
+        assert sequence.items[0].count == 12
+        assert sequence.items[0].variants == [(0,)]
+
+        sequence = loops.compress(parse(tmp_path, lines[:2]).syscalls, min_repeats=3)[0]
+        assert [type(item) for item in sequence.items] == [loops.Literal]
+
+    def test_pickle(self, tmp_path):
+        trace = parse(tmp_path, event_loop(100, 30))
+        sequence = loops.compress(trace.syscalls, keep_positions=False)[0]
+        assert sequence.positions is None
+
+        restored = pickle.loads(pickle.dumps(sequence))
+        assert list(restored.signatures()) == list(sequence.signatures())
+        repetition = restored.items[0]
+        repetition.add_iteration(repetition.variants[0])
+        assert len(repetition.variants) == 2
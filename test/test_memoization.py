@@ -0,0 +1,99 @@
+from posix_omni_parser import memoization
+from posix_omni_parser import parsing_classes
+import threading
+import pytest
+
+
+class TestLRUCache(object):
+    def test_eviction(self):
+        cache = memoization.LRUCache(2)
+        cache.store("a", 1)
+        cache.store("b", 2)
+        assert cache.lookup("a") == (True, 1)
+
+        # b is now the least recently used entry.
+        cache.store("c", 3)
+        assert cache.lookup("b") == (False, None)
+        assert cache.lookup("c") == (True, 3)
+        assert len(cache) == 2
+
+        info = cache.info()
+        assert (info.hits, info.misses, info.size, info.maxsize) == (2, 1, 2, 2)
+
+    def test_memoize(self):
+        calls = []
+
+        @memoization.memoize("test_memoize", maxsize=8, copy=list)
+        def split(string):
+            calls.append(string)
+            if not string:
+                raise ValueError("empty")
+            return string.split("|")
+
+        first = split("A|B")
+        first.append("C")
+        assert split("A|B") == ["A", "B"]
+        assert calls == ["A|B"]
+
+        # errors are not cached.
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                split("")
+        assert calls == ["A|B", "", ""]
+
+        info = memoization.cache_info()["test_memoize"]
+        assert info.hits == 1
+        assert info.misses == 3
+
+    def test_threads(self):
+        cache = memoization.LRUCache(64)
+
+        def work(start):
+            for i in range(2000):
+                key = (start + i) % 100
+                found, value = cache.lookup(key)
+                if found:
+                    assert value == key * 2
+                else:
+                    cache.store(key, key * 2)
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        info = cache.info()
+        assert info.hits + info.misses == 8 * 2000
+        assert info.size == 64
+
+
+class TestDecoders(object):
+    def test_decoders_are_memoized(self):
+        memoization.clear_caches()
+        for _ in range(3):
+            assert parsing_classes._string_to_flags("O_RDONLY|O_CLOEXEC") == [
+                "O_RDONLY",
+                "O_CLOEXEC",
+            ]
+            assert parsing_classes.SockPort("sin_port=htons(25588)").value == 25588
+            assert (
+                parsing_classes.SockIP('sin_addr=inet_addr("127.0.0.1")').value
+                == "127.0.0.1"
+            )
+
+        info = memoization.cache_info()
+        for name in ("string_to_flags", "sock_port", "sock_ip"):
+            assert info[name].misses == 1
+            assert info[name].hits == 2
+
+    def test_flags_do_not_share_cached_lists(self):
+        first = parsing_classes.Flags(["O_RDONLY|O_CLOEXEC"])
+        first.value.append("O_CREAT")
+        second = parsing_classes.Flags(["O_RDONLY|O_CLOEXEC"])
+        assert second.value == ["O_RDONLY", "O_CLOEXEC"]
+
+    def test_invalid_ip(self):
+        for _ in range(2):
+            with pytest.raises(Exception):
+                parsing_classes.SockIP('sin_addr=inet_addr("1.2.3.4.5")')
@@ -0,0 +1,154 @@
+from posix_omni_parser import offsets
+from posix_omni_parser.parsers.StraceParser import StraceParser
+import datetime
+import os
+import pytest
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+def summary(syscalls):
+    return [(s.pid, s.name, s.type, s.timestamp, s.ret, str(s.args)) for s in syscalls]
+
+
+def write_trace(directory, lines):
+    trace_path = os.path.join(str(directory), "trace.strace")
+    with open(trace_path, "w") as fh:
+        fh.write("\n".join(lines) + "\n")
+    return trace_path
+
+
+# -r timestamps, with unfinished calls spanning several offsets and exit lines
+# in between.
+RELATIVE = [
+    "100 0.000000 brk(NULL) = 0x5563763d2000",
+    "100 0.000100 wait4(101,  <unfinished ...>",
+    '101 0.000200 write(1, "a", 1) = 1',
+    "102 0.000010 read(0,  <unfinished ...>",
+    '101 0.000300 write(1, "b", 1) = 1',
+    "",
+    "# a comment",
+    '101 0.000400 write(1, "c", 1) = 1',
+    "101 0.000500 exit_group(0) = ?",
+    "101 0.000600 +++ exited with 0 +++",
+    "100 0.000700 <... wait4 resumed> NULL, 0, NULL) = 101",
+    '102 0.000800 <... read resumed> "x", 1) = 1',
+    "100 0.000900 exit_group(0) = ?",
+]
+
+
+def line_start(number):
+    return sum(len(line) + 1 for line in RELATIVE[:number])
+
+
+class TestIndexedTrace(object):
+    def parse(self, trace_path):
+        parser = StraceParser(
+            trace_path, get_test_data_path("syscall_definitions.pickle")
+        )
+        return summary(parser.parse_trace())
+
+    def test_random_access(self, tmp_path):
+        trace_path = write_trace(tmp_path, RELATIVE)
+        expected = self.parse(trace_path)
+
+        for interval in (1, 2, 3, 100):
+            index_path = trace_path + "." + str(interval)
+            trace = offsets.IndexedTrace(
+                trace_path,
+                get_test_data_path("syscall_definitions.pickle"),
+                index_path,
+                interval,
+            )
+            assert len(trace) == len(expected)
+            for position in range(len(expected)):
+                assert summary([trace[position]]) == [expected[position]]
+            for start in range(len(expected)):
+                for stop in range(start, len(expected) + 1):
+                    assert summary(trace.read(start, stop)) == expected[start:stop]
+            assert summary(trace[-3:]) == expected[-3:]
+            assert summary(trace[::4]) == expected[::4]
+            assert summary(trace) == expected
+
+    def test_sample_traces(self, tmp_path):
+        for name in ("unfinished.strace", "signals.strace", "socket.strace"):
+            trace_path = get_test_data_path(name)
+            expected = self.parse(trace_path)
+            trace = offsets.IndexedTrace(
+                trace_path,
+                get_test_data_path("syscall_definitions.pickle"),
+                os.path.join(str(tmp_path), name + ".offsets"),
+                interval=2,
+            )
+            assert summary(trace[:]) == expected
+            assert (
+                summary(trace[len(expected) // 2 :]) == expected[len(expected) // 2 :]
+            )
+
+    def test_out_of_range(self, tmp_path):
+        trace_path = write_trace(tmp_path, RELATIVE)
+        trace = offsets.IndexedTrace(
+            trace_path, get_test_data_path("syscall_definitions.pickle")
+        )
+        with pytest.raises(IndexError):
+            trace[len(trace)]
+        with pytest.raises(IndexError):
+            list(trace.read(len(trace) + 1))
+        assert list(trace.read(3, 3)) == []
+
+    def test_sidecar(self, tmp_path):
+        trace_path = write_trace(tmp_path, RELATIVE)
+        pickle_file = get_test_data_path("syscall_definitions.pickle")
+        trace = offsets.IndexedTrace(trace_path, pickle_file, interval=4)
+        assert os.path.exists(trace_path + ".offsets")
+        # position 8 is on line 11, after the comment and the exit line.
+        starts = [0, line_start(4), line_start(11)]
+        assert list(trace.offset_index.offsets) == starts
+        assert trace.offset_index.unfinished[0] == ()
+        assert trace.offset_index.unfinished[1] == (line_start(1), line_start(3))
+        assert trace.offset_index.unfinished[2] == (line_start(3),)
+
+        # the saved index is reused.
+        saved = os.path.getmtime(trace_path + ".offsets")
+        again = offsets.IndexedTrace(trace_path, pickle_file, interval=4)
+        assert os.path.getmtime(trace_path + ".offsets") == saved
+        assert list(again.offset_index.offsets) == starts
+
+        # and rebuilt when the trace or the interval change.
+        again = offsets.IndexedTrace(trace_path, pickle_file, interval=5)
+        assert len(again.offset_index.offsets) == 2
+        write_trace(tmp_path, RELATIVE[:3])
+        again = offsets.IndexedTrace(trace_path, pickle_file, interval=5)
+        assert len(again) == 3
+
+    def test_trace_date(self, tmp_path):
+        lines = [
+            "100 15:32:16.190000 brk(NULL) = 0x5563763d2000",
+            "100 15:32:16.190100 wait4(101,  <unfinished ...>",
+            '101 15:32:16.190200 write(1, "a", 1) = 1',
+            '101 15:32:16.190300 write(1, "b", 1) = 1',
+            "100 15:32:16.190400 <... wait4 resumed> NULL, 0, NULL) = 101",
+        ]
+        trace_path = write_trace(tmp_path, lines)
+        pickle_file = get_test_data_path("syscall_definitions.pickle")
+
+        offsets.IndexedTrace(
+            trace_path, pickle_file, interval=2, trace_date=datetime.date(2020, 1, 1)
+        )
+
+        # the clocks of the saved index are anchored to another day, so it is
+        # rebuilt.
+        trace_date = datetime.date(2021, 1, 1)
+        trace = offsets.IndexedTrace(
+            trace_path, pickle_file, interval=2, trace_date=trace_date
+        )
+        assert trace.offset_index.trace_date == trace_date
+        expected = StraceParser(
+            trace_path, pickle_file, trace_date=trace_date
+        ).parse_trace()
+        assert [s.timestamp for s in trace] == [s.timestamp for s in expected]
+        assert trace[3].timestamp == expected[3].timestamp
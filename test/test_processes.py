@@ -0,0 +1,99 @@
+from posix_omni_parser import Trace
+from posix_omni_parser import processes
+import os
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+TREE_LINES = [
+    '10 execve("/bin/sh", ["sh"], 0x7ffc /* 3 vars */) = 0',
+    "10 clone(child_stack=NULL, flags=SIGCHLD,  <unfinished ...>",
+    # the child runs before the clone of its parent returns.
+    '11 execve("/bin/server", ["server"], 0x7ffc /* 3 vars */) = 0',
+    "10 <... clone resumed> child_tidptr=0x7f) = 11",
+    "11 clone(child_stack=0x7f, flags=CLONE_VM|CLONE_FILES|CLONE_THREAD) = 12",
+    "12 clone(child_stack=0x7f, flags=CLONE_VM|CLONE_THREAD|CLONE_SIGHAND) = 13",
+    "11 vfork() = 14",
+    "14 exit(3) = ?",
+    "14 +++ exited with 3 +++",
+    "12 exit_group(0) = ?",
+    "13 +++ exited with 0 +++",
+    "12 +++ exited with 0 +++",
+    "11 +++ exited with 0 +++",
+    "10 wait4(-1, NULL, 0, NULL) = 11",
+    "10 fork() = 15",
+    "15 +++ killed by SIGKILL (core dumped) +++",
+]
+
+
+def write_trace(directory):
+    trace_path = os.path.join(str(directory), "tree.strace")
+    with open(trace_path, "w") as fh:
+        fh.write("\n".join(TREE_LINES) + "\n")
+    return Trace.Trace(
+        trace_path,
+        get_test_data_path("syscall_definitions.pickle"),
+        track_processes=True,
+    )
+
+
+class TestProcessTree(object):
+    def test_tree(self, tmp_path):
+        tree = write_trace(tmp_path).processes
+        assert isinstance(tree, processes.ProcessTree)
+
+        assert [p.pid for p in tree.roots] == [10]
+        assert [p.pid for p in tree.walk(10)] == [10, 11, 12, 13, 14, 15]
+        assert [p.pid for p in tree.walk(11)] == [11, 12, 13, 14]
+        assert tree[11].parent is tree[10]
+        assert tree.get(99) is None and 99 not in tree
+
+        assert tree[10].image == "/bin/sh"
+        assert tree[11].image == "/bin/server"
+        # children inherit the image of their parent until they exec.
+        assert tree[14].image == "/bin/server"
+        assert tree[15].image == "/bin/sh"
+
+    def test_threads(self, tmp_path):
+        tree = write_trace(tmp_path).processes
+
+        assert not tree[11].is_thread
+        assert tree[12].is_thread and tree[13].is_thread
+        assert tree[13].leader is tree[11]
+        assert tree[11].threads == [tree[12], tree[13]]
+        assert tree[13].parent is tree[12]
+        assert not tree[14].is_thread
+
+    def test_exits(self, tmp_path):
+        tree = write_trace(tmp_path).processes
+
+        # exit_group of any thread ends the whole thread group.
+        for pid in (11, 12, 13):
+            assert tree[pid].status == ("exited", 0)
+            assert tree[pid].end == 8
+        assert tree[14].status == ("exited", 3)
+        assert tree[14].end == 7
+        assert tree[15].status == ("killed", "SIGKILL")
+        assert tree[15].end == tree.count
+        assert tree[10].end is None and tree[10].status is None
+
+    def test_real_trace(self):
+        t = Trace.Trace(
+            get_test_data_path("../testbins/shell.strace"),
+            get_test_data_path("syscall_definitions.pickle"),
+            track_processes=True,
+            error_budget=100,
+        )
+        tree = t.processes
+        root = tree.roots[0]
+        assert len(tree.roots) == 1
+        assert len(root.children) == len(tree.processes) - 1
+        assert tree[27475].image == "/bin/pwd"
+        assert tree[27475].status == ("exited", 0)
+        # a failed execve keeps the image of the parent.
+        assert tree[27476].image == root.image == "./shell"
+        assert tree[27476].status == ("exited", 1)
@@ -0,0 +1,98 @@
+from posix_omni_parser import Trace
+from posix_omni_parser import query
+import os
+import pytest
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+EXPRESSIONS = [
+    'name in {openat, open} and ret.err == ENOENT and arg.path startswith "/usr"',
+    "name == openat and arg[2] contains O_CLOEXEC",
+    "ret < 0",
+    "not (name == close) and pid == 27468",
+    'arg.path glob "*.so*" or name == execve',
+    "ret.err == None and name == read and arg[2] >= 832",
+    'arg.path matches "^/lib/.*libc"',
+    "name in {} or pid in {1, 2}",
+]
+
+
+class TestQuery(object):
+    def test_indexed_matches_scan(self):
+        strace_path = get_test_data_path("../testbins/shell.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        indexed = Trace.Trace(
+            strace_path, syscall_definitions, index=True, error_budget=100
+        )
+        plain = Trace.Trace(strace_path, syscall_definitions, error_budget=100)
+
+        for expression in EXPRESSIONS:
+            compiled = query.compile_query(expression)
+            expected = [s for s in plain.syscalls if compiled(s)]
+            assert [s.original_line for s in indexed.query(expression)] == [
+                s.original_line for s in expected
+            ]
+            assert [s.original_line for s in plain.query(expression)] == [
+                s.original_line for s in expected
+            ]
+
+        assert len(indexed.query("ret < 0")) > 0
+        enoent = indexed.query("ret.err == ENOENT and not name == execve")
+        assert len(enoent) > 0
+        assert all(s.ret[1] == "ENOENT" for s in enoent)
+
+    def test_timestamps(self, tmp_path):
+        trace_path = os.path.join(str(tmp_path), "timed.strace")
+        with open(trace_path, "w") as fh:
+            fh.write(
+                '1 1614797952.000000 open("a", O_RDONLY) = 3\n'
+                "1 1614797952.000100 close(3) = 0\n"
+                '1 1614797952.000200 open("b", O_RDONLY) = -1 ENOENT (No such file)\n'
+            )
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        indexed = Trace.Trace(trace_path, syscall_definitions, index=True)
+        plain = Trace.Trace(trace_path, syscall_definitions)
+
+        expression = "timestamp >= 1614797952000100000 and name == open"
+        assert [s.ret for s in indexed.query(expression)] == [(-1, "ENOENT")]
+        assert [s.ret for s in plain.query(expression)] == [(-1, "ENOENT")]
+        assert len(indexed.query("timestamp < 1614797952000100000")) == 1
+
+    def test_predicate(self):
+        trace = Trace.Trace(
+            get_test_data_path("openclose.strace"),
+            get_test_data_path("syscall_definitions.pickle"),
+        )
+        opened = trace.syscalls[0]
+        assert query.compile_query('name == open and arg[0] == "test.txt"')(opened)
+        assert query.compile_query("arg.path == test.txt and ret == 3")(opened)
+        assert not query.compile_query("not name == open")(opened)
+        assert query.compile_query("arg[7] == None")(opened)
+        assert query.compile_query("name == open") is query.compile_query(
+            "name == open"
+        )
+
+    def test_unknown_syscall(self, tmp_path):
+        trace_path = os.path.join(str(tmp_path), "unknown.strace")
+        with open(trace_path, "w") as fh:
+            fh.write(
+                "1 syscall_332(0x1, 0x7ffd2a4c1e20, 0) = 0\n"
+                '1 open("a", O_RDONLY) = 1\n'
+            )
+        t = Trace.Trace(trace_path, get_test_data_path("syscall_definitions.pickle"))
+        assert [s.name for s in t.query("arg[0] == None")] == ["syscall_332"]
+        assert [s.name for s in t.query('arg[0] == "a"')] == ["open"]
+        assert t.query("arg.path == a and name == syscall_332") == []
+
+    @pytest.mark.parametrize(
+        "expression",
+        ["name ==", "name = open", "size == 1", "name in {open", "(name == open", ""],
+    )
+    def test_errors(self, expression):
+        with pytest.raises(query.QueryError):
+            query.compile_query(expression)
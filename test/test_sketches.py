@@ -0,0 +1,97 @@
+from posix_omni_parser import sketches
+from posix_omni_parser.parsers.StraceParser import StraceParser
+import os
+import pickle
+import random
+import pytest
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+def latencies(count, seed):
+    generator = random.Random(seed)
+    return [generator.lognormvariate(-9, 2) for _ in range(count)]
+
+
+class TestLogHistogram(object):
+    def test_error_bound(self):
+        values = latencies(20000, 1) + [0.0] * 50
+        sketch = sketches.LogHistogram(relative_error=0.01)
+        for value in values:
+            sketch.add(value)
+
+        values.sort()
+        for q in (0, 0.001, 0.01, 0.1, 0.5, 0.9, 0.99, 0.999, 1):
+            exact = values[int(q * (len(values) - 1))]
+            assert abs(sketch.quantile(q) - exact) <= 0.01 * exact
+        assert sketch.quantile(0) == 0.0
+        assert sketch.quantile(1) == values[-1]
+        assert len(sketch.buckets) < 2048
+
+        with pytest.raises(ValueError):
+            sketch.quantile(1.5)
+        assert sketches.LogHistogram().quantile(0.5) is None
+
+    def test_merge(self):
+        parts = [latencies(5000, seed) for seed in range(4)]
+        whole = sketches.LogHistogram()
+        merged = sketches.LogHistogram()
+        for values in parts:
+            part = sketches.LogHistogram()
+            for value in values:
+                whole.add(value)
+                part.add(value)
+            # partial sketches travel between workers pickled.
+            merged.merge(pickle.loads(pickle.dumps(part)))
+
+        assert merged.buckets == whole.buckets
+        assert merged.count == whole.count == 20000
+        assert merged.minimum == whole.minimum
+        assert merged.quantile(0.99) == whole.quantile(0.99)
+
+        with pytest.raises(ValueError):
+            merged.merge(sketches.LogHistogram(relative_error=0.05))
+
+    def test_collapse(self):
+        sketch = sketches.LogHistogram(relative_error=0.01, max_buckets=10)
+        values = [10.0**exponent for exponent in range(-9, 3)]
+        for value in values:
+            sketch.add(value)
+        assert len(sketch.buckets) == 10
+        # the highest quantiles are still within the error bound.
+        assert abs(sketch.quantile(1) - 100.0) <= 1.0
+        assert abs(sketch.quantile(0.95) - 10.0) <= 0.1
+
+
+class TestLatencySketches(object):
+    def test_sink(self, tmp_path):
+        trace_path = os.path.join(str(tmp_path), "timed.strace")
+        with open(trace_path, "w") as fh:
+            for index in range(100):
+                fh.write(
+                    '1 read(3, "x", 1) = 1 <0.%06d>\n' % (index + 1)
+                    + "2 close(3) = 0 <0.000002>\n"
+                )
+            fh.write("2 exit_group(0) = ?\n")
+
+        by_name = sketches.LatencySketches()
+        by_pid = sketches.LatencySketches(key="pid")
+        parser = StraceParser(
+            trace_path, get_test_data_path("syscall_definitions.pickle")
+        )
+        parser.parse_trace(sinks=[by_name, by_pid])
+
+        p50, p99 = by_name.quantiles("read", (0.5, 0.99))
+        assert abs(p50 - 0.00005) <= 0.01 * 0.00005
+        assert abs(p99 - 0.000099) <= 0.01 * 0.000099
+        assert by_name.sketches["close"].count == 100
+        assert by_name.quantiles("exit_group") is None
+        assert by_pid.sketches[2].count == 100
+        assert by_name.merge(by_name).sketches["read"].count == 200
+
+        with pytest.raises(ValueError):
+            sketches.LatencySketches(key="errno")
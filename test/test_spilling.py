@@ -0,0 +1,75 @@
+from posix_omni_parser.parsers.StraceParser import StraceParser
+from posix_omni_parser import parsing_classes
+from posix_omni_parser import spilling
+import os
+import pickle
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+def write_trace(directory, lines):
+    trace_path = os.path.join(str(directory), "spill.strace")
+    with open(trace_path, "w") as fh:
+        fh.write("\n".join(lines) + "\n")
+    return trace_path
+
+
+BUFFER = '"' + "x" * 5000 + '\\n"'
+
+SPILL_TRACE = [
+    "35388 close(3) = 0",
+    "35388 write(1, " + BUFFER + ", 5001) = 5001",
+    '35388 read(3, "abc", 3) = 3',
+]
+
+
+class TestSpilling(object):
+    def test_large_arguments_are_spilled(self, tmp_path):
+        trace_path = write_trace(tmp_path, SPILL_TRACE)
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        parser = StraceParser(trace_path, syscall_definitions, spill_threshold=100)
+        close_call, write_call, read_call = parser.parse_trace()
+
+        buffer_arg = write_call.args[1]
+        assert isinstance(buffer_arg._span, spilling.FileSpan)
+        assert buffer_arg._value is None
+        assert buffer_arg.value == BUFFER
+        assert write_call.original_line == SPILL_TRACE[1]
+
+        # short lines and arguments stay in memory.
+        assert read_call._original_line == SPILL_TRACE[2]
+        assert read_call.args[1]._span is None
+
+        # spilled system calls can be pickled, e.g. in checkpoints.
+        restored = pickle.loads(pickle.dumps(write_call))
+        assert restored.args[1].value == BUFFER
+        assert restored.original_line == SPILL_TRACE[1]
+
+    def test_spilled_trace_matches(self):
+        strace_path = get_test_data_path("../testbins/shell.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        plain = StraceParser(strace_path, syscall_definitions, error_budget=100)
+        spilled = StraceParser(
+            strace_path, syscall_definitions, error_budget=100, spill_threshold=64
+        )
+
+        plain_syscalls = plain.parse_trace()
+        spilled_syscalls = spilled.parse_trace()
+        assert len(plain_syscalls) == len(spilled_syscalls)
+
+        for a, b in zip(plain_syscalls, spilled_syscalls):
+            assert a.original_line == b.original_line
+            assert repr(a.args) == repr(b.args)
+
+        environment = [s for s in spilled_syscalls if s.name == "execve"][0].args[2]
+        assert isinstance(environment, parsing_classes.Environment)
+        assert environment._items is None
+        assert environment["HOME"] == "/root"
+
+        assert any(
+            isinstance(s._original_line, spilling.FileSpan) for s in spilled_syscalls
+        )
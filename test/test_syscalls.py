@@ -88,6 +88,54 @@ class TestFstat(object):
         assert statfs_call.args[1].value == "0x7ffffab26f40"
         assert statfs_call.ret == (-1, "ENOENT")
 
+    def test_stat_fields(self):
+        strace_path = get_test_data_path("fstat.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        t = Trace.Trace(strace_path, syscall_definitions)
+        stat_struct = t.syscalls[1].args[1]
+        assert stat_struct.st_dev == parsing_classes.Device(0, 0x16)
+        assert stat_struct.st_dev.minor == 0x16
+        assert stat_struct.st_mode == 0o40555
+        assert stat_struct.st_ino == 153104
+        assert stat_struct.st_size == 0
+        assert stat_struct.st_atime == 1614801193
+        assert stat_struct.st_atime_nsec == 698178629
+        assert stat_struct.st_rdev is None
+
+        # decoded fields are cached.
+        assert "st_ino" in vars(stat_struct)
+
+    def test_stat_layouts(self):
+        abbreviated = parsing_classes.Stat(
+            ["{st_mode=S_IFREG|0644", "st_size=98710", "...}"]
+        )
+        assert abbreviated.st_mode == 0o100644
+        assert abbreviated.st_size == 98710
+        assert abbreviated.st_ino is None
+        assert str(abbreviated) == "{st_mode=S_IFREG|0644, st_size=98710, ...}"
+
+        device = parsing_classes.Stat(
+            [
+                "{st_dev=makedev(0",
+                "0x17)",
+                "st_mode=S_IFCHR|0620",
+                "st_rdev=makedev(0x88",
+                "0x9)",
+                "st_size=0}",
+            ]
+        )
+        assert device.value[2] == "st_rdev=makedev(0x88, 0x9)"
+        assert device.st_rdev == (0x88, 9)
+        assert device.st_mode == 0o20620
+
+        device[2] = "st_rdev=makedev(0x88, 0xa)"
+        assert device.st_rdev == (0x88, 10)
+
+        # structures that were not dereferenced have no fields.
+        pointer = parsing_classes.Stat(["0x7ffffab26f40"])
+        assert pointer.value is None
+        assert pointer.st_size is None
+
 
 class TestSocket(object):
     def test_socket(self):
@@ -126,6 +174,63 @@ class TestConnect(object):
         assert connect_call.args[2].value == 110
         assert connect_call.ret == (-1, "ENOENT")
 
+    def test_connect_address(self):
+        strace_path = get_test_data_path("socket.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        t = Trace.Trace(strace_path, syscall_definitions)
+        connects = [s for s in t.syscalls if s.name == "connect"]
+
+        address = connects[0].args[1].address
+        assert address == parsing_classes.SockAddress(
+            1, None, None, "/var/run/nscd/socket"
+        )
+
+        # equal addresses of a trace are the same object.
+        assert connects[1].args[1].address is address
+
+    def test_inet_addresses(self):
+        inet = parsing_classes.Sockaddr(
+            [
+                "{sa_family=AF_INET",
+                "sin_port=htons(5000)",
+                'sin_addr=inet_addr("127.0.0.1")}',
+            ]
+        )
+        assert inet.address.family == 2
+        assert inet.address.port == 5000
+        assert inet.address.address == b"\x7f\x00\x00\x01"
+        assert inet.address.host == "127.0.0.1"
+        assert inet.value[2].value == "127.0.0.1"
+
+        inet6 = parsing_classes.Sockaddr(
+            [
+                "{sa_family=AF_INET6",
+                "sin6_port=htons(6666)",
+                "sin6_flowinfo=htonl(0)",
+                "inet_pton(AF_INET6",
+                '"::1"',
+                "&sin6_addr)",
+                "sin6_scope_id=0}",
+            ]
+        )
+        assert inet6.address.family == 10
+        assert inet6.address.port == 6666
+        assert inet6.address.address == b"\x00" * 15 + b"\x01"
+        assert inet6.address.host == "::1"
+        assert inet6.value[1].value == 6666
+        assert inet6.value[3].value == "::1"
+
+        # addresses can be used to group calls.
+        assert len(set([inet.address, inet6.address, inet.address])) == 2
+
+    def test_null_address(self):
+        strace_path = get_test_data_path("../testbins/client.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        t = Trace.Trace(strace_path, syscall_definitions)
+        recvfrom_call = [s for s in t.syscalls if s.name == "recvfrom"][0]
+        assert recvfrom_call.args[4].value == "NULL"
+        assert recvfrom_call.args[4].address is None
+
 
 class TestRead(object):
     def test_read(self):
@@ -177,6 +282,41 @@ class TestExecve(object):
         assert execve_call.args[2].value == "NULL"
         assert execve_call.ret == (0, None)
 
+    def test_execve_environment(self):
+        strace_path = get_test_data_path("../testbins/shell.strace")
+        syscall_definitions = get_test_data_path("syscall_definitions.pickle")
+        t = Trace.Trace(strace_path, syscall_definitions, error_budget=100)
+
+        assert t.parser.home_env == "/root"
+        assert t.parser.environment["LOGNAME"] == "root"
+
+        execve_calls = [s for s in t.syscalls if s.name == "execve"]
+        assert len(execve_calls) > 1
+        for execve_call in execve_calls:
+            assert len(execve_call.args) == 3
+            assert execve_call.args[1].value.startswith("[")
+            assert execve_call.args[1].value.endswith("]")
+
+        environment = execve_calls[0].args[2]
+        assert isinstance(environment, parsing_classes.Environment)
+        assert environment.get("PWD").endswith("/testbins")
+        assert "PATH" in environment
+        assert environment.get("NOT_SET") is None
+        assert environment.value[0] == '"SHELL=/bin/bash"'
+
+    def test_environment_layouts(self):
+        environment = parsing_classes.Environment(['["A=1"', '"B=x, y"', '"C=2"]', "0"])
+        assert environment.variables == {"A": "1", "B": "x, y", "C": "2"}
+
+        abbreviated = parsing_classes.Environment(["[/* 51 vars */]"])
+        assert abbreviated.value == ["/* 51 vars */"]
+        assert abbreviated.get("HOME") is None
+
+        assert parsing_classes.Environment(["[]"]).value == []
+
+        argv = parsing_classes.StringArray(['["ls"', '"-l"]', "0"])
+        assert argv.value == '["ls", "-l"]'
+
     def test_get_pid(self):
         strace_path = get_test_data_path("execve.strace")
         syscall_definitions = get_test_data_path("syscall_definitions.pickle")
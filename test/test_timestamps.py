@@ -0,0 +1,87 @@
+from posix_omni_parser import timestamps
+from posix_omni_parser.parsers.StraceParser import StraceParser
+import datetime
+import os
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+def write_trace(directory, lines):
+    trace_path = os.path.join(str(directory), "timestamps.strace")
+    with open(trace_path, "w") as fh:
+        fh.write("\n".join(lines) + "\n")
+    return trace_path
+
+
+class TestClocks(object):
+    def test_time_of_day(self):
+        clock = timestamps.make_clock("t")
+        assert clock("15:31:56") == (15 * 3600 + 31 * 60 + 56) * 10**9
+
+        clock = timestamps.make_clock("tt", datetime.date(2021, 3, 4))
+        assert clock("15:32:16.190216") == 1614871936190216000
+
+    def test_midnight(self):
+        clock = timestamps.make_clock("tt", datetime.date(2021, 3, 4))
+        before = clock("23:59:59.999999")
+        after = clock("00:00:00.000001")
+        assert after - before == 2000
+
+        # small steps back do not wrap around.
+        assert clock("00:00:00.000000") == after - 1000
+
+    def test_epoch(self):
+        clock = timestamps.make_clock("ttt")
+        assert clock("1614797952.046825") == 1614797952046825000
+        assert clock("1614797952") == 1614797952000000000
+
+    def test_relative(self):
+        clock = timestamps.make_clock("r")
+        assert clock("0.000000") == 0
+        assert clock("0.000539") == 539000
+        assert clock("1.000001") == 1000540000
+
+
+class TestParsedTimestamps(object):
+    def test_relative_trace(self, tmp_path):
+        trace_path = write_trace(
+            tmp_path,
+            [
+                '8215  0.000000 open("a", O_RDONLY) = 3 <0.000010>',
+                "8215  0.000100 --- SIGCHLD {si_signo=SIGCHLD} ---",
+                "8215  0.000200 close(3) = 0 <0.000010>",
+            ],
+        )
+        parser = StraceParser(
+            trace_path, get_test_data_path("syscall_definitions.pickle")
+        )
+        assert parser.trace_options["timestamp"] == "r"
+
+        syscalls = parser.parse_trace()
+        # the relative time of the signal line still counts.
+        assert [syscall.timestamp for syscall in syscalls] == [0, 300000]
+        assert syscalls[0].pid == 8215
+        assert syscalls[0].elapsed_time == 0.00001
+
+    def test_wall_clock_trace(self, tmp_path):
+        trace_path = write_trace(
+            tmp_path,
+            [
+                '8215  23:59:59.500000 open("a", O_RDONLY) = 3',
+                "8215  00:00:00.250000 lseek(3, -2, SEEK_END) = -2",
+            ],
+        )
+        parser = StraceParser(
+            trace_path,
+            get_test_data_path("syscall_definitions.pickle"),
+            trace_date=datetime.date(2021, 3, 4),
+        )
+        syscalls = parser.parse_trace()
+
+        assert syscalls[0].timestamp == 1614902399500000000
+        assert syscalls[1].timestamp - syscalls[0].timestamp == 750000000
+        assert syscalls[1].ret == (-2, None)
@@ -0,0 +1,156 @@
+from posix_omni_parser import query
+from posix_omni_parser import zonemaps
+from posix_omni_parser.parsers.StraceParser import StraceParser
+import datetime
+import os
+import pickle
+import pytest
+
+
+def get_test_data_path(filename):
+
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(dir_path, filename)
+
+
+def write_trace(directory, lines):
+    trace_path = os.path.join(str(directory), "archive.strace")
+    with open(trace_path, "w") as fh:
+        fh.write("\n".join(lines) + "\n")
+    return trace_path
+
+
+def archive_lines():
+    # 10 blocks of 10 calls. Block 3 unlinks /var/lib/x, block 7 fails to open
+    # it, and pid 200 only runs in the last block.
+    lines = []
+    for position in range(100):
+        pid = 200 if position >= 90 else 100
+        timestamp = "1614797952.%06d" % position
+        if position == 35:
+            call = 'unlink("/var/lib/x") = 0'
+        elif position == 72:
+            call = 'openat(AT_FDCWD, "/var/lib/x", O_RDONLY) = -1 ENOENT (No such file or directory)'
+        else:
+            call = 'write(1, "x", 1) = 1'
+        lines.append(str(pid) + " " + timestamp + " " + call)
+    return lines
+
+
+def seconds(offset):
+    return (1614797952 * 1000000 + offset) * 1000
+
+
+class TestBloomFilter(object):
+    def test_no_false_negatives(self):
+        bloom = zonemaps.BloomFilter(1024, 3)
+        keys = ["path:/tmp/" + str(number) for number in range(100)]
+        for key in keys:
+            bloom.add(key)
+        assert all(key in bloom for key in keys)
+        false_positives = sum(
+            "path:/var/" + str(number) in bloom for number in range(1000)
+        )
+        assert false_positives < 100
+
+    def test_stable_across_pickling(self):
+        bloom = zonemaps.BloomFilter()
+        bloom.add("name:unlink")
+        restored = pickle.loads(pickle.dumps(bloom))
+        assert "name:unlink" in restored
+        assert "name:link" not in restored
+
+
+class TestSummarizedTrace(object):
+    def open(self, trace_path, **options):
+        return zonemaps.SummarizedTrace(
+            trace_path,
+            get_test_data_path("syscall_definitions.pickle"),
+            block_size=10,
+            **options
+        )
+
+    def test_zones(self, tmp_path):
+        trace = self.open(write_trace(tmp_path, archive_lines()))
+        zones = trace.zone_maps.zones
+        assert len(zones) == 10
+        assert [zone.start for zone in zones] == list(range(0, 100, 10))
+        assert zones[3].min_timestamp == seconds(30)
+        assert zones[3].max_timestamp == seconds(39)
+        assert zones[9].pids == set([200])
+        assert [zone.errors for zone in zones] == [0] * 7 + [1] + [0] * 2
+        assert zones[3].might_contain("path", "/var/lib/x")
+        assert zones[3].might_contain("name", "unlink")
+
+    def test_unknown_syscall(self, tmp_path):
+        lines = archive_lines()
+        lines[42] = "100 1614797952.000042 syscall_332(0x3, 0x7ffd2a4c1e20, 0) = 0"
+        trace = self.open(write_trace(tmp_path, lines))
+        assert trace.blocks("name == syscall_332") == [4]
+        assert trace.blocks('arg.path == "/var/lib/x"') == [3, 7]
+
+    def test_skipping(self, tmp_path):
+        trace_path = write_trace(tmp_path, archive_lines())
+        trace = self.open(trace_path)
+        parser = StraceParser(
+            trace_path, get_test_data_path("syscall_definitions.pickle")
+        )
+        syscalls = parser.parse_trace()
+
+        expressions = {
+            'name == unlink and arg.path == "/var/lib/x"': [3],
+            'arg.path == "/var/lib/x"': [3, 7],
+            "ret.err == ENOENT": [7],
+            "pid == 200 or name == unlink": [3, 9],
+            "timestamp >= " + str(seconds(85)): [8, 9],
+            "timestamp < " + str(seconds(10)) + " and pid in {100, 300}": [0],
+            "name == write and not pid == 100": list(range(10)),
+        }
+        for expression, blocks in expressions.items():
+            assert trace.blocks(expression) == blocks
+            q = query.compile_query(expression)
+            expected = [syscall.original_line for syscall in syscalls if q(syscall)]
+            assert [s.original_line for s in trace.select(expression)] == expected
+
+    def test_summary_file(self, tmp_path):
+        trace_path = write_trace(tmp_path, archive_lines())
+        self.open(trace_path)
+        assert os.path.exists(trace_path + ".zones")
+        assert os.path.exists(trace_path + ".zones.offsets")
+
+        saved = os.path.getmtime(trace_path + ".zones")
+        trace = self.open(trace_path)
+        assert os.path.getmtime(trace_path + ".zones") == saved
+        assert trace.blocks("name == unlink") == [3]
+
+        write_trace(tmp_path, archive_lines()[:25])
+        trace = self.open(trace_path)
+        assert len(trace.zone_maps.zones) == 3
+        assert trace.blocks("name == unlink") == []
+
+    def test_trace_date(self, tmp_path):
+        lines = [line.replace("1614797952.", "15:32:16.") for line in archive_lines()]
+        trace_path = write_trace(tmp_path, lines)
+        self.open(trace_path, trace_date=datetime.date(2020, 1, 1))
+
+        # the zones and block offsets saved for another day are rebuilt, so time
+        # windows of the new day find their blocks.
+        trace_date = datetime.date(2021, 1, 1)
+        trace = self.open(trace_path, trace_date=trace_date)
+        syscalls = StraceParser(
+            trace_path,
+            get_test_data_path("syscall_definitions.pickle"),
+            trace_date=trace_date,
+        ).parse_trace()
+        expression = "timestamp >= " + str(syscalls[85].timestamp)
+        assert trace.blocks(expression) == [8, 9]
+        assert [s.timestamp for s in trace.select(expression)] == [
+            s.timestamp for s in syscalls[85:]
+        ]
+
+    def test_malformed_lines(self, tmp_path):
+        lines = archive_lines()
+        lines[50] = "100 1614797952.000050 write(1, "
+        trace_path = write_trace(tmp_path, lines)
+        with pytest.raises(Exception):
+            self.open(trace_path, error_budget=10)